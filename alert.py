@@ -10,11 +10,14 @@ import mysql.connector
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
+from alert_engine import AlertEngine, dirty_rows, merge_fired
+from candles import build_store
+from browser import prepare_options, setup_driver
+from capture import open_capture_backend, timeframe_urls
+from image_store import prepare_image, check_image_columns, finish_run, screenshot_sql, screenshot_values
+
 
 # =========================================================
 # CONFIG
@@ -40,7 +43,8 @@ GSHEET_RETRY = 5
 SAVE_DAY = True
 SAVE_WEEK = True
 
-CHROME_DRIVER_PATH = ChromeDriverManager().install()
+# Evaluate price-level alerts against today's local candles before capturing
+LOCAL_ALERT_EVAL = os.getenv("LOCAL_ALERT_EVAL", "0") == "1"
 
 
 # =========================================================
@@ -137,9 +141,10 @@ def get_driver():
     opts.add_argument("--window-size=1920,1080")
     opts.add_argument("--disable-blink-features=AutomationControlled")
     opts.add_argument("--lang=en-US")
+    prepare_options(opts)
 
-    service = Service(CHROME_DRIVER_PATH)
-    return webdriver.Chrome(service=service, options=opts)
+    service = Service(ChromeDriverManager().install())
+    return setup_driver(webdriver.Chrome(service=service, options=opts), popups=True)
 
 def inject_tv_cookies(driver):
     try:
@@ -340,6 +345,58 @@ def explain_alert_condition(alert_obj):
     return f"active={active_val}, triggered={triggered_val}, needs active=1, triggered>0"
 
 
+def save_alerts_json(db: DB, rows):
+    """Writes triggered flags back only where alerts_json still holds the value loaded at
+    the start of the run; rows edited meanwhile (e.g. in WordPress) are re-read and get
+    just the triggered entries merged in."""
+    update = f"UPDATE `{SOURCE_TABLE}` SET alerts_json = %s WHERE id = %s AND alerts_json <=> %s"
+    select = f"SELECT alerts_json FROM `{SOURCE_TABLE}` WHERE id = %s"
+    saved = 0
+    try:
+        conn = db.ensure()
+        cur = conn.cursor()
+        for row in rows:
+            new_json, prev_json = row["alerts_json"], row["_alerts_raw"]
+            for _ in range(DB_RETRY):
+                cur.execute(update, (new_json, row["id"], prev_json))
+                if cur.rowcount:
+                    row["alerts_json"] = new_json
+                    saved += 1
+                    break
+                cur.execute(select, (row["id"],))
+                current = cur.fetchone()
+                if current is None:
+                    log(f"ℹ️ Row {row['id']} was deleted, triggered alerts not written back")
+                    break
+                prev_json = current[0]
+                new_json = merge_fired(prev_json, row["_fired"])
+                if new_json is None:
+                    log(f"ℹ️ alerts_json of row {row['id']} was edited, its triggered alerts no longer apply")
+                    row["alerts_json"] = prev_json
+                    break
+            else:
+                log(f"⚠️ alerts_json of row {row['id']} keeps changing, triggered alerts not written back")
+        cur.close()
+        log(f"✅ Wrote locally triggered alerts back to `{SOURCE_TABLE}` ({saved}/{len(rows)} rows).")
+    except Exception as e:
+        log(f"⚠️ Failed to write triggered alerts back: {e}")
+
+def evaluate_alerts_locally(db: DB, filter_rows):
+    engine = AlertEngine()
+    engine.load(filter_rows, parse_alerts_json)
+    if not engine.books:
+        return 0
+
+    session_date = time.strftime("%Y-%m-%d", time.gmtime())
+    fired = engine.feed_store(build_store(), session_date)
+    log(f"✅ Local alert evaluation for {session_date}: {fired} alert(s) fired.")
+
+    rows = dirty_rows(filter_rows)
+    if rows:
+        save_alerts_json(db, rows)
+    return fired
+
+
 # =========================================================
 # CHANGE HASH / DUPLICATE REDUCTION
 # =========================================================
@@ -415,6 +472,7 @@ def has_state_changed(db: DB, source_row, timeframe, alert_obj):
 # DB SAVE
 # =========================================================
 def save_alert_screenshot(db: DB, source_row, timeframe, alert_obj, image_data, change_hash):
+    image_cols, image_marks, _ = screenshot_sql()
     query = f"""
         INSERT INTO `{TARGET_TABLE}` (
             filter_id,
@@ -439,8 +497,8 @@ def save_alert_screenshot(db: DB, source_row, timeframe, alert_obj, image_data,
             source_week_label,
             raw_alert_json,
             change_hash,
-            screenshot
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            {image_cols}
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, {image_marks})
     """
 
     values = (
@@ -466,14 +524,20 @@ def save_alert_screenshot(db: DB, source_row, timeframe, alert_obj, image_data,
         safe_str(source_row.get("week_label")) or None,
         json.dumps(alert_obj, ensure_ascii=False),
         change_hash,
-        image_data
     )
 
+    # once, outside the retry loop: uploads and dedup/thumbnail bookkeeping must not repeat
+    try:
+        image_values = screenshot_values(prepare_image(TARGET_TABLE, image_data, db.ensure()))
+    except Exception as e:
+        log(f"❌ Image store error for symbol={normalize_symbol(source_row.get('symbol'))}: {e}")
+        return False
+
     for attempt in range(DB_RETRY):
         try:
             conn = db.ensure()
             cur = conn.cursor()
-            cur.execute(query, values)
+            cur.execute(query, values + image_values)
             cur.close()
             log(
                 f"✅ Saved: symbol={normalize_symbol(source_row.get('symbol'))} | "
@@ -490,45 +554,10 @@ def save_alert_screenshot(db: DB, source_row, timeframe, alert_obj, image_data,
     return False
 
 
-# =========================================================
-# SCREENSHOT
-# =========================================================
-def take_chart_screenshot(driver, url, symbol, timeframe):
-    if not url:
-        log(f"⚠️ Missing URL for {symbol} | {timeframe}")
-        return None
-
-    if "tradingview.com" not in url.lower():
-        log(f"⚠️ Invalid TradingView URL for {symbol} | {timeframe}: {url}")
-        return None
-
-    try:
-        driver.get(url)
-
-        chart = WebDriverWait(driver, CHART_WAIT_SEC).until(
-            EC.visibility_of_element_located(
-                (By.XPATH, "//div[contains(@class,'chart-container')]")
-            )
-        )
-
-        time.sleep(POST_LOAD_SLEEP)
-        image_data = chart.screenshot_as_png
-
-        if not image_data:
-            log(f"⚠️ Empty screenshot for {symbol} | {timeframe}")
-            return None
-
-        return image_data
-
-    except Exception as e:
-        log(f"❌ Screenshot failed for {symbol} | {timeframe}: {e}")
-        return None
-
-
 # =========================================================
 # MAIN PROCESS
 # =========================================================
-def process_alert_rows(driver, db, filter_rows, symbol_map):
+def process_alert_rows(backend, db, filter_rows, symbol_map):
     if not filter_rows:
         log("ℹ️ No rows found in filter table.")
         return
@@ -539,6 +568,10 @@ def process_alert_rows(driver, db, filter_rows, symbol_map):
     total_skipped_duplicate = 0
     total_missing_symbol_url = 0
 
+    # (symbol, timeframe) -> url, and the alerts waiting for that chart
+    capture_jobs = {}
+    pending = {}
+
     for row in filter_rows:
         symbol = normalize_symbol(row.get("symbol"))
         filter_id = row.get("id")
@@ -577,6 +610,7 @@ def process_alert_rows(driver, db, filter_rows, symbol_map):
             log(f"⚠️ Symbol not found in stock sheet: {symbol}")
             total_missing_symbol_url += len(matched_alerts)
             continue
+        symbol_urls = timeframe_urls(symbol_urls)
 
         tasks = []
         if SAVE_DAY:
@@ -603,12 +637,22 @@ def process_alert_rows(driver, db, filter_rows, symbol_map):
                     total_skipped_duplicate += 1
                     continue
 
-                image_data = take_chart_screenshot(driver, url, symbol, timeframe)
-                if not image_data:
+                if "tradingview.com" not in url.lower():
+                    log(f"⚠️ Invalid TradingView URL for {symbol} | {timeframe}: {url}")
                     continue
 
-                if save_alert_screenshot(db, row, timeframe, alert_obj, image_data, change_hash):
-                    total_saved += 1
+                # one capture per chart, shared by every alert of the symbol
+                capture_jobs[(symbol, timeframe)] = url
+                pending.setdefault((symbol, timeframe), []).append((row, alert_obj, change_hash))
+
+    log(f"📸 Capturing {len(capture_jobs)} charts for {sum(len(v) for v in pending.values())} alerts...")
+    for key, image_data in backend.capture_many(capture_jobs.items()):
+        if not image_data:
+            log(f"⚠️ Empty screenshot for {key[0]} | {key[1]}")
+            continue
+        for row, alert_obj, change_hash in pending[key]:
+            if save_alert_screenshot(db, row, key[1], alert_obj, image_data, change_hash):
+                total_saved += 1
 
     log("=====================================================")
     log(f"✅ Total alert objects parsed: {total_alert_objects}")
@@ -624,7 +668,7 @@ def process_alert_rows(driver, db, filter_rows, symbol_map):
 # =========================================================
 def main():
     db = None
-    driver = None
+    backend = None
 
     try:
         log("🚀 Starting alert screenshot bot...")
@@ -632,31 +676,34 @@ def main():
         db = DB(DB_CONFIG)
         log("✅ Database connected.")
 
+        cur = db.ensure().cursor()
+        check_image_columns(cur, TARGET_TABLE)
+        cur.close()
+
         client = get_gspread_client()
         symbol_map = load_stock_sheet(client)
 
         filter_rows = fetch_filter_rows(db)
 
-        driver = get_driver()
-        log("✅ Chrome driver started.")
+        if LOCAL_ALERT_EVAL:
+            evaluate_alerts_locally(db, filter_rows)
 
-        if not inject_tv_cookies(driver):
-            raise Exception("TradingView cookie injection failed.")
+        backend = open_capture_backend(get_driver, inject_tv_cookies, settle_sec=POST_LOAD_SLEEP,
+                                       wait_sec=CHART_WAIT_SEC)
+        log("✅ Capture backend started.")
 
-        process_alert_rows(driver, db, filter_rows, symbol_map)
+        process_alert_rows(backend, db, filter_rows, symbol_map)
 
+        finish_run(db.ensure())
         log("🏁 Alert screenshot bot finished successfully.")
 
     except Exception as e:
         log(f"❌ Fatal error: {e}")
 
     finally:
-        if driver:
-            try:
-                driver.quit()
-                log("✅ Browser closed.")
-            except Exception:
-                pass
+        if backend:
+            backend.close()
+            log("✅ Browser closed.")
 
         if db:
             db.close()
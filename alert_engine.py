@@ -0,0 +1,209 @@
+import re
+import json
+import bisect
+from datetime import datetime, timezone
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+# alerts_json objects carry the level under one of these keys
+ALERT_PRICE_KEYS = ("price", "level", "value", "target", "alert_price")
+# ...and the direction under one of these
+ALERT_DIRECTION_KEYS = ("condition", "direction", "operator", "type")
+
+# fields the engine writes when an alert fires
+TRIGGER_FIELDS = ("triggered", "triggered_at", "triggered_price")
+
+ABOVE_WORDS = {"above", "greater", "gt", "gte", ">", "up", "breakout"}
+BELOW_WORDS = {"below", "less", "lt", "lte", "<", "down", "breakdown"}
+
+
+# =========================================================
+# HELPERS
+# =========================================================
+def log(msg):
+    print(msg, flush=True)
+
+def safe_str(v):
+    if v is None:
+        return ""
+    return str(v).strip()
+
+def safe_int(v, default=0):
+    try:
+        val = safe_str(v)
+        if val == "":
+            return default
+        return int(float(val))
+    except Exception:
+        return default
+
+def safe_float(v):
+    try:
+        val = safe_str(v).replace(",", "")
+        return float(val) if val else None
+    except Exception:
+        return None
+
+def alert_level(alert_obj):
+    for key in ALERT_PRICE_KEYS:
+        level = safe_float(alert_obj.get(key))
+        if level is not None:
+            return level
+    return None
+
+def alert_direction(alert_obj):
+    for key in ALERT_DIRECTION_KEYS:
+        tokens = set(re.findall(r"[a-z]+|[<>]", safe_str(alert_obj.get(key)).lower()))
+        if tokens & ABOVE_WORDS:
+            return "above"
+        if tokens & BELOW_WORDS:
+            return "below"
+    return "cross"
+
+
+# =========================================================
+# PRICE LEVEL INDEX
+# =========================================================
+class LevelBook:
+    """Sorted price levels of one symbol, split by direction.
+
+    above: fires when high >= level   -> always a prefix of the sorted list
+    below: fires when low <= level    -> always a suffix
+    cross: fires when the bar range (incl. previous close) spans the level
+    """
+
+    def __init__(self):
+        self.levels = {"above": [], "below": [], "cross": []}
+        self.refs = {"above": [], "below": [], "cross": []}
+        self.prev_close = None
+
+    def add(self, direction, level, ref):
+        i = bisect.bisect_right(self.levels[direction], level)
+        self.levels[direction].insert(i, level)
+        self.refs[direction].insert(i, ref)
+
+    def _pop(self, direction, lo, hi):
+        fired = self.refs[direction][lo:hi]
+        del self.levels[direction][lo:hi]
+        del self.refs[direction][lo:hi]
+        return fired
+
+    def evaluate(self, low, high, close):
+        """Removes and returns refs of every level hit by this candle, O(log n + hits)."""
+        fired = []
+        fired += self._pop("above", 0, bisect.bisect_right(self.levels["above"], high))
+        below = self.levels["below"]
+        fired += self._pop("below", bisect.bisect_left(below, low), len(below))
+
+        lo = min(low, self.prev_close) if self.prev_close is not None else low
+        hi = max(high, self.prev_close) if self.prev_close is not None else high
+        cross = self.levels["cross"]
+        fired += self._pop("cross", bisect.bisect_left(cross, lo), bisect.bisect_right(cross, hi))
+
+        self.prev_close = close
+        return fired
+
+    def __len__(self):
+        return sum(len(v) for v in self.levels.values())
+
+
+class AlertEngine:
+    """Evaluates incoming candles against the alerts_json of the `filter` rows."""
+
+    def __init__(self):
+        self.books = {}
+        self.loaded = 0
+        self.skipped = 0
+
+    def load(self, filter_rows, parse_alerts):
+        """parse_alerts(raw_json, symbol, filter_id) -> list of alert dicts (alert.py's parser)."""
+        for row in filter_rows:
+            symbol = safe_str(row.get("symbol")).upper()
+            alerts = parse_alerts(row.get("alerts_json"), symbol, row.get("id"))
+            # keep the parsed list and the raw value on the row so triggered flags can be
+            # written back only where alerts_json was not edited in the meantime
+            row["_alerts"] = alerts
+            row["_alerts_raw"] = row.get("alerts_json")
+            row["_alerts_obj"] = safe_str(row.get("alerts_json")).startswith("{")
+            for alert_obj in alerts:
+                if safe_int(alert_obj.get("active")) != 1 or safe_int(alert_obj.get("triggered")) > 0:
+                    continue
+                level = alert_level(alert_obj)
+                if level is None:
+                    self.skipped += 1
+                    continue
+                self.books.setdefault(symbol, LevelBook()).add(alert_direction(alert_obj), level, (row, alert_obj))
+                self.loaded += 1
+        log(f"✅ Alert index: {self.loaded} armed levels over {len(self.books)} symbols "
+            f"({self.skipped} alerts without a price level)")
+
+    def on_candle(self, symbol, low, high, close, ts=None):
+        book = self.books.get(safe_str(symbol).upper())
+        if not book:
+            return []
+
+        fired = book.evaluate(low, high, close)
+        when = (datetime.fromtimestamp(int(ts), timezone.utc) if ts is not None
+                else datetime.now(timezone.utc)).strftime("%Y-%m-%d %H:%M:%S")
+        for row, alert_obj in fired:
+            alert_obj["triggered"] = safe_int(alert_obj.get("triggered")) + 1
+            alert_obj["triggered_at"] = when
+            alert_obj["triggered_price"] = close
+            row.setdefault("_fired", []).append(alert_obj)
+            log(f"🚨 Alert fired | symbol={row.get('symbol')} | alert_id={safe_str(alert_obj.get('id'))} "
+                f"| level={alert_level(alert_obj)} | close={close}")
+        return fired
+
+    def feed_store(self, store, session_date):
+        """Replays one session of the candle store through the index in time order."""
+        fired = 0
+        for symbol in list(self.books):
+            seg = store.get(symbol, session_date, ["ts", "low", "high", "close"])
+            if seg is None:
+                continue
+            for ts, low, high, close in zip(seg["ts"], seg["low"], seg["high"], seg["close"]):
+                fired += len(self.on_candle(symbol, float(low), float(high), float(close), ts))
+                if not self.books[symbol]:
+                    break
+        return fired
+
+
+def encode_alerts(alerts, as_object):
+    # a single-object alerts_json stays an object
+    payload = alerts[0] if as_object and len(alerts) == 1 else alerts
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def dirty_rows(filter_rows):
+    """Rows whose alerts were triggered locally, with alerts_json rebuilt for the DB
+    (process_alert_rows then picks the triggered alerts up from it)."""
+    out = []
+    for row in filter_rows:
+        if row.get("_fired"):
+            row["alerts_json"] = encode_alerts(row["_alerts"], row.get("_alerts_obj"))
+            out.append(row)
+    return out
+
+
+def merge_fired(raw_json, fired):
+    """Applies the trigger fields of `fired` onto a fresh alerts_json value, matching alerts
+    by id. Alerts edited since the load (deactivated, re-triggered, removed) are left as they
+    are. Returns the new alerts_json, or None when nothing applies."""
+    try:
+        data = json.loads(safe_str(raw_json))
+    except ValueError:
+        return None
+    alerts = [data] if isinstance(data, dict) else data if isinstance(data, list) else []
+    by_id = {safe_str(a.get("id")): a for a in alerts if isinstance(a, dict) and safe_str(a.get("id"))}
+
+    applied = 0
+    for alert_obj in fired:
+        fresh = by_id.get(safe_str(alert_obj.get("id")))
+        if fresh is None or safe_int(fresh.get("active")) != 1 or safe_int(fresh.get("triggered")) > 0:
+            continue
+        for key in TRIGGER_FIELDS:
+            fresh[key] = alert_obj.get(key)
+        applied += 1
+    return encode_alerts(alerts, isinstance(data, dict)) if applied else None
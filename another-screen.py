@@ -13,6 +13,10 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 from webdriver_manager.chrome import ChromeDriverManager
 
+from browser import prepare_options, setup_driver, log_page_stats, hold_overlays, SUPPRESS_POPUPS
+from capture import capture_page
+from image_store import prepare_image, check_image_columns, finish_run, screenshot_sql, screenshot_values
+
 # --- CONFIGURATION ---
 DB_CONFIG = {
     "host": os.getenv("DB_HOST"),
@@ -32,8 +36,10 @@ def get_driver():
     opts.add_argument("--window-size=1920,1080")
     opts.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
     
+    prepare_options(opts)
+    
     service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=opts)
+    driver = setup_driver(webdriver.Chrome(service=service, options=opts), popups=True)
     driver.set_page_load_timeout(60)
     return driver
 
@@ -45,16 +51,19 @@ def save_to_db(symbol, timeframe, img_data, chart_date):
     conn = None
     try:
         conn = mysql.connector.connect(**DB_CONFIG)
+        image_values = screenshot_values(prepare_image("another_screenshot", img_data, conn))
         cursor = conn.cursor()
-        query = """
-            INSERT INTO another_screenshot (symbol, timeframe, screenshot, chart_date) 
-            VALUES (%s, %s, %s, %s)
+        image_cols, image_marks, image_updates = screenshot_sql()
+        query = f"""
+            INSERT INTO another_screenshot
+                (symbol, timeframe, {image_cols}, chart_date)
+            VALUES (%s, %s, {image_marks}, %s)
             ON DUPLICATE KEY UPDATE 
-                screenshot = VALUES(screenshot),
+                {image_updates},
                 chart_date = VALUES(chart_date),
                 created_at = CURRENT_TIMESTAMP
         """
-        cursor.execute(query, (symbol, timeframe, img_data, chart_date))
+        cursor.execute(query, (symbol, timeframe, *image_values, chart_date))
         conn.commit()
         cursor.close()
         return True
@@ -111,6 +120,9 @@ def process_row(row):
             ActionChains(driver).move_to_element(chart).click().perform()
             time.sleep(2)
             
+            # The go-to-date dialog is an overlay too: keep it until the date is entered
+            hold_overlays(driver)
+
             # Alt + G Shortcut
             ActionChains(driver).key_down(Keys.ALT).send_keys("g").key_up(Keys.ALT).perform()
             
@@ -124,15 +136,18 @@ def process_row(row):
             print(f"📍 Jumped to {target_date} on {timeframe} chart.")
             time.sleep(12) # Wait for indicators to render
 
-            # 5. UI Cleanup
-            driver.execute_script("""
-                document.querySelectorAll('[class*="overlap-"], [class*="modal-"], [class*="dialog-"], .tv-dialog__close').forEach(el => el.remove());
-            """)
-            ActionChains(driver).send_keys(Keys.ESCAPE).perform()
-            time.sleep(1)
+            # 5. UI Cleanup (the popup observer sweeps once the hold is released)
+            hold_overlays(driver, False)
+            if not SUPPRESS_POPUPS:
+                driver.execute_script("""
+                    document.querySelectorAll('[class*="overlap-"], [class*="modal-"], [class*="dialog-"], .tv-dialog__close').forEach(el => el.remove());
+                """)
+                ActionChains(driver).send_keys(Keys.ESCAPE).perform()
+                time.sleep(1)
             
             # 6. Capture and Save
-            img = driver.get_screenshot_as_png()
+            img = capture_page(driver)
+            log_page_stats(driver, f"{symbol} ({timeframe})")
             if save_to_db(symbol, timeframe, img, target_date):
                 print(f"✅ Saved {symbol} for {target_date} ({timeframe})")
             
@@ -154,6 +169,16 @@ def main():
         print(f"❌ Spreadsheet Error: {e}")
         return
 
+    try:
+        conn = mysql.connector.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+        check_image_columns(cursor, "another_screenshot")
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"❌ DB Error preparing another_screenshot: {e}")
+        return
+
     start = int(os.getenv("START_ROW", 0))
     end = int(os.getenv("END_ROW", 500))
     
@@ -161,5 +186,12 @@ def main():
         process_row(row)
         time.sleep(1)
 
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        finish_run(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
 if __name__ == "__main__":
     main()
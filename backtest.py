@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+import hashlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import mv2_engine
+from mv2_engine import DailyPanel, compute_indicators, load_panel
+
+# ---------------- CONFIG ---------------- #
+CACHE_DIR = os.getenv("BACKTEST_CACHE_DIR", os.path.join(os.getcwd(), ".backtest_cache"))
+HORIZONS = [int(h) for h in os.getenv("BACKTEST_HORIZONS", "1,5,10,20").split(",")]
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+# ---------------- RULES ---------------- #
+# Same conditions as the trigger dict in filter.py, as symbols x days boolean arrays
+def rule_compact_filter(ind):
+    with np.errstate(invalid="ignore"):
+        return (ind["MXMN_low"] == 1) & (ind["D_CL_AB"] > 1) & (ind["D_CL_AB"] < 1.03) & (ind["MXMN"] < 30)
+
+
+def rule_d_trigger(ind):
+    return ind["D_Trigger"] == 0
+
+
+def rule_d_trigger_s(ind):
+    return (ind["D_Trigger_S"] == 0) & (ind["D_Trigger_S"] != ind["D_Trigger"])
+
+
+RULES = {
+    "D_Trigger": rule_d_trigger,
+    "D_Trigger_S": rule_d_trigger_s,
+    "Compact_Filter": rule_compact_filter,
+}
+
+
+# ---------------- INDICATOR CACHE ---------------- #
+def panel_key(panel):
+    h = hashlib.sha1()
+    h.update("|".join(panel.symbols).encode("utf-8"))
+    h.update(panel.dates.tobytes())
+    h.update(np.nan_to_num(panel.close).tobytes())
+    h.update(np.nan_to_num(panel.high).tobytes())
+    h.update(np.nan_to_num(panel.low).tobytes())
+    windows = (mv2_engine.MXMN_WINDOW, mv2_engine.CL_AB_WINDOW,
+               mv2_engine.TRIGGER_WINDOW, mv2_engine.TRIGGER_S_WINDOW)
+    h.update(repr(windows).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def cached_indicators(panel, use_cache=True):
+    """compute_indicators with an .npz cache keyed on the panel contents and window settings."""
+    if not use_cache:
+        return compute_indicators(panel)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"ind_{panel_key(panel)}.npz")
+    if os.path.exists(path):
+        with np.load(path) as data:
+            log(f"♻️ Indicator cache hit: {os.path.basename(path)}")
+            return {name: data[name] for name in data.files}
+
+    ind = compute_indicators(panel)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **ind)
+    os.replace(tmp_path, path)
+    log(f"💾 Indicators cached: {os.path.basename(path)}")
+    return ind
+
+
+# ---------------- ENGINE ---------------- #
+def forward_returns(close, horizon):
+    """close[d + h] / close[d] - 1, NaN where the future bar is missing."""
+    out = np.full(close.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[:, :-horizon] = close[:, horizon:] / close[:, :-horizon] - 1.0
+    return out
+
+
+def run_backtest(panel, rules=None, horizons=None, start=None, end=None, use_cache=True):
+    """Hit rate and forward-return stats per rule and horizon over the whole panel.
+
+    Entry is the close of the signal day. start/end ('YYYY-MM-DD') limit the signal days.
+    """
+    rules = rules or list(RULES)
+    horizons = horizons or HORIZONS
+    ind = cached_indicators(panel, use_cache)
+
+    window = np.ones(len(panel.dates), dtype=bool)
+    if start:
+        window &= panel.dates >= np.datetime64(start)
+    if end:
+        window &= panel.dates <= np.datetime64(end)
+
+    fwd = {h: forward_returns(panel.close, h) for h in horizons}
+    rows = []
+    for name in rules:
+        signal = RULES[name](ind) & window[None, :] & ~np.isnan(panel.close)
+        for h in horizons:
+            rets = fwd[h][signal]
+            rets = rets[~np.isnan(rets)]
+            rows.append({
+                "rule": name,
+                "horizon": h,
+                "signals": int(signal.sum()),
+                "evaluated": len(rets),
+                "hit_rate": float((rets > 0).mean()) if len(rets) else np.nan,
+                "mean_ret": float(rets.mean()) if len(rets) else np.nan,
+                "median_ret": float(np.median(rets)) if len(rets) else np.nan,
+                "symbols": int(signal.any(axis=1).sum()),
+            })
+    return pd.DataFrame(rows)
+
+
+# ---------------- BENCHMARK ---------------- #
+def synthetic_panel(n_symbols=2500, years=5, seed=11):
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64("2021-01-01"), np.datetime64("2021-01-01") + 365 * years)
+    dates = dates[np.is_busday(dates)]
+    close = 100 * np.cumprod(1 + rng.normal(0.0003, 0.02, (n_symbols, len(dates))), axis=1)
+    spread = np.abs(rng.normal(0, 0.01, close.shape))
+    return DailyPanel([f"SYM{i}" for i in range(n_symbols)], dates,
+                      close * (1 - spread / 2), close * (1 + spread), close * (1 - spread), close,
+                      rng.integers(1_000, 100_000, close.shape).astype(np.float64))
+
+
+def benchmark():
+    panel = synthetic_panel()
+    log(f"✅ Synthetic panel: {len(panel.symbols)} symbols x {len(panel.dates)} days")
+
+    t = time.perf_counter()
+    run_backtest(panel, ["Compact_Filter"], use_cache=False)
+    log(f"⏱️ Cold run (indicators + rule): {time.perf_counter() - t:.2f}s")
+
+    cached_indicators(panel)
+    t = time.perf_counter()
+    stats = run_backtest(panel, ["Compact_Filter"])
+    log(f"⏱️ Warm run (cached indicators): {time.perf_counter() - t:.2f}s")
+    print(stats.to_string(index=False))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark()
+        sys.exit(0)
+
+    names = [a for a in sys.argv[1:] if a in RULES] or list(RULES)
+    stats = run_backtest(load_panel(), names)
+    print(stats.to_string(index=False))
@@ -0,0 +1,231 @@
+import os
+import json
+import fnmatch
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+# CDP Network.setBlockedURLs patterns ('*' wildcard). BLOCKED_URLS replaces the
+# defaults, BLOCKED_URLS_EXTRA adds to them (both comma separated).
+DEFAULT_BLOCKED_URLS = [
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*googleadservices.com*",
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*facebook.net*",
+    "*connect.facebook.com*",
+    "*platform.twitter.com*",
+    "*snap.licdn.com*",
+    "*hotjar.com*",
+    "*amplitude.com*",
+    "*sentry.io*",
+    "*fonts.googleapis.com*",
+    "*fonts.gstatic.com*",
+    "*s3.tradingview.com/userpics/*",
+    "*.mp4*",
+    "*.webm*",
+]
+
+# Keep windows that are not in front painting at full speed (pipelined capture, pooled browsers)
+BACKGROUND_FLAGS = [
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+]
+
+# Remove TradingView popups/overlays the moment they are inserted (script registered
+# for every new document) instead of sleeping and sweeping once before the capture
+SUPPRESS_POPUPS = os.getenv("SUPPRESS_POPUPS", "1") == "1"
+POPUP_SELECTOR = '[class*="overlap-manager-root"], [class*="modal-"], [class*="dialog-"], [class*="backdrops-"]'
+
+BLOCK_URLS = os.getenv("BLOCK_URLS", "1") == "1"
+# Audit mode blocks nothing but reports what the list would have blocked (with sizes)
+BLOCK_AUDIT = os.getenv("BLOCK_AUDIT", "0") == "1"
+NETWORK_STATS = os.getenv("NETWORK_STATS", "1") == "1"
+
+# Persistent Chrome profile (login session + HTTP disk cache) reused across runs;
+# empty = a fresh throwaway profile every start. The profile holds a live TradingView
+# sessionid: keep it on the machine running the bots, never in a shared cache.
+CHROME_PROFILE_DIR = os.getenv("CHROME_PROFILE_DIR", "")
+# HTTP disk cache only (no cookies/storage), safe to persist in CI caches
+CHROME_CACHE_DIR = os.getenv("CHROME_CACHE_DIR", "")
+CHROME_CACHE_MB = int(os.getenv("CHROME_CACHE_MB", "512"))
+TV_SESSION_COOKIE = "sessionid"
+# Small same-site response: enough to read the tradingview.com cookie jar without loading the app
+TV_PROBE_URL = "https://www.tradingview.com/robots.txt"
+
+
+def _split(value):
+    return [p.strip() for p in value.split(",") if p.strip()]
+
+
+BLOCKED_URLS = _split(os.getenv("BLOCKED_URLS", "")) or DEFAULT_BLOCKED_URLS
+BLOCKED_URLS = BLOCKED_URLS + _split(os.getenv("BLOCKED_URLS_EXTRA", ""))
+
+
+# overlap-manager-root is TradingView's permanent dialog host: emptied, not removed.
+# window.__keepOverlays pauses it while a bot drives a dialog itself (see hold_overlays).
+POPUP_OBSERVER_JS = """
+(() => {
+  const SEL = %s;
+  const sweep = () => {
+    document.querySelectorAll(SEL).forEach(n => {
+      if (n.matches('[class*="overlap-manager-root"]')) { n.replaceChildren(); } else { n.remove(); }
+    });
+    if (document.body) { document.body.style.overflow = 'auto'; document.body.style.position = 'static'; }
+  };
+  // an overlay itself, something inserted into one, or a subtree containing one
+  const hit = n => n.nodeType === 1 && (n.closest(SEL) || n.querySelector(SEL));
+  window.__sweepOverlays = sweep;
+  new MutationObserver(records => {
+    if (window.__keepOverlays) { return; }
+    for (const r of records) {
+      for (const n of r.addedNodes) {
+        if (hit(n)) { sweep(); return; }
+      }
+    }
+  }).observe(document, {childList: true, subtree: true});
+})();
+""" % json.dumps(POPUP_SELECTOR)
+
+
+def log(msg):
+    print(msg, flush=True)
+
+
+def is_blocked(url, patterns=None):
+    return any(fnmatch.fnmatchcase(url, p) for p in (patterns or BLOCKED_URLS))
+
+
+# =========================================================
+# DRIVER SETUP
+# =========================================================
+def prepare_options(opts):
+    """Options every bot's driver factory passes through before launching Chrome."""
+    for flag in BACKGROUND_FLAGS:
+        opts.add_argument(flag)
+    if CHROME_PROFILE_DIR:
+        profile = os.path.abspath(CHROME_PROFILE_DIR)
+        os.makedirs(profile, exist_ok=True)
+        # Locks left by a crashed run or another machine (restored CI cache) make Chrome refuse the profile
+        for name in ("SingletonLock", "SingletonSocket", "SingletonCookie"):
+            try:
+                os.remove(os.path.join(profile, name))
+            except FileNotFoundError:
+                pass
+        opts.add_argument(f"--user-data-dir={profile}")
+    if CHROME_CACHE_DIR:
+        opts.add_argument(f"--disk-cache-dir={os.path.abspath(CHROME_CACHE_DIR)}")
+    if CHROME_PROFILE_DIR or CHROME_CACHE_DIR:
+        opts.add_argument(f"--disk-cache-size={CHROME_CACHE_MB * 1024 * 1024}")
+    if NETWORK_STATS:
+        opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return opts
+
+
+def setup_driver(driver, popups=False):
+    """Applies the block list to a freshly started driver, plus the TradingView popup
+    observer when popups=True (TradingView drivers only)."""
+    if popups and SUPPRESS_POPUPS:
+        try:
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": POPUP_OBSERVER_JS})
+        except Exception as e:
+            log(f"⚠️ Could not install popup observer: {e}")
+    if not BLOCK_URLS:
+        return driver
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        if not BLOCK_AUDIT:
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+        log(f"🛡️ URL block list {'audited' if BLOCK_AUDIT else 'active'}: {len(BLOCKED_URLS)} patterns")
+    except Exception as e:
+        log(f"⚠️ Could not apply URL block list: {e}")
+    return driver
+
+
+def hold_overlays(driver, hold=True):
+    """Pauses popup suppression while a bot uses a TradingView dialog (symbol search,
+    go-to-date...); releasing it sweeps whatever appeared meanwhile."""
+    driver.execute_script(
+        "window.__keepOverlays = arguments[0];"
+        "if (!arguments[0] && window.__sweepOverlays) { window.__sweepOverlays(); }",
+        hold
+    )
+
+
+# =========================================================
+# TRADINGVIEW SESSION
+# =========================================================
+def tv_session_valid(driver):
+    """True when the profile already holds a TradingView session cookie (Chrome drops
+    expired cookies itself, so presence means it has not expired)."""
+    try:
+        driver.get(TV_PROBE_URL)
+        cookie = driver.get_cookie(TV_SESSION_COOKIE)
+    except Exception as e:
+        log(f"⚠️ Session check failed: {e}")
+        return False
+    return bool(cookie and cookie.get("value"))
+
+
+def ensure_tv_session(driver, login, reuse=None):
+    """Reuses the persistent profile's (or pooled browser's) session, calling the bot's
+    cookie injection only when there is none or it has expired."""
+    if reuse is None:
+        reuse = bool(CHROME_PROFILE_DIR)
+    if reuse and tv_session_valid(driver):
+        log("♻️ TradingView session reused from the browser profile")
+        return True
+    return login(driver)
+
+
+# =========================================================
+# PER-PAGE NETWORK REPORT
+# =========================================================
+def page_network_stats(driver):
+    """Drains the performance log and sums requests/bytes since the last call.
+
+    Requests blocked by setBlockedURLs never download, so their size is unknown;
+    run once with BLOCK_AUDIT=1 to see the bytes the list saves.
+    """
+    stats = {"requests": 0, "bytes": 0, "blocked": 0, "blockable": 0, "blockable_bytes": 0}
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return None
+
+    urls = {}
+    for entry in entries:
+        try:
+            msg = json.loads(entry["message"])["message"]
+        except Exception:
+            continue
+        method, params = msg.get("method"), msg.get("params", {})
+
+        if method == "Network.requestWillBeSent":
+            stats["requests"] += 1
+            urls[params.get("requestId")] = params.get("request", {}).get("url", "")
+        elif method == "Network.loadingFinished":
+            size = int(params.get("encodedDataLength") or 0)
+            stats["bytes"] += size
+            if BLOCK_AUDIT and is_blocked(urls.get(params.get("requestId"), "")):
+                stats["blockable"] += 1
+                stats["blockable_bytes"] += size
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            stats["blocked"] += 1
+    return stats
+
+
+def log_page_stats(driver, label):
+    if not NETWORK_STATS:
+        return
+    stats = page_network_stats(driver)
+    if not stats:
+        return
+    line = (f"    🌐 {label}: {stats['requests']} requests, {stats['bytes'] / 1e6:.2f} MB, "
+            f"{stats['blocked']} blocked")
+    if BLOCK_AUDIT:
+        line += f", would block {stats['blockable']} ({stats['blockable_bytes'] / 1e6:.2f} MB)"
+    log(line)
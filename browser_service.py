@@ -0,0 +1,301 @@
+import os
+import sys
+import json
+import time
+import fcntl
+import shutil
+import signal
+import subprocess
+import urllib.request
+
+from browser import BACKGROUND_FLAGS, CHROME_CACHE_MB, NETWORK_STATS, setup_driver, ensure_tv_session
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+# Pool of warm, logged-in headless Chromes that the bots attach to over their
+# remote-debugging port instead of launching and logging in their own
+# (BROWSER_SERVICE=1 in capture.py).
+#   python browser_service.py start [--size N]
+#   python browser_service.py status
+BROWSER_POOL_DIR = os.getenv("BROWSER_POOL_DIR", ".browser-pool")
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_BASE_PORT = int(os.getenv("BROWSER_BASE_PORT", "9300"))
+BROWSER_LEASE_WAIT = int(os.getenv("BROWSER_LEASE_WAIT", "120"))   # seconds a bot waits for a free browser
+CHROME_BINARY = os.getenv("CHROME_BINARY", "")
+
+HEALTH_CHECK_SEC = 30
+POOL_FILE = "pool.json"
+
+CHROME_ARGS = [
+    "--headless=new",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--window-size=1920,1080",
+    "--disable-blink-features=AutomationControlled",
+    "--lang=en-US",
+    "--no-first-run",
+    "--no-default-browser-check",
+] + BACKGROUND_FLAGS
+
+
+def log(msg):
+    print(msg, flush=True)
+
+
+def endpoint_alive(port):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=2) as r:
+            return r.status == 200
+    except Exception:
+        return False
+
+
+def find_chrome():
+    for name in ([CHROME_BINARY] if CHROME_BINARY else []) + \
+            ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser"]:
+        path = shutil.which(name) or (name if os.path.isfile(name) else None)
+        if path:
+            return path
+    raise RuntimeError("Chrome binary not found, set CHROME_BINARY.")
+
+
+# =========================================================
+# ATTACH
+# =========================================================
+def attach_driver(port, driver_path):
+    """WebDriver session on an already running Chrome."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+
+    opts = Options()
+    opts.debugger_address = f"127.0.0.1:{port}"
+    if NETWORK_STATS:
+        opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    # block list and other CDP state belong to the DevTools session, so re-apply per attach
+    return setup_driver(webdriver.Chrome(service=Service(driver_path), options=opts), popups=True)
+
+
+def inject_cookies(driver):
+    cookie_data = os.getenv("TRADINGVIEW_COOKIES")
+    if not cookie_data:
+        log("❌ TRADINGVIEW_COOKIES missing.")
+        return False
+    driver.get("https://www.tradingview.com/")
+    for c in json.loads(cookie_data):
+        try:
+            driver.add_cookie({
+                "name": c["name"],
+                "value": c["value"],
+                "domain": c.get("domain") or ".tradingview.com",
+                "path": c.get("path", "/")
+            })
+        except Exception:
+            continue
+    driver.refresh()
+    return True
+
+
+class Lease:
+    """Exclusive use of one pooled browser, held through a flock on its lock file
+    (released by the OS even if the bot crashes)."""
+
+    def __init__(self, port, driver_path, lock_file):
+        self.port = port
+        self.driver_path = driver_path
+        self.lock_file = lock_file
+
+    def attach(self):
+        return attach_driver(self.port, self.driver_path)
+
+    def release(self, driver=None):
+        if driver is not None:
+            try:
+                # hand the browser back with a single blank window
+                handles = driver.window_handles
+                for handle in handles[1:]:
+                    driver.switch_to.window(handle)
+                    driver.close()
+                driver.switch_to.window(handles[0])
+                driver.get("about:blank")
+            except Exception as e:
+                log(f"⚠️ Could not reset pooled browser {self.port}: {e}")
+            try:
+                driver.quit()   # ends the WebDriver session only; the pooled Chrome keeps running
+            except Exception:
+                pass
+        if self.lock_file:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+            log(f"🔓 Released pooled browser :{self.port}")
+
+
+def read_pool(pool_dir=BROWSER_POOL_DIR):
+    try:
+        with open(os.path.join(pool_dir, POOL_FILE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def acquire(pool_dir=BROWSER_POOL_DIR, wait_sec=BROWSER_LEASE_WAIT):
+    """Lease on a free, live pooled browser, or None when no pool is running."""
+    deadline = time.monotonic() + wait_sec
+    while True:
+        pool = read_pool(pool_dir)
+        if not pool:
+            log("⚠️ No browser pool running")
+            return None
+        for port in pool["ports"]:
+            lock_file = open(os.path.join(pool_dir, f"{port}.lock"), "a+")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                continue
+            if endpoint_alive(port):
+                log(f"🔒 Leased pooled browser :{port}")
+                return Lease(port, pool["driver_path"], lock_file)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+        if time.monotonic() > deadline:
+            log(f"⚠️ No pooled browser free after {wait_sec}s")
+            return None
+        time.sleep(1)
+
+
+# =========================================================
+# SERVICE
+# =========================================================
+class BrowserPool:
+    def __init__(self, size=BROWSER_POOL_SIZE, pool_dir=BROWSER_POOL_DIR, base_port=BROWSER_BASE_PORT):
+        self.size = size
+        self.pool_dir = os.path.abspath(pool_dir)
+        self.ports = [base_port + i for i in range(size)]
+        self.procs = {}
+        self.chrome = find_chrome()
+        self.driver_path = None
+
+    def profile_dir(self, port):
+        # one user-data dir per instance (Chrome locks it), under the persistent profile if set
+        base = os.getenv("CHROME_PROFILE_DIR") or os.path.join(self.pool_dir, "profiles")
+        return os.path.abspath(os.path.join(base, f"pool-{port}"))
+
+    def launch(self, port):
+        profile = self.profile_dir(port)
+        os.makedirs(profile, exist_ok=True)
+        for name in ("SingletonLock", "SingletonSocket", "SingletonCookie"):
+            try:
+                os.remove(os.path.join(profile, name))
+            except FileNotFoundError:
+                pass
+        args = [self.chrome, *CHROME_ARGS, f"--remote-debugging-port={port}",
+                f"--user-data-dir={profile}", f"--disk-cache-size={CHROME_CACHE_MB * 1024 * 1024}",
+                "about:blank"]
+        self.procs[port] = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        for _ in range(60):
+            if endpoint_alive(port):
+                break
+            time.sleep(0.5)
+        else:
+            raise RuntimeError(f"Chrome on :{port} did not come up")
+
+        driver = attach_driver(port, self.driver_path)
+        try:
+            ok = ensure_tv_session(driver, inject_cookies, reuse=True)
+        finally:
+            driver.quit()
+        log(f"{'✅' if ok else '⚠️'} Pooled browser :{port} up (pid {self.procs[port].pid}, "
+            f"{'logged in' if ok else 'NOT logged in'})")
+
+    def write_state(self):
+        path = os.path.join(self.pool_dir, POOL_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"ports": self.ports, "driver_path": self.driver_path, "pid": os.getpid()}, f)
+        os.replace(path + ".tmp", path)
+
+    def start(self):
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        os.makedirs(self.pool_dir, exist_ok=True)
+        # resolved once here; attaching bots reuse the path from pool.json
+        self.driver_path = ChromeDriverManager().install()
+        for port in self.ports:
+            self.launch(port)
+        self.write_state()
+        log(f"🚀 Browser pool ready: {len(self.ports)} instances in {self.pool_dir}")
+
+    def watch(self):
+        while True:
+            time.sleep(HEALTH_CHECK_SEC)
+            for port in self.ports:
+                if self.procs[port].poll() is not None or not endpoint_alive(port):
+                    log(f"⚠️ Pooled browser :{port} died, restarting")
+                    self.kill(port)
+                    try:
+                        self.launch(port)
+                    except Exception as e:
+                        log(f"❌ Restart of :{port} failed: {e}")
+
+    def kill(self, port):
+        proc = self.procs.get(port)
+        if proc and proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    def stop(self):
+        try:
+            os.remove(os.path.join(self.pool_dir, POOL_FILE))
+        except FileNotFoundError:
+            pass
+        for port in self.ports:
+            self.kill(port)
+        log("🛑 Browser pool stopped")
+
+
+def serve(size):
+    pool = BrowserPool(size)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        pool.start()
+        pool.watch()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        pool.stop()
+
+
+def status():
+    pool = read_pool()
+    if not pool:
+        log("⚠️ No browser pool running")
+        return
+    for port in pool["ports"]:
+        with open(os.path.join(BROWSER_POOL_DIR, f"{port}.lock"), "a+") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                state = "free"
+            except BlockingIOError:
+                state = "leased"
+        log(f":{port} {'up' if endpoint_alive(port) else 'DOWN'} {state}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "start":
+        size = int(args[args.index("--size") + 1]) if "--size" in args else BROWSER_POOL_SIZE
+        serve(size)
+    elif args and args[0] == "status":
+        status()
+    else:
+        print("usage: python browser_service.py start [--size N] | status")
+        sys.exit(1)
@@ -0,0 +1,270 @@
+import os
+import re
+import sys
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# ---------------- CONFIG ---------------- #
+DATA_DIR = os.getenv("CANDLE_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+STORE_DIR = os.getenv("CANDLE_STORE_DIR", os.path.join(DATA_DIR, ".store"))
+
+FILE_RE = re.compile(r"^(?P<symbol>.+)_(?P<date>\d{4}-\d{2}-\d{2})\.csv$")
+
+# ts is epoch seconds (UTC); prices stay float64 like the yfinance source
+COLUMNS = {
+    "ts": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.int64,
+}
+INDEX_FILE = "index.json"
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+def to_epoch(value):
+    """Accepts epoch seconds, 'YYYY-MM-DD[ HH:MM[:SS]]' (UTC) or datetime-like values."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return int(ts.timestamp())
+
+
+# ---------------- CSV PARSING ---------------- #
+def read_candle_csv(path):
+    """Reads one data/<SYMBOL>_<DATE>.csv, skipping the yfinance ticker row."""
+    df = pd.read_csv(path, skiprows=[1])
+    df = df.rename(columns={c: c.strip().lower() for c in df.columns})
+    df = df.dropna(subset=["datetime", "close"])
+
+    ts = pd.to_datetime(df["datetime"], utc=True).dt.tz_localize(None).to_numpy().astype("datetime64[s]")
+    return {
+        "ts": ts.astype(np.int64),
+        "open": df["open"].to_numpy(dtype=np.float64),
+        "high": df["high"].to_numpy(dtype=np.float64),
+        "low": df["low"].to_numpy(dtype=np.float64),
+        "close": df["close"].to_numpy(dtype=np.float64),
+        "volume": df["volume"].fillna(0).to_numpy(dtype=np.int64),
+    }
+
+
+def list_csv_files(data_dir=DATA_DIR):
+    files = {}
+    for name in sorted(os.listdir(data_dir)):
+        match = FILE_RE.match(name)
+        if match:
+            files[name] = (match.group("symbol").upper(), match.group("date"))
+    return files
+
+
+# ---------------- STORE BUILD ---------------- #
+def _write_array(store_dir, name, arr):
+    tmp_path = os.path.join(store_dir, f"{name}.tmp.npy")
+    np.save(tmp_path, arr)
+    os.replace(tmp_path, os.path.join(store_dir, f"{name}.npy"))
+
+
+def build_store(data_dir=DATA_DIR, store_dir=STORE_DIR, force=False):
+    """Converts new/changed CSVs into the columnar store. Already converted segments are reused."""
+    os.makedirs(store_dir, exist_ok=True)
+    files = list_csv_files(data_dir)
+
+    old = CandleStore(store_dir) if os.path.exists(os.path.join(store_dir, INDEX_FILE)) and not force else None
+    old_files = old.index.get("files", {}) if old else {}
+
+    mtimes = {name: os.path.getmtime(os.path.join(data_dir, name)) for name in files}
+    todo = [name for name in files if old_files.get(name) != mtimes[name]]
+    if old and not todo:
+        log(f"✅ Candle store up to date ({len(files)} files).")
+        return old
+
+    # The store keeps one segment per symbol-day, so when one of several files of a
+    # symbol-day (e.g. differently-cased names) changed, all of them are re-read
+    stale_days = {files[name] for name in todo}
+    todo = [name for name in files if name in todo or files[name] in stale_days]
+
+    parts = []
+    reused = 0
+    if old:
+        for symbol, date in dict.fromkeys(files[name] for name in files if name not in todo and name in old_files):
+            seg = old.get(symbol, date)
+            if seg is not None:
+                parts.append((symbol, {k: np.array(v) for k, v in seg.items()}))
+                reused += 1
+
+    for name in todo:
+        symbol, _ = files[name]
+        try:
+            parts.append((symbol, read_candle_csv(os.path.join(data_dir, name))))
+        except Exception as e:
+            log(f"⚠️ Skipping {name}: {e}")
+            mtimes.pop(name, None)
+    log(f"🔄 Converted {len(todo)} CSV file(s), reused {reused} segment(s).")
+
+    if old:
+        old.close()
+
+    symbols = sorted({sym for sym, _ in parts})
+    sym_code = {sym: i for i, sym in enumerate(symbols)}
+    codes = np.concatenate([np.full(len(p["ts"]), sym_code[sym], dtype=np.int32) for sym, p in parts]) \
+        if parts else np.zeros(0, dtype=np.int32)
+    columns = {
+        col: np.concatenate([p[col] for _, p in parts]).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+        for col, dtype in COLUMNS.items()
+    }
+
+    # Sort by (symbol, ts) and drop duplicate minutes so each symbol is one contiguous, ordered run;
+    # the sort is stable and freshly read files come last, so the last row of a minute wins
+    order = np.lexsort((columns["ts"], codes))
+    codes = codes[order]
+    columns = {col: arr[order] for col, arr in columns.items()}
+    keep = np.ones(len(codes), dtype=bool)
+    keep[:-1] = (codes[1:] != codes[:-1]) | (columns["ts"][1:] != columns["ts"][:-1])
+    codes = codes[keep]
+    columns = {col: arr[keep] for col, arr in columns.items()}
+
+    for col, arr in columns.items():
+        _write_array(store_dir, col, arr)
+
+    # Symbol ranges plus per-date ranges (IST trading date from the file name)
+    index = {"symbols": {}, "dates": {}, "files": {n: mtimes[n] for n in files if n in mtimes}}
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.concatenate(([0], bounds)) if len(codes) else np.zeros(0, dtype=int)
+    ends = np.concatenate((bounds, [len(codes)])) if len(codes) else np.zeros(0, dtype=int)
+    ist_days = (columns["ts"] + 19800) // 86400
+    for start, end in zip(starts, ends):
+        sym = symbols[codes[start]]
+        index["symbols"][sym] = [int(start), int(end)]
+        days = ist_days[start:end]
+        day_bounds = np.flatnonzero(np.diff(days)) + 1
+        d_starts = np.concatenate(([0], day_bounds)) + start
+        d_ends = np.concatenate((day_bounds, [end - start])) + start
+        index["dates"][sym] = {
+            str(np.datetime64(int(days[s - start]), "D")): [int(s), int(e)]
+            for s, e in zip(d_starts, d_ends)
+        }
+
+    tmp_path = os.path.join(store_dir, INDEX_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, os.path.join(store_dir, INDEX_FILE))
+
+    log(f"✅ Candle store built: {len(symbols)} symbols, {len(codes)} candles → {store_dir}")
+    return CandleStore(store_dir)
+
+
+# ---------------- QUERY API ---------------- #
+class CandleStore:
+    """Read-only view over the memory-mapped columns. All returned arrays are zero-copy slices."""
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+            self.index = json.load(f)
+        self.columns = {
+            col: np.load(os.path.join(store_dir, f"{col}.npy"), mmap_mode="r")
+            for col in COLUMNS
+        }
+
+    def close(self):
+        self.columns = {}
+
+    def symbols(self):
+        return list(self.index["symbols"])
+
+    def dates(self, symbol):
+        return list(self.index["dates"].get(symbol.upper(), {}))
+
+    def _take(self, start, end, fields=None):
+        fields = fields or list(COLUMNS)
+        return {f: self.columns[f][start:end] for f in fields}
+
+    def get(self, symbol, date, fields=None):
+        """All candles of one symbol-day, or None."""
+        rng = self.index["dates"].get(symbol.upper(), {}).get(str(date))
+        return self._take(*rng, fields) if rng else None
+
+    def slice(self, symbol, start=None, end=None, fields=None):
+        """Candles of one symbol with start <= ts < end (binary search on the symbol's run)."""
+        rng = self.index["symbols"].get(symbol.upper())
+        if not rng:
+            return None
+        lo, hi = rng
+        ts = self.columns["ts"][lo:hi]
+        i = lo + (np.searchsorted(ts, to_epoch(start), "left") if start is not None else 0)
+        j = lo + (np.searchsorted(ts, to_epoch(end), "left") if end is not None else hi - lo)
+        return self._take(i, j, fields)
+
+    def align(self, symbols, start, end, field="close", ffill=False):
+        """Puts several symbols onto a common 1-minute grid [start, end).
+
+        Returns (grid, matrix) where grid is datetime64[s] and matrix is
+        len(symbols) x len(grid) float64 with NaN for missing minutes.
+        """
+        t0 = to_epoch(start) // 60 * 60
+        t1 = to_epoch(end)
+        n = max(0, (t1 - t0 + 59) // 60)
+        grid = (t0 + 60 * np.arange(n, dtype=np.int64)).astype("datetime64[s]")
+        matrix = np.full((len(symbols), n), np.nan)
+
+        for row, symbol in enumerate(symbols):
+            seg = self.slice(symbol, t0, t1, ["ts", field])
+            if not seg or not len(seg["ts"]):
+                continue
+            matrix[row, (seg["ts"] - t0) // 60] = seg[field]
+
+        if ffill and n:
+            idx = np.where(np.isnan(matrix), 0, np.arange(n))
+            np.maximum.accumulate(idx, axis=1, out=idx)
+            matrix = np.take_along_axis(matrix, idx, axis=1)
+        return grid, matrix
+
+
+# ---------------- BENCHMARK ---------------- #
+def benchmark(data_dir=DATA_DIR, store_dir=STORE_DIR, rounds=5):
+    files = list_csv_files(data_dir)
+    store = build_store(data_dir, store_dir)
+
+    def run_pandas():
+        total = 0
+        for name in files:
+            df = pd.read_csv(os.path.join(data_dir, name), header=[0, 1], index_col=0, parse_dates=True)
+            total += float(df.iloc[:, 0].sum())
+        return total
+
+    def run_store():
+        total = 0
+        for symbol, date in files.values():
+            seg = store.get(symbol, date, ["close"])
+            total += float(seg["close"].sum())
+        return total
+
+    for label, fn in (("pandas.read_csv", run_pandas), ("CandleStore", run_store)):
+        fn()
+        t = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        per_round = (time.perf_counter() - t) / rounds
+        log(f"⏱️ {label:16s}: {per_round * 1000:8.2f} ms for {len(files)} files")
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "build"
+
+    if cmd == "build":
+        build_store(force="--force" in sys.argv)
+    elif cmd == "bench":
+        benchmark()
+    else:
+        print("usage: python candles.py build [--force] | bench")
+        sys.exit(1)
@@ -0,0 +1,451 @@
+import os
+import re
+import time
+import base64
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+try:
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.common.action_chains import ActionChains
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+except ImportError:
+    # URL helpers and the Playwright engine work without selenium
+    By = Keys = ActionChains = WebDriverWait = EC = None
+
+from browser import setup_driver, log_page_stats, ensure_tv_session, hold_overlays, POPUP_SELECTOR
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+# "cdp" uses Page.captureScreenshot, "selenium" the old WebDriver screenshot
+CAPTURE_BACKEND = os.getenv("CAPTURE_BACKEND", "cdp").lower()
+CAPTURE_FORMAT = os.getenv("CAPTURE_FORMAT", "png").lower()     # png | jpeg | webp
+CAPTURE_QUALITY = int(os.getenv("CAPTURE_QUALITY", "85"))       # jpeg / webp only
+CAPTURE_SCALE = float(os.getenv("CAPTURE_SCALE", "1"))          # output scale, 0.5 = half size
+
+# Engine behind capture_many(): "selenium" (one page, sequential), "tabs" (one Chrome,
+# pipelined windows) or "playwright" (async, concurrent)
+CAPTURE_ENGINE = os.getenv("CAPTURE_ENGINE", "selenium").lower()
+TAB_PIPELINE_DEPTH = int(os.getenv("TAB_PIPELINE_DEPTH", "4"))   # charts loading at once
+TAB_POLL_SEC = 0.25
+
+# Load a chart layout once, then switch symbols inside the running app (Selenium engine)
+SYMBOL_SWITCH = os.getenv("SYMBOL_SWITCH", "0") == "1"
+SWITCH_WAIT_SEC = float(os.getenv("SWITCH_WAIT_SEC", "10"))     # new series drawn + ticker verified
+# Attach to a warm pooled browser from browser_service.py instead of launching one
+BROWSER_SERVICE = os.getenv("BROWSER_SERVICE", "0") == "1"
+
+SWITCH_SETTLE_SEC = float(os.getenv("SWITCH_SETTLE_SEC", "1"))
+# Day and week from one page load: both timeframes use the day chart URL and the
+# weekly view is reached by switching the interval in the page
+INTERVAL_SWITCH = os.getenv("INTERVAL_SWITCH", "0") == "1"
+TIMEFRAME_INTERVALS = {"day": "1D", "week": "1W"}
+
+CHART_XPATH = "//div[contains(@class,'chart-container')]"
+CHART_WAIT_SEC = 30
+
+
+def log(msg):
+    print(msg, flush=True)
+
+
+# =========================================================
+# CDP CAPTURE
+# =========================================================
+def element_clip(driver, element):
+    """Bounding box of the element in page CSS pixels, as a CDP clip rectangle."""
+    rect = driver.execute_script(
+        """
+        const r = arguments[0].getBoundingClientRect();
+        return {x: r.left + window.scrollX, y: r.top + window.scrollY, width: r.width, height: r.height};
+        """,
+        element
+    )
+    return {k: float(v) for k, v in rect.items()}
+
+
+def viewport_clip(driver):
+    metrics = driver.execute_cdp_cmd("Page.getLayoutMetrics", {})
+    vp = metrics.get("cssVisualViewport") or metrics["visualViewport"]
+    return {"x": float(vp["pageX"]), "y": float(vp["pageY"]),
+            "width": float(vp["clientWidth"]), "height": float(vp["clientHeight"])}
+
+
+def cdp_screenshot(driver, clip=None, fmt=CAPTURE_FORMAT, quality=CAPTURE_QUALITY, scale=CAPTURE_SCALE):
+    """Page.captureScreenshot straight from the compositor; returns the encoded bytes."""
+    params = {"format": fmt, "fromSurface": True, "captureBeyondViewport": False}
+    if fmt in ("jpeg", "webp"):
+        params["quality"] = quality
+    if clip is None and scale != 1:
+        clip = viewport_clip(driver)
+    if clip is not None:
+        params["clip"] = {**clip, "scale": scale}
+
+    result = driver.execute_cdp_cmd("Page.captureScreenshot", params)
+    return base64.b64decode(result["data"])
+
+
+# =========================================================
+# CAPTURE INTERFACE USED BY THE BOTS
+# =========================================================
+def capture_element(driver, element):
+    """Screenshot of one element (the chart container)."""
+    if CAPTURE_BACKEND == "cdp":
+        try:
+            return cdp_screenshot(driver, element_clip(driver, element))
+        except Exception as e:
+            log(f"⚠️ CDP capture failed, falling back to WebDriver screenshot: {e}")
+    return element.screenshot_as_png
+
+
+def capture_page(driver):
+    """Screenshot of the visible viewport."""
+    if CAPTURE_BACKEND == "cdp":
+        try:
+            return cdp_screenshot(driver)
+        except Exception as e:
+            log(f"⚠️ CDP capture failed, falling back to WebDriver screenshot: {e}")
+    return driver.get_screenshot_as_png()
+
+
+def remove_popups(driver):
+    """One-shot removal of TradingView overlays; True when something was removed."""
+    return driver.execute_script(
+        """
+        var popups = document.querySelectorAll(arguments[0]);
+        popups.forEach(function(p) { p.remove(); });
+        document.body.style.overflow = 'auto';
+        document.body.style.position = 'static';
+        var chartElem = document.querySelector('.chart-container-border');
+        if (chartElem) { chartElem.click(); }
+        return popups.length > 0;
+        """,
+        POPUP_SELECTOR
+    )
+
+
+# =========================================================
+# IN-PLACE SYMBOL / INTERVAL SWITCH
+# =========================================================
+SYMBOL_SEARCH_BUTTON = "#header-toolbar-symbol-search"
+SYMBOL_SEARCH_INPUT = 'input[data-role="search"]'
+INTERVAL_BUTTON = "#header-toolbar-intervals"
+
+# Header button text and the main series legend (title + OHLC values)
+_SERIES_JS = """
+const btn = document.querySelector(arguments[0]);
+const legend = document.querySelector('[data-name="legend-series-item"]');
+return [btn ? btn.textContent.trim() : '', legend ? legend.textContent.trim() : ''];
+"""
+
+
+def chart_url_parts(url):
+    """(chart URL without symbol/interval parameters, symbol, interval)."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    params = dict(query)
+    rest = urlencode([(k, v) for k, v in query if k not in ("symbol", "interval")])
+    return urlunsplit(parts._replace(query=rest)), params.get("symbol"), params.get("interval")
+
+
+def with_interval(url, interval):
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "interval"]
+    return urlunsplit(parts._replace(query=urlencode(query + [("interval", interval)])))
+
+
+def timeframe_urls(urls):
+    """{"day": url, "week": url} as the bots should request them; with INTERVAL_SWITCH
+    both point at the day chart so the week capture is an in-page interval switch."""
+    day = urls.get("day")
+    if not (INTERVAL_SWITCH and day):
+        return urls
+    return {tf: with_interval(day, interval) for tf, interval in TIMEFRAME_INTERVALS.items()}
+
+
+def _norm_interval(value):
+    # "1D" and "D" are the same interval; the header shows either
+    value = (value or "").strip().upper()
+    return value[1:] if len(value) == 2 and value[0] == "1" and value[1] in "DWM" else value
+
+
+# characters NSE/BSE tickers are made of (M&M, BAJAJ-AUTO, NIFTY_50, BRK.B)
+_TICKER_TOKEN = re.compile(r"[A-Z0-9&._-]+")
+
+
+def ticker_matches(displayed, symbol):
+    # header shows the bare ticker, the URL usually has EXCHANGE:TICKER; compared as a whole
+    # token so a header still showing M&MFIN does not pass for M&M
+    return symbol.split(":")[-1].upper() in _TICKER_TOKEN.findall((displayed or "").upper())
+
+
+def switch_symbol(driver, symbol, wait_sec=SWITCH_WAIT_SEC):
+    """Types `symbol` into TradingView's symbol search on the loaded chart and waits
+    until the header shows it and the series legend has redrawn. True on success."""
+    _, before = driver.execute_script(_SERIES_JS, SYMBOL_SEARCH_BUTTON)
+
+    hold_overlays(driver)
+    try:
+        driver.find_element(By.CSS_SELECTOR, SYMBOL_SEARCH_BUTTON).click()
+        box = WebDriverWait(driver, wait_sec).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, SYMBOL_SEARCH_INPUT))
+        )
+        box.send_keys(Keys.CONTROL, "a")
+        box.send_keys(symbol)
+        box.send_keys(Keys.ENTER)
+    finally:
+        hold_overlays(driver, False)
+
+    deadline = time.monotonic() + wait_sec
+    while time.monotonic() < deadline:
+        ticker, legend = driver.execute_script(_SERIES_JS, SYMBOL_SEARCH_BUTTON)
+        if ticker_matches(ticker, symbol) and legend and legend != before:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def switch_interval(driver, interval, wait_sec=SWITCH_WAIT_SEC):
+    """Types `interval` on the focused chart (TradingView's interval dialog opens on the
+    leading digit) and waits for the header to show it and the series to redraw.
+    False when the interval header can't be read: the caller then does a full load."""
+    shown, before = driver.execute_script(_SERIES_JS, INTERVAL_BUTTON)
+    if not shown:
+        return False
+    if not interval[0].isdigit():
+        interval = "1" + interval     # a leading letter would open symbol search instead
+
+    driver.execute_script("var c = document.querySelector('.chart-container-border'); if (c) { c.click(); }")
+    hold_overlays(driver)
+    try:
+        ActionChains(driver).send_keys(interval).pause(0.2).send_keys(Keys.ENTER).perform()
+    finally:
+        hold_overlays(driver, False)
+
+    deadline = time.monotonic() + wait_sec
+    while time.monotonic() < deadline:
+        shown, legend = driver.execute_script(_SERIES_JS, INTERVAL_BUTTON)
+        if _norm_interval(shown) == _norm_interval(interval) and legend and legend != before:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+# =========================================================
+# CAPTURE BACKENDS
+# =========================================================
+# Every backend takes jobs as (key, url) pairs and yields (key, image bytes or None)
+# as captures finish; str(key) is used as log label.
+class SeleniumCapture:
+    """Sequential capture on one logged-in WebDriver.
+
+    With switch/interval_switch jobs are grouped by chart URL minus its symbol and
+    interval; the first job of a group loads the page, the rest switch the symbol
+    and/or interval in place (falling back to a full load when a switch can't be
+    verified).
+    """
+
+    def __init__(self, driver, settle_sec=6, wait_sec=CHART_WAIT_SEC, xpath=CHART_XPATH,
+                 cleanup=False, full_page=False, retries=1, switch=SYMBOL_SWITCH,
+                 interval_switch=INTERVAL_SWITCH):
+        self.driver = driver
+        self.settle_sec = settle_sec
+        self.wait_sec = wait_sec
+        self.xpath = xpath
+        self.cleanup = cleanup
+        self.full_page = full_page
+        self.retries = max(retries, 1)
+        self.switch = switch
+        self.interval_switch = interval_switch
+        self.loaded = None      # chart_url_parts() of the chart currently on screen
+        self.lease = None       # browser_service.Lease when attached to a pooled browser
+
+    def _load(self, url):
+        self.loaded = None
+        self.driver.get(url)
+        chart = WebDriverWait(self.driver, self.wait_sec).until(
+            EC.visibility_of_element_located((By.XPATH, self.xpath))
+        )
+        time.sleep(self.settle_sec)
+        return chart
+
+    def _switch(self, url, label):
+        if not self.loaded:
+            return None
+        base, symbol, interval = chart_url_parts(url)
+        loaded_base, loaded_symbol, loaded_interval = self.loaded
+        if base != loaded_base:
+            return None
+        symbol_change = symbol != loaded_symbol
+        interval_change = _norm_interval(interval) != _norm_interval(loaded_interval)
+        if (symbol_change and not (self.switch and symbol)) or \
+                (interval_change and not (self.interval_switch and interval)):
+            return None
+        try:
+            if symbol_change and not switch_symbol(self.driver, symbol):
+                log(f"⚠️ Symbol switch not confirmed for {label}, reloading")
+                return None
+            if interval_change and not switch_interval(self.driver, interval):
+                log(f"⚠️ Interval switch not confirmed for {label}, reloading")
+                return None
+            time.sleep(SWITCH_SETTLE_SEC)
+            return self.driver.find_element(By.XPATH, self.xpath)
+        except Exception as e:
+            log(f"⚠️ In-page switch failed for {label}, reloading: {e}")
+        return None
+
+    def capture(self, url, label=""):
+        for attempt in range(1, self.retries + 1):
+            try:
+                chart = self._switch(url, label) or self._load(url)
+                if self.cleanup and remove_popups(self.driver):
+                    log(f"    🧹 Popup removed for {label}")
+                img = capture_page(self.driver) if self.full_page else capture_element(self.driver, chart)
+                log_page_stats(self.driver, label)
+                self.loaded = chart_url_parts(url)
+                return img or None
+            except Exception as e:
+                self.loaded = None
+                log(f"❌ Capture failed for {label} (attempt {attempt}/{self.retries}): {e}")
+        return None
+
+    def capture_many(self, jobs):
+        if self.switch or self.interval_switch:
+            # same layout back to back (and a symbol's intervals together) so only the
+            # first chart of each group loads the page
+            jobs = sorted(jobs, key=lambda job: [p or "" for p in chart_url_parts(job[1])])
+        for key, url in jobs:
+            yield key, self.capture(url, str(key))
+
+    def close(self):
+        if self.lease:
+            self.lease.release(self.driver)
+            return
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+# Set on the old document right before a window is sent to its next URL, so the
+# readiness check never mistakes the previous chart for the new one
+_READY_JS = """
+if (window.__captureStale || document.readyState !== 'complete') { return false; }
+const el = document.evaluate(arguments[0], document, null,
+                             XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+return !!el && el.offsetWidth > 0 && el.offsetHeight > 0;
+"""
+
+
+class TabPipelineCapture(SeleniumCapture):
+    """Pipelined capture on one WebDriver: `depth` windows load the next charts while
+    the ready one is settled, captured and handed to the bot.
+
+    Each window is captured once its chart has been visible for settle_sec, then
+    recycled for the next job. Windows rather than tabs, so headless Chrome keeps
+    painting all of them (background tabs stop rendering). Every job is a full load.
+    """
+
+    def __init__(self, driver, depth=TAB_PIPELINE_DEPTH, **kwargs):
+        kwargs["switch"] = kwargs["interval_switch"] = False
+        super().__init__(driver, **kwargs)
+        self.depth = max(depth, 1)
+        self.windows = []
+
+    def _open_windows(self, n):
+        size = self.driver.get_window_size()
+        while len(self.windows) < n:
+            if self.windows:
+                self.driver.switch_to.new_window("window")
+                self.driver.set_window_size(size["width"], size["height"])
+                setup_driver(self.driver, popups=True)   # block list and observer are per target
+            self.windows.append(self.driver.current_window_handle)
+
+    def _start(self, handle, key, url):
+        self.driver.switch_to.window(handle)
+        self.driver.execute_script("window.__captureStale = true; window.location.href = arguments[0];", url)
+        return {"key": key, "started": time.monotonic(), "ready_at": None}
+
+    def _poll(self, handle, slot):
+        """Captured bytes, None on failure, or False while the chart is still loading."""
+        label = str(slot["key"])
+        now = time.monotonic()
+        try:
+            self.driver.switch_to.window(handle)
+            if slot["ready_at"] is None:
+                if self.driver.execute_script(_READY_JS, self.xpath):
+                    slot["ready_at"] = now
+                elif now - slot["started"] > self.wait_sec:
+                    raise TimeoutError(f"chart not visible after {self.wait_sec}s")
+                return False
+            if now - slot["ready_at"] < self.settle_sec:
+                return False
+
+            if self.cleanup and remove_popups(self.driver):
+                log(f"    🧹 Popup removed for {label}")
+            if self.full_page:
+                img = capture_page(self.driver)
+            else:
+                img = capture_element(self.driver, self.driver.find_element(By.XPATH, self.xpath))
+            return img or None
+        except Exception as e:
+            log(f"❌ Capture failed for {label}: {e}")
+            return None
+
+    def capture_many(self, jobs):
+        jobs = list(jobs)
+        if not jobs:
+            return
+        self._open_windows(min(self.depth, len(jobs)))
+        queue = iter(jobs)
+        slots = {}
+        for handle in self.windows:
+            job = next(queue, None)
+            slots[handle] = self._start(handle, *job) if job else None
+
+        while any(slots.values()):
+            idle = True
+            for handle, slot in slots.items():
+                if slot is None:
+                    continue
+                img = self._poll(handle, slot)
+                if img is False:
+                    continue
+                idle = False
+                yield slot["key"], img
+                job = next(queue, None)
+                slots[handle] = self._start(handle, *job) if job else None
+            if idle:
+                time.sleep(TAB_POLL_SEC)
+
+        log_page_stats(self.driver, f"{len(jobs)} charts over {len(self.windows)} windows")
+
+
+def open_capture_backend(driver_factory, login, **kwargs):
+    """Backend selected by CAPTURE_ENGINE; driver_factory/login are the bot's own
+    get_driver() and cookie injection, used by the Selenium engines (login is skipped
+    while a persistent profile still holds a session)."""
+    if CAPTURE_ENGINE == "playwright":
+        from pw_capture import PlaywrightCapture
+        return PlaywrightCapture(**kwargs)
+
+    lease = None
+    if BROWSER_SERVICE:
+        from browser_service import acquire
+        lease = acquire()
+        if not lease:
+            log("⚠️ Falling back to a local browser")
+
+    driver = lease.attach() if lease else driver_factory()
+    if not ensure_tv_session(driver, login, reuse=True if lease else None):
+        if lease:
+            lease.release(driver)
+        else:
+            driver.quit()
+        raise Exception("TradingView cookie injection failed.")
+    backend = TabPipelineCapture(driver, **kwargs) if CAPTURE_ENGINE == "tabs" else SeleniumCapture(driver, **kwargs)
+    backend.lease = lease
+    return backend
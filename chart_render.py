@@ -0,0 +1,194 @@
+import io
+import os
+import sys
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# ---------------- CONFIG ---------------- #
+CHART_WIDTH = int(os.getenv("CHART_WIDTH", "1280"))
+CHART_HEIGHT = int(os.getenv("CHART_HEIGHT", "720"))
+CHART_DPI = 100
+CHART_FORMAT = os.getenv("CHART_FORMAT", "png")
+# Bars shown per timeframe (overlays are computed on the full history first)
+CHART_BARS = {"day": int(os.getenv("CHART_DAY_BARS", "180")), "week": int(os.getenv("CHART_WEEK_BARS", "156"))}
+# "kind:window" list, kind is sma or ema
+CHART_OVERLAYS = os.getenv("CHART_OVERLAYS", "sma:20,sma:50")
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 2)))
+
+UP_COLOR = "#26a69a"
+DOWN_COLOR = "#ef5350"
+OVERLAY_COLORS = ["#2962ff", "#ff6d00", "#9c27b0", "#795548"]
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+# ---------------- SERIES ---------------- #
+def parse_overlays(spec=CHART_OVERLAYS):
+    out = []
+    for item in spec.split(","):
+        item = item.strip().lower()
+        if ":" in item:
+            kind, window = item.split(":", 1)
+            if kind in ("sma", "ema") and window.isdigit():
+                out.append((kind, int(window)))
+    return out
+
+
+def sma(close, window):
+    out = np.full(len(close), np.nan)
+    if len(close) >= window:
+        c = np.cumsum(np.insert(close, 0, 0.0))
+        out[window - 1:] = (c[window:] - c[:-window]) / window
+    return out
+
+
+def ema(close, window):
+    out = np.empty(len(close))
+    alpha = 2.0 / (window + 1)
+    acc = close[0] if len(close) else np.nan
+    for i, v in enumerate(close):
+        acc = alpha * v + (1 - alpha) * acc
+        out[i] = acc
+    out[:window - 1] = np.nan
+    return out
+
+
+def weekly_bars(dates, open_, high, low, close, volume):
+    """Daily bars -> Monday-anchored weekly bars."""
+    days = dates.astype("datetime64[D]")
+    monday = days - ((days.astype(np.int64) + 3) % 7).astype("timedelta64[D]")   # 1970-01-01 was a Thursday
+    weeks, start = np.unique(monday, return_index=True)
+    end = np.append(start[1:], len(days))
+    return (weeks,
+            open_[start],
+            np.maximum.reduceat(high, start),
+            np.minimum.reduceat(low, start),
+            close[end - 1],
+            np.add.reduceat(volume, start))
+
+
+# ---------------- RENDER ---------------- #
+def render_chart(symbol, timeframe, dates, open_, high, low, close, volume,
+                 overlays=None, bars=None, fmt=CHART_FORMAT):
+    """Candlesticks + volume + moving-average overlays -> encoded image bytes."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    if timeframe == "week":
+        dates, open_, high, low, close, volume = weekly_bars(dates, open_, high, low, close, volume)
+    overlays = parse_overlays() if overlays is None else overlays
+    lines = [(f"{kind.upper()} {w}", (sma if kind == "sma" else ema)(close, w)) for kind, w in overlays]
+
+    n = min(len(close), bars or CHART_BARS.get(timeframe, 180))
+    sl = slice(len(close) - n, len(close))
+    o, h, l, c, v, d = open_[sl], high[sl], low[sl], close[sl], volume[sl], dates[sl]
+    x = np.arange(n)
+    up = c >= o
+    colors = np.where(up, UP_COLOR, DOWN_COLOR)
+
+    fig = Figure(figsize=(CHART_WIDTH / CHART_DPI, CHART_HEIGHT / CHART_DPI), dpi=CHART_DPI)
+    FigureCanvasAgg(fig)
+    grid = fig.add_gridspec(4, 1, hspace=0.0)
+    ax = fig.add_subplot(grid[:3, 0])
+    axv = fig.add_subplot(grid[3, 0], sharex=ax)
+
+    # One LineCollection per layer instead of a Rectangle patch per bar: bodies are
+    # thick vertical lines sized to 70% of a bar slot
+    body_pt = max(CHART_WIDTH * 0.9 / n * 0.7 * 72 / CHART_DPI, 0.8)
+    tick = (h - l).max() * 0.001
+    ax.vlines(x, l, h, colors=colors, linewidth=0.8)
+    ax.vlines(x, np.minimum(o, c), np.maximum(np.maximum(o, c), np.minimum(o, c) + tick),
+              colors=colors, linewidth=body_pt)
+    for (label, series), color in zip(lines, OVERLAY_COLORS):
+        ax.plot(x, series[sl], color=color, linewidth=1.2, label=label)
+    if lines:
+        ax.legend(loc="upper left", fontsize=8, frameon=False)
+
+    axv.vlines(x, 0, v, colors=colors, alpha=0.6, linewidth=body_pt)
+    axv.set_ylim(0, v.max() * 1.05 if v.max() > 0 else 1)
+
+    ax.set_title(f"{symbol} · {'1D' if timeframe == 'day' else '1W'} · close {c[-1]:.2f}", loc="left", fontsize=11)
+    ax.yaxis.tick_right()
+    axv.yaxis.tick_right()
+    axv.set_yticks([])
+    for a in (ax, axv):
+        a.grid(color="#e0e3eb", linewidth=0.5)
+        a.set_xlim(-1, n)
+    ticks = np.linspace(0, n - 1, min(n, 8)).astype(int)
+    axv.set_xticks(ticks)
+    axv.set_xticklabels([str(d[i])[:10] for i in ticks], fontsize=8)
+    ax.tick_params(labelbottom=False)
+    fig.subplots_adjust(left=0.02, right=0.93, top=0.94, bottom=0.06)
+
+    buf = io.BytesIO()
+    # zlib level 1: ~10x faster PNG encode for flat chart graphics, slightly larger file
+    fig.savefig(buf, format=fmt, pil_kwargs={"compress_level": 1} if fmt == "png" else None)
+    return buf.getvalue()
+
+
+def _render_job(job):
+    symbol, timeframe = job[0], job[1]
+    try:
+        return symbol, timeframe, render_chart(*job)
+    except Exception as e:
+        log(f"⚠️ Render failed for {symbol} ({timeframe}): {e}")
+        return symbol, timeframe, None
+
+
+# ---------------- BATCH ---------------- #
+def panel_jobs(panel, symbols=None, timeframes=("day", "week")):
+    """(symbol, timeframe, dates, o, h, l, c, v) tuples from a mv2_engine.DailyPanel."""
+    row_of = {s: i for i, s in enumerate(panel.symbols)}
+    for symbol in symbols or panel.symbols:
+        i = row_of.get(symbol.upper())
+        if i is None:
+            continue
+        ok = ~np.isnan(panel.close[i])
+        if ok.sum() < 2:
+            continue
+        cols = [panel.dates[ok], panel.open[i, ok], panel.high[i, ok], panel.low[i, ok],
+                panel.close[i, ok], np.nan_to_num(panel.volume[i, ok])]
+        for tf in timeframes:
+            yield (symbol.upper(), tf, *cols)
+
+
+def render_many(jobs, workers=RENDER_WORKERS):
+    """Renders jobs in a process pool; yields (symbol, timeframe, bytes) in job order."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_render_job, jobs, chunksize=8)
+
+
+# ---------------- BENCHMARK ---------------- #
+def benchmark(n_charts=400):
+    from backtest import synthetic_panel
+
+    panel = synthetic_panel(n_symbols=n_charts // 2, years=3)
+    jobs = list(panel_jobs(panel))
+    t = time.perf_counter()
+    total = sum(len(img) for _, _, img in render_many(jobs) if img)
+    elapsed = time.perf_counter() - t
+    log(f"⏱️ {len(jobs)} charts in {elapsed:.1f}s with {RENDER_WORKERS} workers "
+        f"→ {len(jobs) / elapsed * 60:.0f} charts/min, avg {total / len(jobs) / 1e3:.0f} KB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark()
+        sys.exit(0)
+
+    from mv2_engine import load_panel
+
+    out_dir = os.getenv("CHART_OUT_DIR", os.path.join(os.getcwd(), "charts"))
+    os.makedirs(out_dir, exist_ok=True)
+    panel = load_panel()
+    for symbol, timeframe, img in render_many(list(panel_jobs(panel, sys.argv[1:] or None))):
+        if img:
+            path = os.path.join(out_dir, f"{symbol}_{timeframe}.{CHART_FORMAT}")
+            with open(path, "wb") as f:
+                f.write(img)
+    log(f"✅ Charts written to {out_dir}")
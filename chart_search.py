@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+
+from candles import build_store, to_epoch, DATA_DIR
+
+# ---------------- CONFIG ---------------- #
+INDEX_DIR = os.getenv("CHART_INDEX_DIR", os.path.join(DATA_DIR, ".chart_index"))
+
+SESSION_OPEN_UTC = "03:45"      # 09:15 IST
+SESSION_MINUTES = 375
+VECTOR_LEN = int(os.getenv("CHART_VECTOR_LEN", "64"))
+MIN_CANDLES = 30                # symbol-days with fewer candles are not indexed
+
+N_LISTS = int(os.getenv("CHART_N_LISTS", "256"))    # coarse clusters
+N_PROBE = int(os.getenv("CHART_N_PROBE", "8"))      # clusters scanned per query
+KMEANS_SAMPLE = 50_000
+KMEANS_ITER = 10
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+# ---------------- FEATURES ---------------- #
+def shape_vector(ts, close, session_start, length=VECTOR_LEN):
+    """Intraday close path -> fixed-length, zero-mean, unit-norm vector (None if too sparse).
+
+    The path is placed on the session minute grid, forward filled, expressed as
+    return from the first price and resampled, so price level and volatility
+    do not matter, only the shape.
+    """
+    minutes = (np.asarray(ts) - session_start) // 60
+    ok = (minutes >= 0) & (minutes < SESSION_MINUTES)
+    if ok.sum() < MIN_CANDLES:
+        return None
+
+    path = np.full(SESSION_MINUTES, np.nan)
+    path[minutes[ok]] = close[ok]
+    valid = ~np.isnan(path)
+    idx = np.maximum.accumulate(np.where(valid, np.arange(SESSION_MINUTES), 0))
+    path = path[idx]
+    first = np.flatnonzero(valid)[0]
+    path[:first] = path[first]
+
+    path = path / path[first] - 1.0
+    sample_at = np.linspace(0, SESSION_MINUTES - 1, length)
+    vec = np.interp(sample_at, np.arange(SESSION_MINUTES), path)
+    vec -= vec.mean()
+    norm = np.linalg.norm(vec)
+    if norm == 0:
+        return None
+    return (vec / norm).astype(np.float32)
+
+
+def extract_features(store):
+    keys, vectors = [], []
+    for symbol in store.symbols():
+        for day in store.dates(symbol):
+            seg = store.get(symbol, day, ["ts", "close"])
+            vec = shape_vector(seg["ts"], seg["close"], to_epoch(f"{day} {SESSION_OPEN_UTC}"))
+            if vec is not None:
+                keys.append(f"{symbol}|{day}")
+                vectors.append(vec)
+    vectors = np.vstack(vectors) if vectors else np.zeros((0, VECTOR_LEN), dtype=np.float32)
+    return keys, vectors
+
+
+# ---------------- INDEX ---------------- #
+def kmeans(vectors, k, iters=KMEANS_ITER, seed=0):
+    """Spherical k-means on unit vectors (assignment by max dot product)."""
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), min(len(vectors), KMEANS_SAMPLE), replace=False)]
+    centroids = sample[rng.choice(len(sample), k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(k):
+            members = sample[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+def assign_lists(vectors, centroids, chunk=65_536):
+    out = np.empty(len(vectors), dtype=np.int32)
+    for i in range(0, len(vectors), chunk):
+        out[i:i + chunk] = np.argmax(vectors[i:i + chunk] @ centroids.T, axis=1)
+    return out
+
+
+def build_index(keys, vectors, index_dir=INDEX_DIR, n_lists=N_LISTS):
+    """Inverted-file index: vectors stored grouped by nearest centroid."""
+    os.makedirs(index_dir, exist_ok=True)
+    n_lists = max(1, min(n_lists, len(vectors) // 8 or 1))
+    centroids = kmeans(vectors, n_lists)
+    lists = assign_lists(vectors, centroids)
+
+    order = np.argsort(lists, kind="stable")
+    offsets = np.searchsorted(lists[order], np.arange(n_lists + 1)).astype(np.int64)
+
+    np.save(os.path.join(index_dir, "vectors.npy"), vectors[order])
+    np.save(os.path.join(index_dir, "centroids.npy"), centroids)
+    np.save(os.path.join(index_dir, "offsets.npy"), offsets)
+    with open(os.path.join(index_dir, "keys.json"), "w", encoding="utf-8") as f:
+        json.dump([keys[i] for i in order], f)
+    log(f"✅ Chart index built: {len(vectors)} symbol-days, {n_lists} lists → {index_dir}")
+    return ChartIndex(index_dir)
+
+
+class ChartIndex:
+    def __init__(self, index_dir=INDEX_DIR):
+        self.vectors = np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode="r")
+        self.centroids = np.load(os.path.join(index_dir, "centroids.npy"))
+        self.offsets = np.load(os.path.join(index_dir, "offsets.npy"))
+        with open(os.path.join(index_dir, "keys.json"), "r", encoding="utf-8") as f:
+            self.keys = json.load(f)
+        self.key_pos = {k: i for i, k in enumerate(self.keys)}
+
+    def vector_of(self, symbol, date):
+        pos = self.key_pos.get(f"{symbol.upper()}|{date}")
+        return None if pos is None else np.asarray(self.vectors[pos])
+
+    def query(self, vec, k=10, n_probe=N_PROBE, exclude=None):
+        """Top-k most similar symbol-days as [(symbol, date, cosine), ...]."""
+        probe = np.argsort(self.centroids @ vec)[::-1][:n_probe]
+        spans = [(self.offsets[c], self.offsets[c + 1]) for c in probe]
+        cand = np.concatenate([np.arange(a, b) for a, b in spans]) if spans else np.zeros(0, dtype=np.int64)
+        if not len(cand):
+            return []
+
+        scores = np.asarray(self.vectors[cand]) @ vec
+        top = np.argsort(scores)[::-1][:k + (1 if exclude else 0)]
+        hits = []
+        for i in top:
+            key = self.keys[cand[i]]
+            if key == exclude:
+                continue
+            symbol, date = key.split("|")
+            hits.append((symbol, date, float(scores[i])))
+        return hits[:k]
+
+    def similar_to(self, symbol, date, k=10, n_probe=N_PROBE):
+        vec = self.vector_of(symbol, date)
+        if vec is None:
+            return []
+        return self.query(vec, k, n_probe, exclude=f"{symbol.upper()}|{date}")
+
+
+# ---------------- BENCHMARK ---------------- #
+def benchmark(n_symbols=2500, n_days=250, queries=200):
+    rng = np.random.default_rng(3)
+    n = n_symbols * n_days
+    # Random-walk paths give realistic, clustered shapes
+    steps = rng.normal(0, 1, (n, VECTOR_LEN)).astype(np.float32)
+    vectors = np.cumsum(steps, axis=1)
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    keys = [f"SYM{i // n_days}|D{i % n_days}" for i in range(n)]
+
+    bench_dir = os.path.join(INDEX_DIR, "bench")
+    t = time.perf_counter()
+    index = build_index(keys, vectors, bench_dir)
+    log(f"⏱️ Build ({n} vectors): {time.perf_counter() - t:.1f}s")
+
+    picks = rng.choice(n, queries, replace=False)
+    t = time.perf_counter()
+    truth = []
+    for i in picks:
+        exact = vectors @ vectors[i]
+        truth.append({keys[j] for j in np.argpartition(exact, -10)[-10:]})
+    brute = (time.perf_counter() - t) / queries
+
+    t = time.perf_counter()
+    results = [index.query(vectors[i], 10) for i in picks]
+    ivf = (time.perf_counter() - t) / queries
+
+    recall = np.mean([len(exp & {f"{s}|{d}" for s, d, _ in got}) / 10 for exp, got in zip(truth, results)])
+    log(f"⏱️ Brute force top-10: {brute * 1000:.2f} ms/query")
+    log(f"⏱️ IVF top-10 (n_probe={N_PROBE}): {ivf * 1000:.2f} ms/query, recall@10={recall:.2f}")
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "build"
+
+    if cmd == "build":
+        keys, vectors = extract_features(build_store())
+        if not len(vectors):
+            log("😴 No symbol-days with enough candles.")
+            sys.exit(0)
+        build_index(keys, vectors)
+    elif cmd == "query" and len(sys.argv) >= 4:
+        k = int(sys.argv[4]) if len(sys.argv) > 4 else 10
+        for symbol, date, score in ChartIndex().similar_to(sys.argv[2], sys.argv[3], k):
+            log(f"{score:6.3f} | {symbol} {date}")
+    elif cmd == "bench":
+        benchmark()
+    else:
+        print("usage: python chart_search.py build | query SYMBOL YYYY-MM-DD [k] | bench")
+        sys.exit(1)
@@ -8,11 +8,13 @@ import mysql.connector
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
+from mv2_engine import load_local_mv2
+from browser import prepare_options, setup_driver, SUPPRESS_POPUPS
+from capture import open_capture_backend, timeframe_urls
+from image_store import prepare_image, check_image_columns, finish_run, screenshot_sql, screenshot_values
+
 # ---------------- CONFIG ---------------- #
 STOCK_LIST_URL = "https://docs.google.com/spreadsheets/d/1V8DsH-R3vdUbXqDKZYWHk_8T0VRjqTEVyj7PhlIDtG4/edit#gid=0"
 STOCK_LIST_GID = 1400370843
@@ -31,6 +33,8 @@ CHART_WAIT_SEC = 30
 POST_LOAD_SLEEP = 5
 DB_RETRY = 3
 MAX_DAY_TO_KEEP = 4
+# "sheet" waits for the MV2 sheet formulas, "local" computes the columns with mv2_engine
+MV2_SOURCE = os.getenv("MV2_SOURCE", "sheet").lower()
 
 # ---------------- HELPERS ---------------- #
 def log(msg):
@@ -138,10 +142,28 @@ def get_driver():
     opts.add_argument("--disable-dev-shm-usage")
     opts.add_argument("--window-size=1920,1080")
     opts.add_argument("--disable-blink-features=AutomationControlled")
-    return webdriver.Chrome(
+    prepare_options(opts)
+    return setup_driver(webdriver.Chrome(
         service=Service(ChromeDriverManager().install()),
         options=opts
-    )
+    ), popups=True)
+
+def inject_tv_cookies(driver):
+    cookie_data = os.getenv("TRADINGVIEW_COOKIES")
+    if cookie_data:
+        driver.get("https://www.tradingview.com/")
+        for c in json.loads(cookie_data):
+            try:
+                driver.add_cookie({
+                    "name": c["name"],
+                    "value": c["value"],
+                    "domain": ".tradingview.com",
+                    "path": "/"
+                })
+            except:
+                continue
+        driver.refresh()
+    return True
 
 def main():
     try:
@@ -150,16 +172,24 @@ def main():
         log(f"❌ Initialization Fatal: {init_err}")
         return
 
-    driver = None
+    backend = None
     try:
         roll_days_forward(db)
 
+        cur = db.ensure().cursor()
+        check_image_columns(cur, TARGET_TABLE)
+        cur.close()
+
         # ---------------- LOAD DATA ---------------- #
         creds = os.getenv("GSPREAD_CREDENTIALS")
         client = gspread.service_account_from_dict(json.loads(creds))
 
-        mv2_sheet = client.open_by_url(MV2_SQL_URL).sheet1.get_all_values()
-        df_mv2 = pd.DataFrame(mv2_sheet[1:], columns=[c.strip() for c in mv2_sheet[0]])
+        if MV2_SOURCE == "local":
+            log("🧮 Computing MV2 columns locally...")
+            df_mv2 = load_local_mv2()
+        else:
+            mv2_sheet = client.open_by_url(MV2_SQL_URL).sheet1.get_all_values()
+            df_mv2 = pd.DataFrame(mv2_sheet[1:], columns=[c.strip() for c in mv2_sheet[0]])
         df_mv2 = fix_duplicate_columns(df_mv2)
 
         stock_ws = client.open_by_url(STOCK_LIST_URL).get_worksheet_by_id(STOCK_LIST_GID).get_all_values()
@@ -200,24 +230,10 @@ def main():
             symbols_found = d_sub.iloc[:, 0].astype(str).tolist()
             log(f"🔍 Filter Check: {name} | Found: {len(d_sub)} | Symbols: {', '.join(symbols_found) if symbols_found else 'None'}")
 
-        # ---------------- SETUP BROWSER ---------------- #
-        driver = get_driver()
-        cookie_data = os.getenv("TRADINGVIEW_COOKIES")
-        if cookie_data:
-            driver.get("https://www.tradingview.com/")
-            for c in json.loads(cookie_data):
-                try:
-                    driver.add_cookie({
-                        "name": c["name"],
-                        "value": c["value"],
-                        "domain": ".tradingview.com",
-                        "path": "/"
-                    })
-                except:
-                    continue
-            driver.refresh()
-
-        # ---------------- EXECUTE SCREENSHOTS ---------------- #
+        # ---------------- CAPTURE PLAN ---------------- #
+        # (symbol, tf) -> url; a symbol matched by several filters is captured once
+        capture_jobs = {}
+        pending = {}
         for filter_name, matched_df in triggers.items():
             if matched_df.empty:
                 continue
@@ -228,65 +244,53 @@ def main():
                 urls = url_map.get(symbol)
                 if not urls:
                     continue
+                urls = timeframe_urls(urls)
 
                 for tf in ["day", "week"]:
                     url = urls.get(tf)
                     if not url or "tradingview.com" not in url:
                         continue
+                    capture_jobs[(symbol, tf)] = url
+                    pending.setdefault((symbol, tf), []).append(filter_name)
 
-                    try:
-                        driver.get(url)
-                        chart = WebDriverWait(driver, CHART_WAIT_SEC).until(
-                            EC.visibility_of_element_located((By.XPATH, "//div[contains(@class,'chart-container')]"))
-                        )
-
-                        log(f"    ⏳ Waiting {POST_LOAD_SLEEP}s for late popups: {symbol} ({tf})...")
-                        time.sleep(POST_LOAD_SLEEP)
-
-                        # ---------------- REMOVE POPUPS ---------------- #
-                        was_removed = driver.execute_script("""
-                            var found = false;
-                            var popups = document.querySelectorAll('[class*="overlap-manager-root"], [class*="modal-"], [class*="dialog-"], [class*="backdrops-"]');
-                            if (popups.length > 0) {
-                                popups.forEach(function(p) { p.remove(); });
-                                found = true;
-                            }
-                            document.body.style.overflow = 'auto';
-                            document.body.style.position = 'static';
-                            var chartElem = document.querySelector('.chart-container-border');
-                            if(chartElem) { chartElem.click(); }
-                            return found;
-                        """)
-
-                        if was_removed:
-                            log(f"    🧹 Popup detected and removed for {symbol} ({tf})")
-                        else:
-                            log(f"    ✨ No popups found for {symbol} ({tf})")
-
-                        time.sleep(1)
-                        img = chart.screenshot_as_png
-
-                        conn = db.ensure()
-                        cur = conn.cursor()
-                        cur.execute(
-                            f"""
-                            INSERT INTO `{TARGET_TABLE}` (symbol, timeframe, filter_type, day, screenshot)
-                            VALUES (%s, %s, %s, 0, %s)
-                            """,
-                            (symbol, tf, filter_name, img)
-                        )
-                        cur.close()
-                        log(f"    ✅ Saved {symbol} ({tf})")
-
-                    except Exception as e:
-                        log(f"    ❌ Error {symbol} {tf}: {e}")
-
+        # ---------------- EXECUTE SCREENSHOTS ---------------- #
+        backend = open_capture_backend(get_driver, inject_tv_cookies, settle_sec=POST_LOAD_SLEEP,
+                                       wait_sec=CHART_WAIT_SEC, cleanup=not SUPPRESS_POPUPS)
+        log(f"📸 Capturing {len(capture_jobs)} charts...")
+        image_cols, image_marks, _ = screenshot_sql()
+        for (symbol, tf), img in backend.capture_many(capture_jobs.items()):
+            if not img:
+                continue
+            try:
+                image_values = screenshot_values(prepare_image(TARGET_TABLE, img, db.ensure()))
+            except Exception as e:
+                log(f"    ❌ Image store error {symbol} {tf}: {e}")
+                continue
+            for filter_name in pending[(symbol, tf)]:
+                try:
+                    conn = db.ensure()
+                    cur = conn.cursor()
+                    cur.execute(
+                        f"""
+                        INSERT INTO `{TARGET_TABLE}`
+                        (symbol, timeframe, filter_type, day, {image_cols})
+                        VALUES (%s, %s, %s, 0, {image_marks})
+                        """,
+                        (symbol, tf, filter_name) + image_values
+                    )
+                    cur.close()
+                    log(f"    ✅ Saved {symbol} ({tf}) [{filter_name}]")
+
+                except Exception as e:
+                    log(f"    ❌ Error {symbol} {tf}: {e}")
+
+        finish_run(db.ensure())
         log("🏁 Execution Finished.")
     except Exception as e:
         log(f"❌ Fatal: {e}")
     finally:
-        if driver:
-            driver.quit()
+        if backend:
+            backend.close()
         db.close()
 
 if __name__ == "__main__":
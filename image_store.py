@@ -0,0 +1,699 @@
+import os
+import sys
+import time
+import io
+import hashlib
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+# =========================================================
+# CONFIG
+# =========================================================
+# "" keeps screenshots inline as BLOBs, "local" / "s3" offload them
+IMAGE_STORE = os.getenv("IMAGE_STORE", "").lower()
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(os.getcwd(), "image_store"))
+
+# Any S3-compatible endpoint; a local MinIO works with S3_ENDPOINT_URL=http://localhost:9000
+S3_BUCKET = os.getenv("S3_BUCKET", "screenshots")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY")
+S3_SECRET_KEY = os.getenv("S3_SECRET_KEY")
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "database": os.getenv("DB_NAME"),
+    "port": int(os.getenv("DB_PORT", "3306")),
+}
+
+# Content-addressed mode: bytes are stored once in IMAGES_TABLE and the bot tables
+# only reference them by sha256
+IMAGE_DEDUP = os.getenv("IMAGE_DEDUP", "0") == "1"
+IMAGES_TABLE = "screenshot_images"
+
+# Thumbnail / preview generated next to every capture, keyed by the capture's sha256 (opt-in, needs Pillow)
+IMAGE_DERIVATIVES = os.getenv("IMAGE_DERIVATIVES", "0") == "1"
+DERIVATIVES_TABLE = "screenshot_derivatives"
+DERIVATIVE_WIDTHS = {
+    "thumb": int(os.getenv("THUMB_WIDTH", "320")),
+    "preview": int(os.getenv("PREVIEW_WIDTH", "960")),
+}
+DERIVATIVE_FORMAT = os.getenv("DERIVATIVE_FORMAT", "WEBP").upper()
+DERIVATIVE_QUALITY = int(os.getenv("DERIVATIVE_QUALITY", "80"))
+DERIVATIVE_WORKERS = int(os.getenv("DERIVATIVE_WORKERS", "2"))
+
+# Derivatives younger than this are never pruned (their row may not be inserted yet)
+PRUNE_MIN_AGE_HOURS = int(os.getenv("PRUNE_MIN_AGE_HOURS", "24"))
+PRUNE_BATCH = 500
+
+MIGRATE_BATCH = 200
+MIGRATE_PAUSE_SEC = 0.5
+
+# Tables that carry screenshots, with their primary key column
+SCREENSHOT_TABLES = {
+    "filter_alert_screenshots": "id",
+    "stock_screenshots": "id",
+    "filter": "id",
+    "live_screen": "id",
+    "another_screenshot": "id",
+}
+
+IMAGE_COLUMNS = {
+    "screenshot_key": "VARCHAR(255) NULL",
+    "screenshot_size": "INT UNSIGNED NULL",
+    "screenshot_sha256": "CHAR(64) NULL",
+}
+
+# Rows reference the image through IMAGE_COLUMNS only when a feature needs it; with the
+# defaults (inline BLOBs, no dedup, no derivatives) the bots write just `screenshot` as
+# before and the tables need no schema step
+IMAGE_REFS = bool(IMAGE_STORE) or IMAGE_DEDUP or IMAGE_DERIVATIVES
+SCREENSHOT_COLUMNS = ["screenshot"] + (list(IMAGE_COLUMNS) if IMAGE_REFS else [])
+
+
+def log(msg):
+    print(msg, flush=True)
+
+
+def image_ext(data):
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "jpg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "bin"
+
+
+CONTENT_TYPES = {"png": "image/png", "jpg": "image/jpeg", "webp": "image/webp", "bin": "application/octet-stream"}
+
+
+# =========================================================
+# STORES
+# =========================================================
+class LocalImageStore:
+    """Directory tree; keys are relative paths."""
+
+    def __init__(self, root=IMAGE_STORE_DIR):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def put(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3ImageStore:
+    """S3 or any S3-compatible object store (MinIO for local runs)."""
+
+    def __init__(self, bucket=S3_BUCKET, endpoint_url=S3_ENDPOINT_URL):
+        import boto3
+        from botocore.exceptions import ClientError
+
+        self._client_error = ClientError
+        self.bucket = bucket
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=S3_REGION,
+            aws_access_key_id=S3_ACCESS_KEY,
+            aws_secret_access_key=S3_SECRET_KEY,
+        )
+
+    def put(self, key, data):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data,
+                               ContentType=CONTENT_TYPES[image_ext(data)])
+
+    def get(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except self._client_error:
+            return False
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+_store = None
+
+def get_image_store():
+    """Configured store, or None when screenshots stay inline."""
+    global _store
+    if _store is None and IMAGE_STORE:
+        if IMAGE_STORE == "s3":
+            _store = S3ImageStore()
+        elif IMAGE_STORE == "local":
+            _store = LocalImageStore()
+        else:
+            raise ValueError(f"Unknown IMAGE_STORE: {IMAGE_STORE}")
+    return _store
+
+
+# =========================================================
+# WRITE PATH USED BY THE BOTS
+# =========================================================
+def make_key(table, data, sha):
+    return f"{table}/{datetime.utcnow():%Y/%m/%d}/{sha}.{image_ext(data)}"
+
+
+def content_key(data, sha):
+    return f"images/{sha[:2]}/{sha}.{image_ext(data)}"
+
+
+class DedupStats:
+    def __init__(self):
+        self.captures = 0
+        self.new_images = 0
+        self.bytes_in = 0
+        self.bytes_stored = 0
+
+    def add(self, size, is_new):
+        self.captures += 1
+        self.bytes_in += size
+        if is_new:
+            self.new_images += 1
+            self.bytes_stored += size
+
+    def report(self):
+        if not self.captures:
+            return
+        ratio = self.captures / max(self.new_images, 1)
+        log(
+            f"♻️ Dedup: {self.captures} captures → {self.new_images} new images "
+            f"(ratio {ratio:.2f}x, {(self.bytes_in - self.bytes_stored) / 1e6:.1f} MB not stored again)"
+        )
+
+
+dedup_stats = DedupStats()
+_known_keys = {}
+
+
+def register_image(conn, data, sha):
+    """Stores the bytes once under their sha256; returns the storage key (None when inline)."""
+    ext = image_ext(data)
+    store = get_image_store()
+    key = content_key(data, sha) if store is not None else None
+
+    cur = conn.cursor()
+    try:
+        exists = sha in _known_keys
+        if exists:
+            key = _known_keys[sha]
+        else:
+            cur.execute(f"SELECT storage_key FROM `{IMAGES_TABLE}` WHERE sha256 = %s", (sha,))
+            row = cur.fetchone()
+            if row is not None:
+                exists = True
+                key = row["storage_key"] if isinstance(row, dict) else row[0]
+
+        if exists:
+            cur.execute(f"UPDATE `{IMAGES_TABLE}` SET last_seen_at = CURRENT_TIMESTAMP WHERE sha256 = %s", (sha,))
+            is_new = False
+        else:
+            if store is not None:
+                store.put(key, data)
+            cur.execute(
+                f"""
+                INSERT IGNORE INTO `{IMAGES_TABLE}` (sha256, size, ext, storage_key, data)
+                VALUES (%s, %s, %s, %s, %s)
+                """,
+                (sha, len(data), ext, key, None if store is not None else data)
+            )
+            # another bot may have inserted the same bytes in the meantime
+            is_new = cur.rowcount == 1
+    finally:
+        cur.close()
+
+    _known_keys[sha] = key
+    dedup_stats.add(len(data), is_new)
+    return key
+
+
+def prepare_image(table, data, conn=None):
+    """Returns (blob, key, size, sha256) for the screenshot columns.
+
+    With IMAGE_DEDUP and a connection the bytes are registered once in
+    screenshot_images and only referenced from the row. Otherwise, with a
+    store configured the bytes go to the store and blob is None; without
+    one the bytes stay inline and key is None.
+    """
+    if not data:
+        return None, None, None, None
+    sha = hashlib.sha256(data).hexdigest()
+    if conn is not None:
+        derivatives.drain(conn)
+        derivatives.submit(data, sha)
+    if IMAGE_DEDUP and conn is not None:
+        return None, register_image(conn, data, sha), len(data), sha
+
+    store = get_image_store()
+    if store is None:
+        return data, None, len(data), sha
+
+    key = make_key(table, data, sha)
+    store.put(key, data)
+    return None, key, len(data), sha
+
+
+def screenshot_values(prepared):
+    """prepare_image() result trimmed to SCREENSHOT_COLUMNS."""
+    return tuple(prepared)[:len(SCREENSHOT_COLUMNS)]
+
+
+def screenshot_sql():
+    """(columns, placeholders, ON DUPLICATE KEY UPDATE assignments) for SCREENSHOT_COLUMNS."""
+    return (", ".join(SCREENSHOT_COLUMNS),
+            ", ".join(["%s"] * len(SCREENSHOT_COLUMNS)),
+            ", ".join(f"{col} = VALUES({col})" for col in SCREENSHOT_COLUMNS))
+
+
+# =========================================================
+# DERIVATIVES (THUMBNAIL / PREVIEW)
+# =========================================================
+def make_derivatives(data, widths=None, fmt=DERIVATIVE_FORMAT, quality=DERIVATIVE_QUALITY):
+    """Runs in a worker process: {variant: (bytes, width, height)}, incl. 'full' dimensions."""
+    from PIL import Image
+
+    widths = widths or DERIVATIVE_WIDTHS
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    out = {"full": (None, img.width, img.height)}
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    for variant, width in widths.items():
+        small = img.copy()
+        if width < small.width:
+            small = small.resize((width, round(small.height * width / small.width)), Image.LANCZOS)
+        buf = io.BytesIO()
+        small.save(buf, fmt, quality=quality)
+        out[variant] = (buf.getvalue(), small.width, small.height)
+    return out
+
+
+class DerivativeQueue:
+    """Downscales captures in a process pool; results are written on drain() so the
+    browser loop only pays for a submit."""
+
+    def __init__(self, workers=DERIVATIVE_WORKERS):
+        self.workers = workers
+        self.pool = None
+        self.pending = {}
+        self.done = set()
+        self.enabled = IMAGE_DERIVATIVES
+        if self.enabled:
+            try:
+                import PIL  # noqa: F401
+            except ImportError:
+                log("⚠️ Pillow not installed, thumbnails disabled.")
+                self.enabled = False
+
+    def submit(self, data, sha):
+        if not self.enabled or sha in self.done or sha in self.pending:
+            return
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.pending[sha] = self.pool.submit(make_derivatives, data)
+
+    def drain(self, conn, wait=False):
+        """Writes finished derivatives; with wait=True blocks until all are done."""
+        written = 0
+        for sha, future in list(self.pending.items()):
+            if not wait and not future.done():
+                continue
+            del self.pending[sha]
+            self.done.add(sha)
+            try:
+                save_derivatives(conn, sha, future.result())
+                written += 1
+            except Exception as e:
+                log(f"⚠️ Thumbnail failed for {sha[:12]}: {e}")
+        return written
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+
+def save_derivatives(conn, sha, variants):
+    store = get_image_store()
+    ext = DERIVATIVE_FORMAT.lower()
+    rows = []
+    for variant, (data, width, height) in variants.items():
+        key = None
+        if data is not None and store is not None:
+            key = f"derivatives/{variant}/{sha[:2]}/{sha}.{ext}"
+            store.put(key, data)
+        rows.append((sha, variant, width, height, len(data) if data is not None else None,
+                     key, None if key else data))
+
+    cur = conn.cursor()
+    cur.executemany(
+        f"""
+        INSERT INTO `{DERIVATIVES_TABLE}` (sha256, variant, width, height, size, storage_key, data)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            width = VALUES(width), height = VALUES(height), size = VALUES(size),
+            storage_key = VALUES(storage_key), data = VALUES(data)
+        """,
+        rows
+    )
+    cur.close()
+
+
+def ensure_derivatives_table(cursor):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS `{DERIVATIVES_TABLE}` (
+            sha256 CHAR(64) NOT NULL,
+            variant VARCHAR(16) NOT NULL,
+            width SMALLINT UNSIGNED NOT NULL,
+            height SMALLINT UNSIGNED NOT NULL,
+            size INT UNSIGNED NULL,
+            storage_key VARCHAR(255) NULL,
+            data MEDIUMBLOB NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (sha256, variant)
+        ) ENGINE=InnoDB
+    """)
+
+
+derivatives = DerivativeQueue()
+
+
+def table_exists(cursor, table):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,)
+    )
+    return cursor.fetchone() is not None
+
+
+def sha_tables(cursor):
+    """Screenshot tables that exist and carry screenshot_sha256."""
+    cursor.execute(
+        """
+        SELECT TABLE_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND COLUMN_NAME = 'screenshot_sha256'
+        """
+    )
+    found = {row["TABLE_NAME"] if isinstance(row, dict) else row[0] for row in cursor.fetchall()}
+    return [t for t in SCREENSHOT_TABLES if t in found]
+
+
+def prune_derivatives(conn, batch=PRUNE_BATCH, min_age_hours=PRUNE_MIN_AGE_HOURS):
+    """Deletes derivatives whose sha256 no screenshot table references any more
+    (rows removed by retention, snapshot swaps or truncates), with their store objects."""
+    cur = conn.cursor()
+    try:
+        if not table_exists(cur, DERIVATIVES_TABLE):
+            return 0
+        tables = sha_tables(cur)
+        unreferenced = " AND ".join(
+            f"NOT EXISTS (SELECT 1 FROM `{t}` x WHERE x.screenshot_sha256 = d.sha256)" for t in tables
+        ) or "1 = 1"
+        store = get_image_store()
+        pruned = 0
+        while True:
+            cur.execute(
+                f"""
+                SELECT DISTINCT d.sha256 FROM `{DERIVATIVES_TABLE}` d
+                WHERE d.created_at < NOW() - INTERVAL %s HOUR AND {unreferenced}
+                LIMIT %s
+                """,
+                (min_age_hours, batch)
+            )
+            shas = [row["sha256"] if isinstance(row, dict) else row[0] for row in cur.fetchall()]
+            if not shas:
+                break
+            marks = ", ".join(["%s"] * len(shas))
+            if store is not None:
+                cur.execute(
+                    f"SELECT storage_key FROM `{DERIVATIVES_TABLE}` "
+                    f"WHERE sha256 IN ({marks}) AND storage_key IS NOT NULL",
+                    shas
+                )
+                for row in cur.fetchall():
+                    store.delete(row["storage_key"] if isinstance(row, dict) else row[0])
+            cur.execute(f"DELETE FROM `{DERIVATIVES_TABLE}` WHERE sha256 IN ({marks})", shas)
+            conn.commit()
+            pruned += len(shas)
+            if len(shas) < batch:
+                break
+        if pruned:
+            log(f"🧹 Pruned derivatives of {pruned} unreferenced screenshots")
+        return pruned
+    finally:
+        cur.close()
+
+
+def finish_run(conn):
+    """End of a bot run: waits for pending thumbnails and reports the dedup ratio."""
+    if derivatives.pending:
+        log(f"🖼️ Waiting for {len(derivatives.pending)} thumbnails...")
+    written = derivatives.drain(conn, wait=True)
+    derivatives.close()
+    if written or derivatives.done:
+        log(f"🖼️ Thumbnails written: {len(derivatives.done)}")
+    dedup_stats.report()
+
+
+def load_image(blob, key, sha=None, conn=None):
+    """Reads a screenshot back regardless of where it lives."""
+    if blob:
+        return blob
+    if key:
+        store = get_image_store() or LocalImageStore()
+        return store.get(key)
+    if sha and conn is not None:
+        cur = conn.cursor()
+        cur.execute(f"SELECT data FROM `{IMAGES_TABLE}` WHERE sha256 = %s", (sha,))
+        row = cur.fetchone()
+        cur.close()
+        if row:
+            return row["data"] if isinstance(row, dict) else row[0]
+    return None
+
+
+def ensure_images_table(cursor):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS `{IMAGES_TABLE}` (
+            sha256 CHAR(64) NOT NULL PRIMARY KEY,
+            size INT UNSIGNED NOT NULL,
+            ext VARCHAR(8) NOT NULL,
+            storage_key VARCHAR(255) NULL,
+            data LONGBLOB NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            last_seen_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB
+    """)
+
+
+def check_image_columns(cursor, table):
+    """Read-only schema check the bots run at start; raises with the command to run
+    when `python image_store.py schema` has not been applied for the enabled features.
+    Passes on the existing schema when all image features are off."""
+    if not IMAGE_REFS:
+        return
+    cursor.execute(
+        """
+        SELECT COLUMN_NAME, IS_NULLABLE
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """,
+        (table,)
+    )
+    existing = {}
+    for row in cursor.fetchall():
+        name, nullable = (row["COLUMN_NAME"], row["IS_NULLABLE"]) if isinstance(row, dict) else row
+        existing[name] = nullable
+
+    problems = [f"missing `{table}`.`{col}`" for col in SCREENSHOT_COLUMNS[1:] if col not in existing]
+    if (IMAGE_STORE or IMAGE_DEDUP) and existing.get("screenshot") == "NO":
+        problems.append(f"`{table}`.`screenshot` is NOT NULL but screenshots are offloaded")
+    if IMAGE_DEDUP and not table_exists(cursor, IMAGES_TABLE):
+        problems.append(f"missing `{IMAGES_TABLE}`")
+    if derivatives.enabled and not table_exists(cursor, DERIVATIVES_TABLE):
+        problems.append(f"missing `{DERIVATIVES_TABLE}`")
+    if problems:
+        raise RuntimeError(f"Image schema not ready ({'; '.join(problems)}): "
+                           f"run `python image_store.py schema {table}` first.")
+
+
+def ensure_image_columns(cursor, table):
+    """Schema step (python image_store.py schema / migrate): adds screenshot_key/size/sha256
+    if missing, lets screenshot be NULL and creates the tables of the enabled features."""
+    if IMAGE_DEDUP:
+        ensure_images_table(cursor)
+    if derivatives.enabled:
+        ensure_derivatives_table(cursor)
+
+    cursor.execute(
+        """
+        SELECT COLUMN_NAME, IS_NULLABLE
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """,
+        (table,)
+    )
+    rows = cursor.fetchall()
+    existing = {}
+    for row in rows:
+        name, nullable = (row["COLUMN_NAME"], row["IS_NULLABLE"]) if isinstance(row, dict) else row
+        existing[name] = nullable
+
+    for col, ddl in IMAGE_COLUMNS.items():
+        if col not in existing:
+            cursor.execute(f"ALTER TABLE `{table}` ADD COLUMN `{col}` {ddl}")
+            log(f"🛠️ Added `{table}`.`{col}`")
+            if col == "screenshot_sha256":
+                cursor.execute(f"ALTER TABLE `{table}` ADD INDEX `idx_screenshot_sha256` (`screenshot_sha256`)")
+
+    if existing.get("screenshot") == "NO":
+        cursor.execute(f"ALTER TABLE `{table}` MODIFY `screenshot` LONGBLOB NULL")
+        log(f"🛠️ `{table}`.`screenshot` is now nullable")
+
+
+# =========================================================
+# MIGRATION: MOVE EXISTING BLOBS OUT
+# =========================================================
+def migrate_table(conn, table, pk="id", batch=MIGRATE_BATCH, limit=None):
+    store = get_image_store()
+    if store is None and not IMAGE_DEDUP:
+        raise RuntimeError("Set IMAGE_STORE=local|s3 and/or IMAGE_DEDUP=1 before migrating.")
+
+    cur = conn.cursor()
+    ensure_image_columns(cur, table)
+    conn.commit()
+
+    moved = 0
+    moved_bytes = 0
+    last_pk = 0
+    while limit is None or moved < limit:
+        # Short batches keyed on the PK, committed one by one, so captures never wait on a long lock
+        cur.execute(
+            f"""
+            SELECT `{pk}`, screenshot
+            FROM `{table}`
+            WHERE `{pk}` > %s AND screenshot IS NOT NULL AND screenshot_key IS NULL
+            ORDER BY `{pk}`
+            LIMIT %s
+            """,
+            (last_pk, batch)
+        )
+        rows = cur.fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for row_pk, data in rows:
+            last_pk = row_pk
+            data = bytes(data)
+            sha = hashlib.sha256(data).hexdigest()
+            try:
+                if IMAGE_DEDUP:
+                    key = register_image(conn, data, sha)
+                else:
+                    key = make_key(table, data, sha)
+                    store.put(key, data)
+            except Exception as e:
+                log(f"⚠️ {table} {pk}={row_pk}: upload failed, left inline: {e}")
+                continue
+            updates.append((key, len(data), sha, row_pk))
+            moved_bytes += len(data)
+
+        cur.executemany(
+            f"""
+            UPDATE `{table}`
+            SET screenshot_key = %s, screenshot_size = %s, screenshot_sha256 = %s, screenshot = NULL
+            WHERE `{pk}` = %s
+            """,
+            updates
+        )
+        conn.commit()
+        moved += len(updates)
+        log(f"    ↳ {table}: {moved} moved ({moved_bytes / 1e6:.1f} MB), last {pk}={last_pk}")
+        time.sleep(MIGRATE_PAUSE_SEC)
+
+    cur.close()
+    log(f"✅ {table}: migration finished, {moved} screenshots moved out.")
+    dedup_stats.report()
+    return moved
+
+
+if __name__ == "__main__":
+    import mysql.connector
+
+    args = sys.argv[1:]
+    if not args or args[0] not in ("schema", "migrate", "prune-derivatives"):
+        print("usage: python image_store.py schema [TABLE ...]\n"
+              "       python image_store.py migrate [TABLE ...] [--batch N] [--limit N]\n"
+              "       python image_store.py prune-derivatives")
+        sys.exit(1)
+
+    if args[0] == "schema":
+        conn = mysql.connector.connect(**DB_CONFIG)
+        try:
+            cur = conn.cursor()
+            for table in args[1:] or list(SCREENSHOT_TABLES):
+                if table_exists(cur, table):
+                    ensure_image_columns(cur, table)
+                    log(f"✅ `{table}` schema ready")
+            cur.close()
+            conn.commit()
+        finally:
+            conn.close()
+        sys.exit(0)
+
+    if args[0] == "prune-derivatives":
+        conn = mysql.connector.connect(**DB_CONFIG)
+        try:
+            prune_derivatives(conn)
+        finally:
+            conn.close()
+        sys.exit(0)
+
+    def opt(name, default=None):
+        if name in args:
+            i = args.index(name)
+            val = args[i + 1]
+            del args[i:i + 2]
+            return int(val)
+        return default
+
+    batch = opt("--batch", MIGRATE_BATCH)
+    limit = opt("--limit")
+    tables = args[1:] or list(SCREENSHOT_TABLES)
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        for table in tables:
+            log(f"🚚 Migrating `{table}` → {IMAGE_STORE or IMAGES_TABLE} ...")
+            migrate_table(conn, table, SCREENSHOT_TABLES.get(table, "id"), batch, limit)
+    finally:
+        conn.close()
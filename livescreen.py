@@ -1,6 +1,7 @@
 import os
 import time
 import json
+import queue
 import gspread
 import pandas as pd
 import mysql.connector
@@ -15,12 +16,22 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
+from scanner import scanner_from_store
+from browser import prepare_options, setup_driver, log_page_stats
+from capture import capture_page
+from image_store import (prepare_image, check_image_columns, finish_run, prune_derivatives, screenshot_values,
+                         IMAGE_DERIVATIVES, SCREENSHOT_COLUMNS)
+from staging import StagingTable, PUBLISH_MODE
+
 # ---------------- CONFIG ---------------- #
 STOCK_LIST_URL = "https://docs.google.com/spreadsheets/d/1V8DsH-R3vdUbXqDKZYWHk_8T0VRjqTEVyj7PhlIDtG4/edit#gid=0"
 STOCK_LIST_GID = 1400370843
 SOURCE_TABLE = "wp_live_close"
 TARGET_TABLE = "live_screen"
 CHANGE_THRESHOLD = 7.0 
+# "db" reads real_change from wp_live_close, "scanner" scans the local minute candles
+SIGNAL_SOURCE = os.getenv("SIGNAL_SOURCE", "db").lower()
+LIVE_COLUMNS = ["symbol", "timeframe", "real_change", "real_close", *SCREENSHOT_COLUMNS, "created_at"]
 
 # ---------------- DRIVER ---------------- #
 def get_optimized_driver():
@@ -29,17 +40,36 @@ def get_optimized_driver():
     opts.add_argument("--no-sandbox")
     opts.add_argument("--disable-dev-shm-usage")
     opts.add_argument("--window-size=1920,1080")
+    prepare_options(opts)
     
     driver = webdriver.Chrome(
         service=Service(ChromeDriverManager().install()),
         options=opts
     )
-    return driver
+    return setup_driver(driver, popups=True)
+
+# ---------------- SIGNALS ---------------- #
+def fetch_signals(cur, capture_queue):
+    if SIGNAL_SOURCE == "scanner":
+        session_date = datetime.utcnow().strftime("%Y-%m-%d")
+        scanner = scanner_from_store(session_date, thresholds={"change_pct": CHANGE_THRESHOLD}, only=True)
+        return scanner.emit(capture_queue)
+
+    cur.execute(f"""
+        SELECT Symbol, real_close, real_change 
+        FROM `{SOURCE_TABLE}` 
+        WHERE CAST(real_change AS DECIMAL(10,2)) >= %s
+    """, (CHANGE_THRESHOLD,))
+    rows = cur.fetchall()
+    for row in rows:
+        capture_queue.put(row)
+    return len(rows)
 
 # ---------------- MAIN ---------------- #
 def main():
     driver = None
     db_conn = None
+    stage = None
 
     try:
         # Use UTC for logging
@@ -56,21 +86,23 @@ def main():
         )
         cur = db_conn.cursor(dictionary=True)
 
-        # ✅ CLEAR OLD DATA
-        print("🧹 Clearing old data...")
-        cur.execute(f"TRUNCATE TABLE `{TARGET_TABLE}`")
+        check_image_columns(cur, TARGET_TABLE)
+        if PUBLISH_MODE == "swap":
+            # ✅ BUILD NEXT SNAPSHOT, readers keep the previous one until publish
+            stage = StagingTable(db_conn, TARGET_TABLE, LIVE_COLUMNS).create()
+        else:
+            # ✅ CLEAR OLD DATA
+            print("🧹 Clearing old data...")
+            cur.execute(f"TRUNCATE TABLE `{TARGET_TABLE}`")
 
         # ---------------- FETCH STOCKS ---------------- #
-        cur.execute(f"""
-            SELECT Symbol, real_close, real_change 
-            FROM `{SOURCE_TABLE}` 
-            WHERE CAST(real_change AS DECIMAL(10,2)) >= %s
-        """, (CHANGE_THRESHOLD,))
-        
-        stocks = cur.fetchall()
-
-        if not stocks:
+        capture_queue = queue.Queue()
+        signal_count = fetch_signals(cur, capture_queue)
+
+        if not signal_count:
             print("😴 No signals found. Terminating.")
+            if stage:
+                stage.publish(allow_empty=True)
             return
 
         # ---------------- LOAD GOOGLE SHEET ---------------- #
@@ -85,7 +117,7 @@ def main():
         url_map = dict(zip(df.iloc[:, 0].str.upper().str.strip(), df.iloc[:, 3]))
 
         # ---------------- BROWSER ---------------- #
-        print(f"🚀 Processing {len(stocks)} stocks...")
+        print(f"🚀 Processing {signal_count} stocks...")
         driver = get_optimized_driver()
         driver.get("https://www.tradingview.com/")
 
@@ -103,7 +135,8 @@ def main():
         success_count = 0
 
         # ---------------- LOOP ---------------- #
-        for stock in stocks:
+        while not capture_queue.empty():
+            stock = capture_queue.get()
             symbol = stock["Symbol"].upper().strip()
             url = url_map.get(symbol)
             if not url:
@@ -121,39 +154,52 @@ def main():
                 )
                 time.sleep(5) 
 
-                img_data = driver.get_screenshot_as_png()
-
-                # ---------------- INSERT (UTC TIME) ---------------- #
-                sql = f"""
-                    INSERT INTO `{TARGET_TABLE}` 
-                    (symbol, timeframe, real_change, real_close, screenshot, created_at)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """
+                img_data = capture_page(driver)
+                image_values = screenshot_values(prepare_image(TARGET_TABLE, img_data, db_conn))
 
-                cur.execute(sql, (
+                row = (
                     symbol,
                     "day",
                     stock["real_change"],
                     stock["real_close"],
-                    img_data,
+                    *image_values,
                     datetime.utcnow()
-                ))
-                
-                # Explicitly commit each record to ensure it is written immediately
-                db_conn.commit()
+                )
+
+                if stage:
+                    stage.add(row)
+                else:
+                    # ---------------- INSERT (UTC TIME) ---------------- #
+                    sql = f"""
+                        INSERT INTO `{TARGET_TABLE}` 
+                        ({", ".join(LIVE_COLUMNS)})
+                        VALUES ({", ".join(["%s"] * len(LIVE_COLUMNS))})
+                    """
+                    cur.execute(sql, row)
+
+                    # Explicitly commit each record to ensure it is written immediately
+                    db_conn.commit()
 
                 print("✅")
+                log_page_stats(driver, symbol)
                 success_count += 1
 
             except Exception as e:
                 print(f"❌ Error: {str(e)[:50]}")
 
+        finish_run(db_conn)
+        if stage:
+            stage.publish()
+        if IMAGE_DERIVATIVES:
+            prune_derivatives(db_conn)
         print(f"🏁 Done. Total successful screenshots: {success_count}")
 
     except Exception as e:
         print(f"🚨 CRITICAL ERROR: {e}")
 
     finally:
+        if stage and db_conn.is_connected():
+            stage.discard()
         if db_conn and db_conn.is_connected():
             db_conn.commit() # Final safety commit
             cur.close()
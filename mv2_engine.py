@@ -0,0 +1,202 @@
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from candles import build_store
+
+# ---------------- CONFIG ---------------- #
+# Window lengths of the MV2 sheet formulas, in trading days
+MXMN_WINDOW = int(os.getenv("MV2_MXMN_WINDOW", "20"))
+CL_AB_WINDOW = int(os.getenv("MV2_CL_AB_WINDOW", "20"))
+TRIGGER_WINDOW = int(os.getenv("MV2_TRIGGER_WINDOW", "20"))
+TRIGGER_S_WINDOW = int(os.getenv("MV2_TRIGGER_S_WINDOW", "10"))
+
+DAILY_CSV = os.getenv("MV2_DAILY_CSV", "")   # optional long-format daily candles
+OUTPUT_CSV = os.getenv("MV2_OUTPUT_CSV", os.path.join(os.getcwd(), "mv2_local.csv"))
+
+# Column order follows the MV2 sheet up to M_CHANGE at index 15 (screen.py's monthly
+# value); filter.py reads the named columns. Only these 19 columns are computed: the
+# sheet's remaining columns (screen.py stores 13..36 as mv2_n_al) have no local
+# equivalent, so screen.py keeps reading the sheet.
+MV2_COLUMNS = [
+    "Symbol", "Sector", "Date",
+    "D_OPEN", "D_HIGH", "D_LOW", "D_CLOSE", "D_VOLUME",
+    "D_CHANGE", "W_CHANGE", "SMA_20", "MXMN_MAX", "MXMN_MIN",
+    "MXMN", "MXMN_low", "M_CHANGE", "D_CL_AB", "D_Trigger", "D_Trigger_S",
+]
+MONTHLY_COL_INDEX = 15
+assert MV2_COLUMNS[MONTHLY_COL_INDEX] == "M_CHANGE"
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+# ---------------- DAILY PANEL ---------------- #
+class DailyPanel:
+    """Symbols x trading-days matrices (NaN where a symbol has no candle that day)."""
+
+    def __init__(self, symbols, dates, open_, high, low, close, volume):
+        self.symbols = list(symbols)
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def from_frame(cls, df):
+        """Long frame with Symbol, Date, Open, High, Low, Close, Volume columns."""
+        df = df.rename(columns={c: c.strip().lower() for c in df.columns})
+        df["symbol"] = df["symbol"].astype(str).str.strip().str.upper()
+        df["date"] = pd.to_datetime(df["date"]).dt.normalize()
+        df = df.drop_duplicates(["symbol", "date"], keep="last")
+
+        symbols = np.sort(df["symbol"].unique())
+        dates = np.sort(df["date"].unique())
+        rows = np.searchsorted(symbols, df["symbol"].to_numpy())
+        cols = np.searchsorted(dates, df["date"].to_numpy())
+
+        def matrix(col):
+            out = np.full((len(symbols), len(dates)), np.nan)
+            out[rows, cols] = df[col].to_numpy(dtype=np.float64)
+            return out
+
+        return cls(symbols, dates.astype("datetime64[D]"),
+                   matrix("open"), matrix("high"), matrix("low"), matrix("close"), matrix("volume"))
+
+    @classmethod
+    def from_csv(cls, path):
+        return cls.from_frame(pd.read_csv(path))
+
+    @classmethod
+    def from_store(cls, store, symbols=None):
+        """Aggregates the minute candles of the candle store into daily bars."""
+        records = []
+        for symbol in symbols or store.symbols():
+            for day in store.dates(symbol):
+                seg = store.get(symbol, day)
+                records.append((symbol, day, seg["open"][0], seg["high"].max(), seg["low"].min(),
+                                seg["close"][-1], seg["volume"].sum()))
+        df = pd.DataFrame(records, columns=["Symbol", "Date", "Open", "High", "Low", "Close", "Volume"])
+        return cls.from_frame(df)
+
+
+# ---------------- ROLLING HELPERS ---------------- #
+def rolling(matrix, window, reducer):
+    """reducer over the trailing `window` days incl. today; first window-1 days are NaN."""
+    out = np.full(matrix.shape, np.nan)
+    if matrix.shape[1] >= window:
+        out[:, window - 1:] = reducer(sliding_window_view(matrix, window, axis=1), axis=2)
+    return out
+
+
+def shift(matrix, n=1):
+    out = np.full(matrix.shape, np.nan)
+    out[:, n:] = matrix[:, :-n]
+    return out
+
+
+def days_since(event):
+    """Days since the event was last True (0 = today), -1 when it never happened."""
+    idx = np.arange(event.shape[1])
+    last = np.maximum.accumulate(np.where(event, idx, -1), axis=1)
+    return np.where(last >= 0, idx - last, -1)
+
+
+def month_start_close(panel):
+    """Close of the last trading day of the previous month, per day."""
+    months = panel.dates.astype("datetime64[M]")
+    first_of_month = np.concatenate(([True], months[1:] != months[:-1]))
+    prev_close = shift(panel.close)
+    anchor = np.where(first_of_month, np.arange(len(months)), 0)
+    anchor = np.maximum.accumulate(anchor)
+    return prev_close[:, anchor]
+
+
+# ---------------- INDICATORS ---------------- #
+def compute_indicators(panel):
+    """All MV2 indicator columns as symbols x days arrays.
+
+    Local equivalents of the sheet formulas:
+      MXMN        (max high - min low) / min low * 100 over MXMN_WINDOW days
+      MXMN_low    1 when today's low is the lowest low of that window
+      D_CL_AB     close / SMA(close, CL_AB_WINDOW)
+      D_Trigger   days since close broke above the prior TRIGGER_WINDOW-day high
+      D_Trigger_S same with TRIGGER_S_WINDOW
+      M_CHANGE    month-to-date return as a fraction (screen.py's monthly value)
+    """
+    close, high, low = panel.close, panel.high, panel.low
+
+    mx = rolling(high, MXMN_WINDOW, np.fmax.reduce)
+    mn = rolling(low, MXMN_WINDOW, np.fmin.reduce)
+    sma = rolling(close, CL_AB_WINDOW, np.mean)
+    prior_hi = shift(rolling(high, TRIGGER_WINDOW, np.fmax.reduce))
+    prior_hi_s = shift(rolling(high, TRIGGER_S_WINDOW, np.fmax.reduce))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = {
+            "D_CHANGE": close / shift(close) - 1.0,
+            "W_CHANGE": close / shift(close, 5) - 1.0,
+            "SMA_20": sma,
+            "MXMN_MAX": mx,
+            "MXMN_MIN": mn,
+            "MXMN": (mx - mn) / mn * 100.0,
+            "MXMN_low": (low <= mn).astype(np.int8),
+            "M_CHANGE": close / month_start_close(panel) - 1.0,
+            "D_CL_AB": close / sma,
+            "D_Trigger": days_since(close > prior_hi),
+            "D_Trigger_S": days_since(close > prior_hi_s),
+        }
+    return out
+
+
+def build_mv2_frame(panel, indicators=None, day=-1, sectors=None):
+    """One row per symbol for a given day index, columns in MV2_COLUMNS order."""
+    ind = indicators or compute_indicators(panel)
+    sectors = sectors or {}
+    frame = {
+        "Symbol": panel.symbols,
+        "Sector": [sectors.get(s, "") for s in panel.symbols],
+        "Date": [str(panel.dates[day])] * len(panel.symbols),
+        "D_OPEN": panel.open[:, day],
+        "D_HIGH": panel.high[:, day],
+        "D_LOW": panel.low[:, day],
+        "D_CLOSE": panel.close[:, day],
+        "D_VOLUME": panel.volume[:, day],
+    }
+    for name, arr in ind.items():
+        frame[name] = arr[:, day]
+
+    df = pd.DataFrame(frame)[MV2_COLUMNS]
+    # Symbols that did not trade that day would read as stale zeros in filter.py
+    return df[~np.isnan(panel.close[:, day])].reset_index(drop=True)
+
+
+def load_panel():
+    if DAILY_CSV:
+        log(f"📄 Loading daily candles from {DAILY_CSV}")
+        return DailyPanel.from_csv(DAILY_CSV)
+    log("📄 Aggregating minute candles from the candle store...")
+    return DailyPanel.from_store(build_store())
+
+
+def load_local_mv2():
+    """MV2-shaped frame for filter.py, numeric columns kept numeric (NaN where undefined;
+    filter.py's safe_int/safe_float read NaN like the sheet's empty cells)."""
+    return build_mv2_frame(load_panel())
+
+
+if __name__ == "__main__":
+    t = time.perf_counter()
+    panel = load_panel()
+    log(f"✅ Panel: {len(panel.symbols)} symbols x {len(panel.dates)} days")
+
+    df = build_mv2_frame(panel)
+    df.to_csv(OUTPUT_CSV, index=False)
+    log(f"🏁 Wrote {len(df)} rows to {OUTPUT_CSV} in {time.perf_counter() - t:.2f}s")
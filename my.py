@@ -5,8 +5,14 @@ import requests
 import pymysql
 import urllib.parse
 import re
+import json
+import shutil
+import tempfile
+import threading
+from xml.etree import ElementTree
 from datetime import datetime
 from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -15,6 +21,17 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
+from youtube_transcript_api import YouTubeTranscriptApi
+
+from transcript_index import index_video
+from browser import prepare_options, setup_driver
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
 
 # ---------------- CONFIG ---------------- #
 DB_CONFIG = {
@@ -29,6 +46,20 @@ DOWNLOAD_DIR = os.path.join(os.getcwd(), "downloads")
 if not os.path.exists(DOWNLOAD_DIR):
     os.makedirs(DOWNLOAD_DIR)
 
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "4"))
+
+FEED_URL = "https://www.youtube.com/feeds/videos.xml"
+FEED_STATE_FILE = os.getenv("FEED_STATE_FILE", os.path.join(os.getcwd(), "feed_state.json"))
+POLL_INTERVAL = int(os.getenv("POLL_INTERVAL", "0"))  # seconds, 0 = run once
+SEEN_LIMIT = 5000
+RETRY_LIMIT = 50
+YT_NS = "http://www.youtube.com/xml/schemas/2015"
+HTTP_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+
+TRANSCRIPT_LANGUAGES = [l.strip() for l in os.getenv("TRANSCRIPT_LANGUAGES", "en,hi").split(",") if l.strip()]
+DOWNLOAD_TIMEOUT = 25
+DOWNLOAD_POLL_SEC = 0.2  # only used when watchdog is not installed
+
 def log(msg):
     print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
 
@@ -41,32 +72,113 @@ def extract_video_id(url):
         return query.get("v", [None])[0]
     return None
 
+def load_feed_state():
+    try:
+        with open(FEED_STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    state.setdefault("channels", {})
+    state.setdefault("seen", [])
+    return state
+
+def save_feed_state(state):
+    # Only the newest ids matter for dedup, keep the file small
+    state["seen"] = state["seen"][-SEEN_LIMIT:]
+    tmp_path = FEED_STATE_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, FEED_STATE_FILE)
+
+def resolve_channel_id(channel_url, channel_state):
+    """Channel id is needed for the feed URL; the /@handle page is fetched once and cached."""
+    if channel_state.get("channel_id"):
+        return channel_state["channel_id"]
+
+    match = re.search(r"/channel/(UC[\w-]{22})", channel_url)
+    if match:
+        channel_state["channel_id"] = match.group(1)
+        return match.group(1)
+
+    clean_url = channel_url.split('?')[0].rstrip('/')
+    response = requests.get(clean_url, headers=HTTP_HEADERS, timeout=15)
+    match = (re.search(r'<meta itemprop="identifier" content="(UC[\w-]{22})"', response.text)
+             or re.search(r'"externalId":"(UC[\w-]{22})"', response.text)
+             or re.search(r'"channelId":"(UC[\w-]{22})"', response.text))
+    if not match:
+        raise ValueError(f"channel id not found on {clean_url}")
+
+    channel_state["channel_id"] = match.group(1)
+    return match.group(1)
+
+def fetch_channel_feed(channel_url, channel_state):
+    """Returns video ids from the channel's Atom feed, newest first; [] when unchanged (304)."""
+    channel_id = resolve_channel_id(channel_url, channel_state)
+
+    headers = dict(HTTP_HEADERS)
+    if channel_state.get("etag"):
+        headers["If-None-Match"] = channel_state["etag"]
+    if channel_state.get("last_modified"):
+        headers["If-Modified-Since"] = channel_state["last_modified"]
+
+    response = requests.get(FEED_URL, params={"channel_id": channel_id}, headers=headers, timeout=15)
+    if response.status_code == 304:
+        return []
+    response.raise_for_status()
+
+    if response.headers.get("ETag"):
+        channel_state["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        channel_state["last_modified"] = response.headers["Last-Modified"]
+
+    root = ElementTree.fromstring(response.content)
+    return [el.text for el in root.iter(f"{{{YT_NS}}}videoId") if el.text]
+
+def get_new_videos(channel_urls, count=3, state=None):
+    """Polls all channel feeds concurrently and returns watch URLs not seen before."""
+    state = state if state is not None else load_feed_state()
+    seen = set(state["seen"])
+    new_links = []
+
+    def poll(channel_url):
+        channel_state = state["channels"].setdefault(channel_url, {})
+        log(f"📺 Checking feed: {channel_url}")
+        return fetch_channel_feed(channel_url, channel_state)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(channel_urls)))) as pool:
+        futures = {pool.submit(poll, url): url for url in channel_urls}
+        for fut in as_completed(futures):
+            try:
+                video_ids = fut.result()
+            except Exception as e:
+                log(f"❌ Error fetching feed for {futures[fut]}: {e}")
+                continue
+
+            fresh = [vid for vid in dict.fromkeys(video_ids) if vid not in seen][:count]
+            seen.update(fresh)
+            new_links.extend(f"https://www.youtube.com/watch?v={vid}" for vid in fresh)
+
+    log(f"✅ Found {len(new_links)} new videos.")
+    return new_links
+
+def mark_seen(state, video_ids):
+    known = set(state["seen"])
+    state["seen"].extend(v for v in video_ids if v and v not in known)
+    save_feed_state(state)
+
 def get_latest_videos(channel_url, count=3):
     video_links = []
     try:
-        clean_url = channel_url.split('?')[0].rstrip('/')
-        if not clean_url.endswith('/videos'):
-            clean_url += '/videos'
-            
-        log(f"📺 Fetching videos from: {clean_url}")
-        headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-        response = requests.get(clean_url, headers=headers)
-        video_ids = re.findall(r'"videoId":"([^"]+)"', response.text)
-        
-        if video_ids:
-            unique_ids = []
-            for vid in video_ids:
-                if vid not in unique_ids:
-                    unique_ids.append(vid)
-            
-            for vid in unique_ids[:count]:
-                video_links.append(f"https://www.youtube.com/watch?v={vid}")
-            log(f"✅ Found {len(video_links)} videos.")
+        channel_state = {}
+        video_ids = fetch_channel_feed(channel_url, channel_state)
+        for vid in list(dict.fromkeys(video_ids))[:count]:
+            video_links.append(f"https://www.youtube.com/watch?v={vid}")
+        log(f"✅ Found {len(video_links)} videos.")
     except Exception as e:
         log(f"❌ Error fetching videos: {e}")
     return video_links
 
-def create_driver():
+def create_driver(download_dir=DOWNLOAD_DIR):
     options = Options()
     options.add_argument("--headless=new")
     options.add_argument("--no-sandbox")
@@ -74,7 +186,7 @@ def create_driver():
     options.add_argument("--window-size=1920,1080")
     
     prefs = {
-        "download.default_directory": DOWNLOAD_DIR,
+        "download.default_directory": download_dir,
         "download.prompt_for_download": False,
         "download.directory_upgrade": True,
         "safebrowsing.enabled": True
@@ -82,13 +194,95 @@ def create_driver():
     options.add_experimental_option("prefs", prefs)
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
+    prepare_options(options)
 
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": DOWNLOAD_DIR})
+    driver = setup_driver(webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options))
+    driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_dir})
     return driver
 
-def get_video_data(youtube_url):
-    driver = create_driver()
+def _finished_download(download_dir, suffix):
+    # Chrome writes to *.crdownload and renames on completion, so a file with
+    # the final suffix is always complete
+    for name in os.listdir(download_dir):
+        if name.endswith(suffix):
+            return os.path.join(download_dir, name)
+    return None
+
+class _DownloadHandler(FileSystemEventHandler):
+    def __init__(self, suffix):
+        self.suffix = suffix
+        self.path = None
+        self.done = threading.Event()
+
+    def _check(self, path):
+        if path.endswith(self.suffix):
+            self.path = path
+            self.done.set()
+
+    def on_created(self, event):
+        self._check(event.src_path)
+
+    def on_moved(self, event):
+        self._check(event.dest_path)
+
+def wait_for_download(download_dir, suffix=".txt", timeout=DOWNLOAD_TIMEOUT):
+    """Returns the path of the finished download, or None on timeout."""
+    if Observer is None:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            path = _finished_download(download_dir, suffix)
+            if path:
+                return path
+            time.sleep(DOWNLOAD_POLL_SEC)
+        return None
+
+    handler = _DownloadHandler(suffix)
+    observer = Observer()
+    observer.schedule(handler, download_dir, recursive=False)
+    observer.start()
+    try:
+        # The rename may have happened before the observer started
+        path = _finished_download(download_dir, suffix)
+        if path:
+            return path
+        if handler.done.wait(timeout):
+            return handler.path
+        return None
+    finally:
+        observer.stop()
+        observer.join()
+
+def get_video_title(youtube_url):
+    try:
+        response = requests.get(
+            "https://www.youtube.com/oembed",
+            params={"url": youtube_url, "format": "json"},
+            timeout=10
+        )
+        if response.status_code == 200:
+            return response.json().get("title") or "Unknown Title"
+    except Exception as e:
+        log(f"⚠️ Title lookup failed: {e}")
+    return "Unknown Title"
+
+def get_transcript_api(video_id):
+    """Fetches the transcript segments straight from YouTube, no browser needed."""
+    try:
+        try:
+            segments = YouTubeTranscriptApi.get_transcript(video_id, languages=TRANSCRIPT_LANGUAGES)
+        except Exception:
+            # No manual/auto track in the preferred languages, take whatever exists
+            transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
+            segments = next(iter(transcripts)).fetch()
+        return [seg for seg in segments if seg.get("text", "").strip()] or None
+    except Exception as e:
+        log(f"⚠️ Transcript API failed for {video_id}: {str(e)[:80]}")
+        return None
+
+def get_video_data_downsub(youtube_url):
+    # Each call gets its own download dir, so parallel workers never see each other's files
+    download_dir = tempfile.mkdtemp(prefix="downsub_", dir=DOWNLOAD_DIR)
+    driver = create_driver(download_dir)
     video_title = "Unknown Title"
     transcript_text = None
     
@@ -110,35 +304,40 @@ def get_video_data(youtube_url):
             video_title = driver.title
 
         # 2. Handle Download
-        for f in os.listdir(DOWNLOAD_DIR):
-            try: os.remove(os.path.join(DOWNLOAD_DIR, f))
-            except: pass
-
         txt_xpath = "//button[contains(., 'TXT') or contains(., '[TXT]')]"
         txt_button = wait.until(EC.element_to_be_clickable((By.XPATH, txt_xpath)))
         driver.execute_script("arguments[0].click();", txt_button)
         
-        timeout = 25
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            files = [f for f in os.listdir(DOWNLOAD_DIR) if f.endswith('.txt')]
-            if files:
-                file_path = os.path.join(DOWNLOAD_DIR, files[0])
-                time.sleep(1)
-                with open(file_path, "r", encoding="utf-8") as f:
-                    transcript_text = f.read()
-                break
-            time.sleep(2)
-            
+        file_path = wait_for_download(download_dir)
+        if file_path:
+            with open(file_path, "r", encoding="utf-8") as f:
+                transcript_text = f.read()
+        else:
+            log(f"⚠️ Download did not finish within {DOWNLOAD_TIMEOUT}s")
+
         return video_title, transcript_text
     except Exception as e:
         log(f"❌ Error: {e}")
         return video_title, None
     finally:
         driver.quit()
+        shutil.rmtree(download_dir, ignore_errors=True)
+
+def get_video_data(youtube_url):
+    """Returns (title, text, segments); segments carry timestamps and are None for downsub."""
+    video_id = extract_video_id(youtube_url)
+    segments = get_transcript_api(video_id) if video_id else None
+
+    if segments:
+        transcript_text = "\n".join(seg["text"].strip() for seg in segments)
+        return get_video_title(youtube_url), transcript_text, segments
+
+    log(f"↩️ Falling back to downsub for: {youtube_url}")
+    title, transcript_text = get_video_data_downsub(youtube_url)
+    return title, transcript_text, None
 
 def save_to_db(video_id, url, title, content):
-    if not DB_CONFIG['host'] or not content: return
+    if not DB_CONFIG['host'] or not content: return False
     try:
         with closing(pymysql.connect(**DB_CONFIG)) as conn:
             with conn.cursor() as cursor:
@@ -152,24 +351,83 @@ def save_to_db(video_id, url, title, content):
                 cursor.execute(sql, (video_id, url, title, content))
             conn.commit()
         log(f"✅ Saved: {title[:50]}...")
+        return True
     except Exception as e:
         log(f"❌ DB Error: {e}")
+        return False
 
-if __name__ == "__main__":
-    target = sys.argv[1] if len(sys.argv) > 1 else "https://www.youtube.com/@stockmarketcommando"
-    
-    urls_to_process = get_latest_videos(target, count=3) if ("channel" in target or "/@" in target) else [target]
+def get_existing_video_ids(video_ids):
+    """Returns the subset of video_ids already stored in wp_transcript (one query)."""
+    video_ids = [v for v in video_ids if v]
+    if not DB_CONFIG['host'] or not video_ids: return set()
+    try:
+        with closing(pymysql.connect(**DB_CONFIG)) as conn:
+            with conn.cursor() as cursor:
+                placeholders = ", ".join(["%s"] * len(video_ids))
+                cursor.execute(
+                    f"SELECT video_id FROM wp_transcript WHERE video_id IN ({placeholders})",
+                    video_ids
+                )
+                return {row[0] for row in cursor.fetchall()}
+    except Exception as e:
+        log(f"⚠️ Existing video lookup failed: {e}")
+        return set()
+
+def process_video(video_url):
+    log(f"🎬 Processing: {video_url}")
+    vid_id = extract_video_id(video_url)
+    title, text, segments = get_video_data(video_url)
+
+    if text:
+        # only a stored transcript counts as done; a failed save stays on the retry list
+        ok = save_to_db(vid_id, video_url, title, text)
+        if ok:
+            index_video(vid_id, text, segments)
+        return ok
+    log(f"⚠️ No transcript for: {video_url}")
+    return False
+
+def run_once(targets, state):
+    channels = [t for t in targets if "channel" in t or "/@" in t]
+    urls_to_process = [t for t in targets if t not in channels]
+    if channels:
+        urls_to_process += get_new_videos(channels, count=3, state=state)
+    # Feed may answer 304 next time, so videos that had no transcript yet are carried over
+    urls_to_process += [f"https://www.youtube.com/watch?v={vid}" for vid in state.get("retry", [])]
+    urls_to_process = list(dict.fromkeys(urls_to_process))
 
     if not urls_to_process:
-        log("❌ No videos found.")
-        sys.exit(1)
+        log("😴 No new videos.")
+        return
 
-    for video_url in urls_to_process:
-        log(f"🎬 Processing: {video_url}")
-        vid_id = extract_video_id(video_url)
-        title, text = get_video_data(video_url)
-        
-        if text:
-            save_to_db(vid_id, video_url, title, text)
-        
-        time.sleep(2)
+    existing = get_existing_video_ids([extract_video_id(u) for u in urls_to_process])
+    pending = [u for u in urls_to_process if extract_video_id(u) not in existing]
+    if existing:
+        log(f"⏭️ Skipping {len(existing)} video(s) already in wp_transcript.")
+    done_ids = list(existing)
+
+    saved = 0
+    if pending:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            futures = {pool.submit(process_video, u): u for u in pending}
+            for fut in as_completed(futures):
+                try:
+                    if fut.result():
+                        saved += 1
+                        done_ids.append(extract_video_id(futures[fut]))
+                except Exception as e:
+                    log(f"❌ Worker error: {e}")
+
+    done = set(done_ids)
+    state["retry"] = [extract_video_id(u) for u in pending if extract_video_id(u) not in done][-RETRY_LIMIT:]
+    mark_seen(state, done_ids)
+    log(f"🏁 Done. Saved {saved}/{len(pending)} transcripts.")
+
+if __name__ == "__main__":
+    targets = sys.argv[1:] or ["https://www.youtube.com/@stockmarketcommando"]
+    state = load_feed_state()
+
+    run_once(targets, state)
+    while POLL_INTERVAL > 0:
+        time.sleep(POLL_INTERVAL)
+        run_once(targets, state)
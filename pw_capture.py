@@ -0,0 +1,180 @@
+import os
+import json
+import queue
+import asyncio
+import threading
+
+from browser import BLOCK_URLS, BLOCK_AUDIT, SUPPRESS_POPUPS, POPUP_OBSERVER_JS, is_blocked
+from capture import CHART_XPATH, CHART_WAIT_SEC, CAPTURE_FORMAT, CAPTURE_QUALITY, POPUP_SELECTOR
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+PW_CONCURRENCY = int(os.getenv("PW_CONCURRENCY", "6"))     # chart loads in flight
+PW_VIEWPORT = {"width": 1920, "height": 1080}
+PW_ARGS = ["--no-sandbox", "--disable-dev-shm-usage", "--disable-blink-features=AutomationControlled"]
+
+_DONE = object()
+
+
+class _Failed:
+    """Run-level error handed from the loop thread to capture_many()."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def log(msg):
+    print(msg, flush=True)
+
+
+def load_tv_cookies():
+    """TRADINGVIEW_COOKIES in the format Playwright's add_cookies() expects."""
+    cookies = []
+    for c in json.loads(os.getenv("TRADINGVIEW_COOKIES") or "[]"):
+        if not c.get("name") or c.get("value") is None:
+            continue
+        cookie = {
+            "name": c["name"],
+            "value": str(c["value"]),
+            "domain": c.get("domain") or ".tradingview.com",
+            "path": c.get("path", "/"),
+        }
+        if c.get("expiry"):
+            cookie["expires"] = int(c["expiry"])
+        if "secure" in c:
+            cookie["secure"] = bool(c["secure"])
+        if "httpOnly" in c:
+            cookie["httpOnly"] = bool(c["httpOnly"])
+        cookies.append(cookie)
+    return cookies
+
+
+class PlaywrightCapture:
+    """One headless Chromium, PW_CONCURRENCY isolated contexts sharing the same cookies.
+
+    Same capture_many() contract as capture.SeleniumCapture: the async loop runs in a
+    background thread and results are handed over through a queue as they finish,
+    so the bot keeps writing to the DB while the next charts load.
+    """
+
+    def __init__(self, settle_sec=6, wait_sec=CHART_WAIT_SEC, xpath=CHART_XPATH,
+                 cleanup=False, full_page=False, retries=1, concurrency=PW_CONCURRENCY):
+        self.settle_sec = settle_sec
+        self.wait_sec = wait_sec
+        self.xpath = xpath
+        self.cleanup = cleanup
+        self.full_page = full_page
+        self.retries = max(retries, 1)
+        self.concurrency = concurrency
+        self.cookies = load_tv_cookies()
+        if not self.cookies:
+            raise Exception("TRADINGVIEW_COOKIES missing or empty.")
+        self._worker = None
+        self._loop = None
+        self._task = None
+
+    def capture_many(self, jobs):
+        """Per-chart failures yield None; a failed run (Playwright missing, browser
+        launch error...) is raised here after the results that did arrive."""
+        jobs = list(jobs)
+        results = queue.Queue()
+        self._worker = threading.Thread(target=self._thread_main, args=(jobs, results), daemon=True)
+        self._worker.start()
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _Failed):
+                    raise item.error
+                yield item
+        finally:
+            self.close()
+
+    def close(self):
+        """Cancels a run still in flight and waits for the loop thread to exit."""
+        worker = self._worker
+        if worker is None:
+            return
+        if worker.is_alive() and self._loop is not None and self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+        worker.join(timeout=30)
+        if worker.is_alive():
+            log("⚠️ Playwright thread did not stop within 30s")
+        self._worker = None
+
+    def _thread_main(self, jobs, results):
+        async def main():
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.current_task()
+            await self._run(jobs, results)
+
+        try:
+            asyncio.run(main())
+        except asyncio.CancelledError:
+            log("🛑 Playwright run cancelled")
+        except Exception as e:
+            results.put(_Failed(e))
+        finally:
+            self._loop = None
+            self._task = None
+            results.put(_DONE)
+
+    # ---------------- ASYNC ---------------- #
+    async def _new_page(self, browser):
+        context = await browser.new_context(viewport=PW_VIEWPORT, locale="en-US")
+        await context.add_cookies(self.cookies)
+        if SUPPRESS_POPUPS:
+            await context.add_init_script(POPUP_OBSERVER_JS)
+        if BLOCK_URLS and not BLOCK_AUDIT:
+            async def block(route):
+                if is_blocked(route.request.url):
+                    await route.abort()
+                else:
+                    await route.continue_()
+            await context.route("**/*", block)
+        return await context.new_page()
+
+    async def _capture(self, page, key, url):
+        label = str(key)
+        for attempt in range(1, self.retries + 1):
+            try:
+                await page.goto(url, wait_until="domcontentloaded", timeout=self.wait_sec * 1000)
+                chart = page.locator(f"xpath={self.xpath}").first
+                await chart.wait_for(state="visible", timeout=self.wait_sec * 1000)
+                await asyncio.sleep(self.settle_sec)
+                if self.cleanup:
+                    await page.evaluate("sel => document.querySelectorAll(sel).forEach(p => p.remove())", POPUP_SELECTOR)
+                # Playwright encodes png/jpeg only
+                opts = {"type": "jpeg", "quality": CAPTURE_QUALITY} if CAPTURE_FORMAT == "jpeg" else {"type": "png"}
+                target = page if self.full_page else chart
+                return await target.screenshot(**opts)
+            except Exception as e:
+                log(f"❌ Capture failed for {label} (attempt {attempt}/{self.retries}): {e}")
+        return None
+
+    async def _run(self, jobs, results):
+        try:
+            from playwright.async_api import async_playwright
+
+            async with async_playwright() as pw:
+                browser = await pw.chromium.launch(headless=True, args=PW_ARGS)
+                pages = asyncio.Queue()
+                for _ in range(min(self.concurrency, max(len(jobs), 1))):
+                    pages.put_nowait(await self._new_page(browser))
+                log(f"🎭 Playwright: {pages.qsize()} contexts, {len(jobs)} charts")
+
+                async def one(key, url):
+                    page = await pages.get()
+                    try:
+                        results.put((key, await self._capture(page, key, url)))
+                    finally:
+                        pages.put_nowait(page)
+
+                await asyncio.gather(*(one(key, url) for key, url in jobs))
+                await browser.close()
+        except Exception as e:
+            log(f"❌ Playwright run failed: {e}")
+            results.put(_Failed(e))
@@ -0,0 +1,303 @@
+import os
+import sys
+import json
+import gzip
+import time
+import base64
+from datetime import datetime, date, timedelta
+
+from image_store import get_image_store, prune_derivatives
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+TABLE = "filter_alert_screenshots"
+DATE_COLUMN = "created_at"
+# Rows that are not the latest of their (filter_id, alert_id, timeframe) are archived after this
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "30"))
+ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR", os.path.join(os.getcwd(), "archive"))
+
+BATCH_SIZE = int(os.getenv("RETENTION_BATCH", "500"))
+BATCH_PAUSE_SEC = 0.5
+FUTURE_MONTHS = 3
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "database": os.getenv("DB_NAME"),
+    "port": int(os.getenv("DB_PORT", "3306")),
+}
+
+
+def log(msg):
+    print(msg, flush=True)
+
+
+def month_start(d, add=0):
+    m = d.month - 1 + add
+    return date(d.year + m // 12, m % 12 + 1, 1)
+
+
+# =========================================================
+# PARTITIONING
+# =========================================================
+def column_type(cur, table, column):
+    cur.execute(
+        """
+        SELECT DATA_TYPE FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """,
+        (table, column)
+    )
+    row = cur.fetchone()
+    return row[0].lower() if row else None
+
+
+def partition_expr(cur):
+    # TIMESTAMP columns only allow UNIX_TIMESTAMP() as partitioning function
+    if column_type(cur, TABLE, DATE_COLUMN) == "timestamp":
+        return f"UNIX_TIMESTAMP(`{DATE_COLUMN}`)", lambda d: f"UNIX_TIMESTAMP('{d} 00:00:00')"
+    return f"TO_DAYS(`{DATE_COLUMN}`)", lambda d: f"TO_DAYS('{d}')"
+
+
+def partition_names(cur):
+    cur.execute(
+        """
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+        """,
+        (TABLE,)
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+def ensure_lookup_index(cur):
+    """get_last_saved_hash() filters on these columns and orders by id."""
+    cur.execute(
+        """
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = 'idx_last_hash'
+        """,
+        (TABLE,)
+    )
+    if cur.fetchone() is None:
+        cur.execute(f"ALTER TABLE `{TABLE}` ADD INDEX `idx_last_hash` (filter_id, symbol, timeframe, alert_id, id)")
+        log("🛠️ Added idx_last_hash")
+
+
+def unique_keys_without(cur, column):
+    """Non-primary UNIQUE keys that do not include `column` (they block partitioning)."""
+    cur.execute(
+        """
+        SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+          AND NON_UNIQUE = 0 AND INDEX_NAME <> 'PRIMARY'
+        """,
+        (TABLE,)
+    )
+    keys = {}
+    for name, col in cur.fetchall():
+        keys.setdefault(name, set()).add(col)
+    return sorted(name for name, cols in keys.items() if column not in cols)
+
+
+def partition_table(conn):
+    """One-time conversion to monthly RANGE partitions on created_at.
+
+    The partition column has to be part of every unique key, so the primary key
+    becomes (id, created_at). This rebuilds the table: run it outside capture hours.
+    """
+    cur = conn.cursor()
+    if partition_names(cur):
+        log(f"ℹ️ `{TABLE}` is already partitioned.")
+        cur.close()
+        return
+
+    blocking = unique_keys_without(cur, DATE_COLUMN)
+    if blocking:
+        cur.close()
+        raise RuntimeError(
+            f"`{TABLE}` has UNIQUE keys without `{DATE_COLUMN}`: {', '.join(blocking)}. "
+            f"MySQL cannot partition it by {DATE_COLUMN}; add {DATE_COLUMN} to these keys "
+            f"or drop them first. Nothing was changed."
+        )
+    ensure_lookup_index(cur)
+
+    expr, bound = partition_expr(cur)
+    cur.execute(f"SELECT MIN(`{DATE_COLUMN}`) FROM `{TABLE}`")
+    first = cur.fetchone()[0] or datetime.utcnow()
+    start = month_start(first.date() if isinstance(first, datetime) else first, 1)
+    stop = month_start(date.today(), FUTURE_MONTHS + 1)
+
+    parts = []
+    d = start
+    while d <= stop:
+        prev = month_start(d, -1)
+        parts.append(f"PARTITION p{prev:%Y%m} VALUES LESS THAN ({bound(d)})")
+        d = month_start(d, 1)
+    parts.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+
+    log(f"🧱 Partitioning `{TABLE}` into {len(parts)} partitions...")
+    cur.execute(f"UPDATE `{TABLE}` SET `{DATE_COLUMN}` = CURRENT_TIMESTAMP WHERE `{DATE_COLUMN}` IS NULL")
+    cur.execute(f"ALTER TABLE `{TABLE}` MODIFY `{DATE_COLUMN}` {column_type(cur, TABLE, DATE_COLUMN).upper()} "
+                f"NOT NULL DEFAULT CURRENT_TIMESTAMP")
+    cur.execute(f"ALTER TABLE `{TABLE}` DROP PRIMARY KEY, ADD PRIMARY KEY (id, `{DATE_COLUMN}`)")
+    cur.execute(f"ALTER TABLE `{TABLE}` PARTITION BY RANGE ({expr}) ({', '.join(parts)})")
+    cur.close()
+    log("✅ Partitioning done.")
+
+
+def extend_partitions(conn):
+    """Splits pmax so there are always FUTURE_MONTHS empty monthly partitions ahead."""
+    cur = conn.cursor()
+    names = partition_names(cur)
+    if not names:
+        log(f"⚠️ `{TABLE}` is not partitioned, run `python retention.py partition` first.")
+        cur.close()
+        return
+
+    _, bound = partition_expr(cur)
+    monthly = [n for n in names if n != "pmax"]
+    last = datetime.strptime(monthly[-1][1:], "%Y%m").date() if monthly else month_start(date.today(), -1)
+    target = month_start(date.today(), FUTURE_MONTHS)
+
+    parts = []
+    d = month_start(last, 1)
+    while d <= target:
+        parts.append(f"PARTITION p{d:%Y%m} VALUES LESS THAN ({bound(month_start(d, 1))})")
+        d = month_start(d, 1)
+
+    if parts:
+        # pmax is empty as long as this runs ahead of time, so the reorganize is instant
+        parts.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+        cur.execute(f"ALTER TABLE `{TABLE}` REORGANIZE PARTITION pmax INTO ({', '.join(parts)})")
+        log(f"✅ Added {len(parts) - 1} monthly partitions.")
+    else:
+        log("ℹ️ Partitions already cover the next months.")
+    cur.close()
+
+
+# =========================================================
+# RETENTION
+# =========================================================
+def latest_ids(cur):
+    """Newest row id per (filter_id, alert_id, timeframe); these are never archived."""
+    cur.execute(f"SELECT MAX(id) FROM `{TABLE}` GROUP BY filter_id, alert_id, timeframe")
+    return {r[0] for r in cur.fetchall()}
+
+
+def to_json_value(v):
+    if isinstance(v, (bytes, bytearray)):
+        return {"b64": base64.b64encode(bytes(v)).decode("ascii")}
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, (int, float, str)) or v is None:
+        return v
+    return str(v)
+
+
+def write_archive(rows, columns):
+    ids = [r[columns.index("id")] for r in rows]
+    created = rows[0][columns.index(DATE_COLUMN)]
+    month = created.strftime("%Y-%m") if created else "unknown"
+    name = f"{TABLE}-{ids[0]}-{ids[-1]}.jsonl.gz"
+    path = os.path.join(ARCHIVE_DIR, TABLE, month, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps({c: to_json_value(v) for c, v in zip(columns, row)}, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
+    store = get_image_store()
+    if store is not None:
+        with open(path, "rb") as f:
+            store.put(f"archive/{TABLE}/{month}/{name}", f.read())
+    return path
+
+
+def run_retention(conn, retention_days=RETENTION_DAYS, batch=BATCH_SIZE, dry_run=False):
+    """Archives and deletes superseded rows older than retention_days in short batches.
+
+    Each batch is one SELECT by primary key range plus one DELETE by id list, so
+    locks are held for a fraction of a second and alert.py can keep inserting.
+    Image-store objects are left in place (they may be shared through dedup).
+    Deleting needs a configured image store (IMAGE_STORE=s3/local): the local
+    archive directory alone is not a durable copy.
+    """
+    if not dry_run and get_image_store() is None:
+        raise RuntimeError("No durable archive target: set IMAGE_STORE (and S3_* for s3) "
+                           "before deleting rows, or use --dry-run.")
+
+    cur = conn.cursor()
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    keep = latest_ids(cur)
+    log(f"🧹 Retention on `{TABLE}`: rows before {cutoff:%Y-%m-%d}, keeping {len(keep)} latest rows")
+
+    archived = 0
+    last_id = 0
+    while True:
+        cur.execute(
+            f"""
+            SELECT * FROM `{TABLE}`
+            WHERE id > %s AND `{DATE_COLUMN}` < %s
+            ORDER BY id
+            LIMIT %s
+            """,
+            (last_id, cutoff, batch)
+        )
+        rows = cur.fetchall()
+        if not rows:
+            break
+        columns = [d[0] for d in cur.description]
+        id_pos = columns.index("id")
+        last_id = rows[-1][id_pos]
+
+        rows = [r for r in rows if r[id_pos] not in keep]
+        if not rows:
+            continue
+
+        if dry_run:
+            archived += len(rows)
+            continue
+
+        path = write_archive(rows, columns)
+        ids = [r[id_pos] for r in rows]
+        cur.execute(
+            f"DELETE FROM `{TABLE}` WHERE id IN ({', '.join(['%s'] * len(ids))})",
+            ids
+        )
+        conn.commit()
+        archived += len(ids)
+        log(f"    ↳ archived {len(ids)} rows → {os.path.relpath(path, ARCHIVE_DIR)} (total {archived})")
+        time.sleep(BATCH_PAUSE_SEC)
+
+    cur.close()
+    log(f"✅ Retention finished: {archived} rows {'would be ' if dry_run else ''}archived.")
+    return archived
+
+
+if __name__ == "__main__":
+    import mysql.connector
+
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "run"
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        if cmd == "partition":
+            partition_table(conn)
+        elif cmd == "extend":
+            extend_partitions(conn)
+        elif cmd == "run":
+            dry_run = "--dry-run" in sys.argv
+            run_retention(conn, dry_run=dry_run)
+            if not dry_run:
+                prune_derivatives(conn)
+        else:
+            print("usage: python retention.py partition | extend | run [--dry-run]")
+            sys.exit(1)
+    finally:
+        conn.close()
@@ -0,0 +1,290 @@
+import os
+import sys
+import time
+import queue
+from datetime import datetime
+
+import numpy as np
+
+from candles import CandleStore, build_store, to_epoch
+
+# ---------------- CONFIG ---------------- #
+SESSION_OPEN_UTC = "03:45"      # 09:15 IST
+SESSION_MINUTES = 375           # 09:15 - 15:30 IST
+BASELINE_DAYS = int(os.getenv("SCAN_BASELINE_DAYS", "10"))
+
+# A threshold set to None is disabled; a symbol is emitted when it crosses any enabled one.
+# With only=True the thresholds passed in are the whole rule set (the rest are disabled).
+DEFAULT_THRESHOLDS = {
+    "change_pct": float(os.getenv("SCAN_CHANGE_PCT", "7.0")),
+    "gap_pct": float(os.getenv("SCAN_GAP_PCT", "5.0")),
+    "range_expansion": float(os.getenv("SCAN_RANGE_EXPANSION", "2.0")),
+    "volume_surge": float(os.getenv("SCAN_VOLUME_SURGE", "3.0")),
+}
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+# ---------------- SCANNER ---------------- #
+class IntradayScanner:
+    """Symbols x session-minutes OHLCV matrix with whole-universe metrics in one pass."""
+
+    def __init__(self, symbols, session_date, thresholds=None, only=False):
+        self.symbols = [s.upper() for s in symbols]
+        self.sym_index = {s: i for i, s in enumerate(self.symbols)}
+        self.session_start = to_epoch(f"{session_date} {SESSION_OPEN_UTC}")
+        base = dict.fromkeys(DEFAULT_THRESHOLDS) if only else DEFAULT_THRESHOLDS
+        self.thresholds = dict(base, **(thresholds or {}))
+
+        shape = (len(self.symbols), SESSION_MINUTES)
+        self.open = np.full(shape, np.nan)
+        self.high = np.full(shape, np.nan)
+        self.low = np.full(shape, np.nan)
+        self.close = np.full(shape, np.nan)
+        self.volume = np.zeros(shape)
+        self.last_minute = -1
+
+        # Running per-symbol aggregates so a scan is O(symbols), not O(symbols x minutes)
+        n_sym = len(self.symbols)
+        self.first_min = np.full(n_sym, SESSION_MINUTES)
+        self.last_min = np.full(n_sym, -1)
+        self.day_open = np.full(n_sym, np.nan)
+        self.day_high = np.full(n_sym, np.nan)
+        self.day_low = np.full(n_sym, np.nan)
+        self.last = np.full(n_sym, np.nan)
+        self.cumvol = np.zeros(n_sym)
+
+        # Baseline from previous sessions; NaN disables gap / range / volume checks per symbol
+        self.prev_close = np.full(len(self.symbols), np.nan)
+        self.avg_range = np.full(len(self.symbols), np.nan)
+        self.avg_cumvol = np.full(shape, np.nan)
+
+        self.emitted = np.zeros(len(self.symbols), dtype=bool)
+
+    # ---------- input ---------- #
+    def minute_of(self, ts):
+        return (np.asarray(ts, dtype=np.int64) - self.session_start) // 60
+
+    def update(self, symbol, ts, o, h, l, c, v):
+        """Single candle, e.g. from a live feed."""
+        row = self.sym_index.get(symbol.upper())
+        minute = int(self.minute_of(ts))
+        if row is None or not 0 <= minute < SESSION_MINUTES:
+            return
+        self.open[row, minute] = o
+        self.high[row, minute] = h
+        self.low[row, minute] = l
+        self.close[row, minute] = c
+        self.cumvol[row] += v - self.volume[row, minute]
+        self.volume[row, minute] = v
+        self.last_minute = max(self.last_minute, minute)
+
+        if minute <= self.first_min[row]:
+            self.first_min[row] = minute
+            self.day_open[row] = o
+        if minute >= self.last_min[row]:
+            self.last_min[row] = minute
+            self.last[row] = c
+        self.day_high[row] = np.fmax(self.day_high[row], h)
+        self.day_low[row] = np.fmin(self.day_low[row], l)
+
+    def update_symbol(self, symbol, candles):
+        """Bulk load of one symbol's candles (dict of arrays as returned by CandleStore)."""
+        row = self.sym_index.get(symbol.upper())
+        if row is None or candles is None or not len(candles["ts"]):
+            return
+        minutes = self.minute_of(candles["ts"])
+        ok = (minutes >= 0) & (minutes < SESSION_MINUTES)
+        minutes = minutes[ok]
+        self.open[row, minutes] = candles["open"][ok]
+        self.high[row, minutes] = candles["high"][ok]
+        self.low[row, minutes] = candles["low"][ok]
+        self.close[row, minutes] = candles["close"][ok]
+        self.volume[row, minutes] = candles["volume"][ok]
+        if len(minutes):
+            self.last_minute = max(self.last_minute, int(minutes.max()))
+        self._refresh_row(row)
+
+    def _refresh_row(self, row):
+        valid = np.flatnonzero(~np.isnan(self.close[row]))
+        if not len(valid):
+            return
+        self.first_min[row], self.last_min[row] = valid[0], valid[-1]
+        self.day_open[row] = self.open[row, valid[0]]
+        self.last[row] = self.close[row, valid[-1]]
+        self.day_high[row] = np.fmax.reduce(self.high[row])
+        self.day_low[row] = np.fmin.reduce(self.low[row])
+        self.cumvol[row] = self.volume[row].sum()
+
+    def update_minute(self, minute, o, h, l, c, v):
+        """Whole universe for one minute; each argument is a vector aligned with self.symbols."""
+        self.open[:, minute] = o
+        self.high[:, minute] = h
+        self.low[:, minute] = l
+        self.close[:, minute] = c
+        v = np.nan_to_num(np.asarray(v, dtype=np.float64))
+        self.cumvol += v - self.volume[:, minute]
+        self.volume[:, minute] = v
+        self.last_minute = max(self.last_minute, minute)
+
+        # Feeds arrive in minute order, so this minute is the newest for every symbol that traded
+        traded = ~np.isnan(self.close[:, minute])
+        opening = traded & (self.first_min > minute)
+        self.first_min[opening] = minute
+        self.day_open[opening] = self.open[opening, minute]
+        newest = traded & (self.last_min <= minute)
+        self.last_min[newest] = minute
+        self.last[newest] = self.close[newest, minute]
+        self.day_high = np.fmax(self.day_high, self.high[:, minute])
+        self.day_low = np.fmin(self.day_low, self.low[:, minute])
+
+    def set_baseline(self, prev_close=None, avg_range=None, avg_cumvol=None):
+        if prev_close is not None:
+            self.prev_close = np.asarray(prev_close, dtype=np.float64)
+        if avg_range is not None:
+            self.avg_range = np.asarray(avg_range, dtype=np.float64)
+        if avg_cumvol is not None:
+            self.avg_cumvol = np.asarray(avg_cumvol, dtype=np.float64)
+
+    # ---------- metrics ---------- #
+    def metrics(self):
+        upto = self.last_minute + 1
+        if upto <= 0:
+            nan = np.full(len(self.symbols), np.nan)
+            return {"last": nan, "change_pct": nan, "gap_pct": nan, "range_expansion": nan, "volume_surge": nan}
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return {
+                "last": self.last,
+                "change_pct": (self.last / self.day_open - 1.0) * 100.0,
+                "gap_pct": (self.day_open / self.prev_close - 1.0) * 100.0,
+                "range_expansion": (self.day_high - self.day_low) / self.avg_range,
+                "volume_surge": self.cumvol / self.avg_cumvol[:, upto - 1],
+            }
+
+    def scan(self, only_new=True):
+        """Returns signals for symbols crossing any enabled threshold, newest crossings only by default."""
+        m = self.metrics()
+        hit = np.zeros(len(self.symbols), dtype=bool)
+        reasons = {}
+        for name, limit in self.thresholds.items():
+            if limit is None:
+                continue
+            with np.errstate(invalid="ignore"):
+                crossed = np.nan_to_num(m[name], nan=-np.inf) >= limit
+            reasons[name] = crossed
+            hit |= crossed
+
+        if only_new:
+            hit &= ~self.emitted
+        self.emitted |= hit
+
+        signals = []
+        for row in np.flatnonzero(hit):
+            signals.append({
+                "Symbol": self.symbols[row],
+                "real_close": round(float(m["last"][row]), 2),
+                "real_change": round(float(m["change_pct"][row]), 2),
+                "reasons": [name for name, crossed in reasons.items() if crossed[row]],
+                "metrics": {k: (None if np.isnan(v[row]) else round(float(v[row]), 3)) for k, v in m.items()},
+            })
+        return signals
+
+    def emit(self, capture_queue, only_new=True):
+        signals = self.scan(only_new)
+        for sig in signals:
+            capture_queue.put(sig)
+        return len(signals)
+
+
+# ---------------- CANDLE STORE GLUE ---------------- #
+def baseline_from_store(scanner, store, session_date, n_days=BASELINE_DAYS):
+    """Previous close, average daily range and average cumulative volume curve from earlier sessions."""
+    n_sym = len(scanner.symbols)
+    prev_close = np.full(n_sym, np.nan)
+    avg_range = np.full(n_sym, np.nan)
+    avg_cumvol = np.full((n_sym, SESSION_MINUTES), np.nan)
+
+    for row, symbol in enumerate(scanner.symbols):
+        days = [d for d in store.dates(symbol) if d < str(session_date)][-n_days:]
+        if not days:
+            continue
+        ranges, curves = [], []
+        for day in days:
+            seg = store.get(symbol, day)
+            ranges.append(float(seg["high"].max() - seg["low"].min()))
+            start = to_epoch(f"{day} {SESSION_OPEN_UTC}")
+            minutes = (seg["ts"] - start) // 60
+            ok = (minutes >= 0) & (minutes < SESSION_MINUTES)
+            vol = np.zeros(SESSION_MINUTES)
+            vol[minutes[ok]] = seg["volume"][ok]
+            curves.append(np.cumsum(vol))
+        prev_close[row] = float(store.get(symbol, days[-1], ["close"])["close"][-1])
+        avg_range[row] = np.mean(ranges)
+        avg_cumvol[row] = np.mean(curves, axis=0)
+
+    # A zero average volume (illiquid / missing data) must not trigger infinite surges
+    avg_cumvol[avg_cumvol <= 0] = np.nan
+    scanner.set_baseline(prev_close, avg_range, avg_cumvol)
+
+
+def scanner_from_store(session_date, symbols=None, thresholds=None, store=None, only=False):
+    store = store or build_store()
+    symbols = symbols or store.symbols()
+    scanner = IntradayScanner(symbols, session_date, thresholds, only)
+    # change_pct needs only today's candles; the other rules need previous sessions
+    if any(scanner.thresholds[name] is not None for name in ("gap_pct", "range_expansion", "volume_surge")):
+        baseline_from_store(scanner, store, session_date)
+    for symbol in scanner.symbols:
+        scanner.update_symbol(symbol, store.get(symbol, session_date))
+    return scanner
+
+
+# ---------------- BENCHMARK ---------------- #
+def benchmark(n_symbols=2500, rounds=50):
+    rng = np.random.default_rng(7)
+    symbols = [f"SYM{i}" for i in range(n_symbols)]
+    scanner = IntradayScanner(symbols, "2026-05-19")
+
+    base = rng.uniform(50, 5000, n_symbols)
+    scanner.set_baseline(
+        prev_close=base,
+        avg_range=base * 0.03,
+        avg_cumvol=np.cumsum(np.full((n_symbols, SESSION_MINUTES), 1000.0), axis=1),
+    )
+    price = base.copy()
+    for minute in range(SESSION_MINUTES):
+        price *= 1 + rng.normal(0, 0.002, n_symbols)
+        scanner.update_minute(minute, price, price * 1.001, price * 0.999, price, rng.integers(0, 3000, n_symbols))
+
+    t = time.perf_counter()
+    for _ in range(rounds):
+        scanner.metrics()
+    per_metrics = (time.perf_counter() - t) / rounds
+
+    t = time.perf_counter()
+    for _ in range(rounds):
+        signals = scanner.scan(only_new=False)
+    per_scan = (time.perf_counter() - t) / rounds
+    log(f"⏱️ Metrics for {n_symbols} symbols: {per_metrics * 1000:.3f} ms")
+    log(f"⏱️ Scan incl. building {len(signals)} signals: {per_scan * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "scan"
+
+    if cmd == "bench":
+        benchmark()
+    elif cmd == "scan":
+        session_date = sys.argv[2] if len(sys.argv) > 2 else datetime.utcnow().strftime("%Y-%m-%d")
+        q = queue.Queue()
+        count = scanner_from_store(session_date).emit(q)
+        log(f"🚨 {count} signal(s) for {session_date}")
+        while not q.empty():
+            sig = q.get()
+            log(f"   {sig['Symbol']:12s} {sig['real_change']:+7.2f}% | {', '.join(sig['reasons'])}")
+    else:
+        print("usage: python scanner.py scan [YYYY-MM-DD] | bench")
+        sys.exit(1)
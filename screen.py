@@ -10,12 +10,17 @@ import mysql.connector
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
 from webdriver_manager.chrome import ChromeDriverManager
 
+from browser import prepare_options, setup_driver
+from capture import open_capture_backend, timeframe_urls
+from image_store import (prepare_image, check_image_columns, finish_run, prune_derivatives, screenshot_sql,
+                         screenshot_values, IMAGE_DERIVATIVES, SCREENSHOT_COLUMNS)
+from staging import StagingTable, PUBLISH_MODE
+from chart_render import render_many, panel_jobs
+from mv2_engine import load_panel
+
 
 # ---------------- CONFIG ---------------- #
 STOCK_LIST_URL = "https://docs.google.com/spreadsheets/d/1V8DsH-R3vdUbXqDKZYWHk_8T0VRjqTEVyj7PhlIDtG4/edit#gid=0"
@@ -43,6 +48,12 @@ DB_CONNECT_WAIT = 5
 
 PAGE_RETRY = 2
 
+# "browser" captures TradingView, "local" renders the charts from stored OHLCV (no browser)
+RENDER_MODE = os.getenv("RENDER_MODE", "browser").lower()
+
+TARGET_TABLE = "stock_screenshots"
+STAGE_COLUMNS = ["symbol", "timeframe", *SCREENSHOT_COLUMNS, "mv2_n_al"]
+
 
 # ---------------- HELPERS ---------------- #
 def log(msg):
@@ -151,13 +162,20 @@ class DB:
 
 
 def clear_db_before_run(db: DB):
+    """Truncates stock_screenshots, or in swap mode returns a StagingTable to build into."""
     cur = None
     try:
         conn = db.ensure()
         cur = conn.cursor()
+        check_image_columns(cur, TARGET_TABLE)
+
+        if PUBLISH_MODE == "swap":
+            return StagingTable(db, TARGET_TABLE, STAGE_COLUMNS, upsert_columns=STAGE_COLUMNS[2:]).create()
+
         log("🧹 Clearing old database entries...")
-        cur.execute("TRUNCATE TABLE stock_screenshots")
+        cur.execute(f"TRUNCATE TABLE {TARGET_TABLE}")
         log("✅ Database is clean.")
+        return None
     except Exception as e:
         log(f"❌ Error clearing database: {e}")
         raise
@@ -169,25 +187,37 @@ def clear_db_before_run(db: DB):
             pass
 
 
-def save_to_mysql(db: DB, symbol, timeframe, image, mv2_n_al_json):
-    query = """
+def save_to_mysql(db: DB, symbol, timeframe, image, mv2_n_al_json, stage=None):
+    image_cols, image_marks, image_updates = screenshot_sql()
+    query = f"""
         INSERT INTO stock_screenshots
-            (symbol, timeframe, screenshot, mv2_n_al)
+            (symbol, timeframe, {image_cols}, mv2_n_al)
         VALUES
-            (%s, %s, %s, %s)
+            (%s, %s, {image_marks}, %s)
         ON DUPLICATE KEY UPDATE
-            screenshot = VALUES(screenshot),
+            {image_updates},
             mv2_n_al = VALUES(mv2_n_al),
             created_at = CURRENT_TIMESTAMP
     """
 
+    # once, outside the retry loop: uploads and dedup/thumbnail bookkeeping must not repeat
+    try:
+        row = (symbol, timeframe, *screenshot_values(prepare_image(TARGET_TABLE, image, db.ensure())), mv2_n_al_json)
+    except Exception as e:
+        log(f"❌ Image store error {symbol} ({timeframe}): {e}")
+        return False
+
     last_err = None
     for attempt in range(1, DB_RETRY + 1):
         cur = None
         try:
             conn = db.ensure()
+            if stage is not None:
+                stage.add(row)
+                log(f"✅ [DB] Staged {symbol} ({timeframe})")
+                return True
             cur = conn.cursor()
-            cur.execute(query, (symbol, timeframe, image, mv2_n_al_json))
+            cur.execute(query, row)
             log(f"✅ [DB] Saved {symbol} ({timeframe})")
             return True
         except Exception as e:
@@ -220,11 +250,12 @@ def get_driver():
     opts.add_argument("--no-sandbox")
     opts.add_argument("--disable-dev-shm-usage")
     opts.add_argument("--window-size=1920,1080")
+    prepare_options(opts)
 
     service = Service(chrome_driver_path)
 
     log("🚀 Launching Chrome browser...")
-    driver = webdriver.Chrome(service=service, options=opts)
+    driver = setup_driver(webdriver.Chrome(service=service, options=opts), popups=True)
     log("✅ Browser started.")
 
     driver.execute_script("""
@@ -270,22 +301,21 @@ def inject_tv_cookies(driver):
         return False
 
 
-def wait_chart(driver):
-    return WebDriverWait(driver, CHART_WAIT_SEC).until(
-        EC.visibility_of_element_located((By.XPATH, "//div[contains(@class,'chart-container')]"))
-    )
+# ---------------- LOCAL RENDER ---------------- #
+LOCAL_TIMEFRAMES = {"day": "daily-month", "week": "week-month"}
 
 
-def open_with_retry(driver, url, retries=2):
-    for i in range(1, retries + 1):
-        try:
-            log(f"🌍 Opening URL attempt {i}/{retries}: {url}")
-            driver.get(url)
-            return True
-        except Exception as e:
-            log(f"⚠️ Page load failed attempt {i}/{retries}: {e}")
-            time.sleep(2)
-    return False
+def render_local_charts(db: DB, jobs, stage=None):
+    """Renders day/week charts for the triggered symbols in a process pool and saves them."""
+    log(f"🎨 Rendering {len(jobs)} symbols locally...")
+    panel = load_panel()
+    missing = set(jobs) - set(panel.symbols)
+    if missing:
+        log(f"⚠️ No stored candles for: {', '.join(sorted(missing))}")
+
+    for symbol, timeframe, img in render_many(list(panel_jobs(panel, list(jobs)))):
+        if img:
+            save_to_mysql(db, symbol, LOCAL_TIMEFRAMES[timeframe], img, jobs[symbol], stage)
 
 
 # ---------------- MAIN ---------------- #
@@ -295,7 +325,12 @@ def main():
     log(f"🔎 DB TARGET {DB_CONFIG['host']} / {DB_CONFIG['database']}:{DB_CONFIG['port']}")
 
     db = None
-    driver = None
+    backend = None
+    stage = None
+    local_jobs = {}
+    # (symbol, timeframe) -> url, captured after all rows are read
+    capture_jobs = {}
+    mv2_jsons = {}
 
     try:
         # =========================
@@ -305,7 +340,7 @@ def main():
         db = DB(DB_CONFIG)
 
         log("STEP 2: Clearing DB...")
-        clear_db_before_run(db)
+        stage = clear_db_before_run(db)
 
         # =========================
         # GOOGLE SHEETS
@@ -365,14 +400,18 @@ def main():
         # =========================
         # BROWSER
         # =========================
-        log("STEP 4: Starting browser...")
-
-        driver = get_driver()
-
-        log("STEP 5: Injecting TradingView cookies...")
-
-        if not inject_tv_cookies(driver):
-            return
+        if RENDER_MODE == "local":
+            log("STEP 4/5: Local render mode, no browser needed.")
+        else:
+            log("STEP 4/5: Starting browser and injecting TradingView cookies...")
+
+            backend = open_capture_backend(
+                get_driver,
+                inject_tv_cookies,
+                settle_sec=POST_LOAD_SLEEP,
+                wait_sec=CHART_WAIT_SEC,
+                retries=PAGE_RETRY
+            )
 
         mv2_headers = list(df_mv2.columns)
 
@@ -441,8 +480,12 @@ def main():
                 # =========================
                 # URLS
                 # =========================
-                day_url = day_url_map.get(symbol)
-                week_url = week_url_map.get(symbol)
+                urls = timeframe_urls({
+                    "day": day_url_map.get(symbol),
+                    "week": week_url_map.get(symbol)
+                })
+                day_url = urls["day"]
+                week_url = urls["week"]
 
                 # =========================
                 # MONTHLY TRIGGER ONLY
@@ -456,53 +499,17 @@ def main():
                         f"{MONTHLY_THRESHOLD})"
                     )
 
-                    # DAILY CHART
-                    if (
-                        day_url and
-                        "tradingview.com" in day_url
-                    ):
-
-                        if open_with_retry(
-                            driver,
-                            day_url,
-                            retries=PAGE_RETRY
-                        ):
-
-                            chart = wait_chart(driver)
-
-                            time.sleep(POST_LOAD_SLEEP)
-
-                            save_to_mysql(
-                                db,
-                                symbol,
-                                "daily-month",
-                                chart.screenshot_as_png,
-                                mv2_n_al_json
-                            )
-
-                    # WEEKLY CHART
-                    if (
-                        week_url and
-                        "tradingview.com" in week_url
-                    ):
-
-                        if open_with_retry(
-                            driver,
-                            week_url,
-                            retries=PAGE_RETRY
-                        ):
-
-                            chart = wait_chart(driver)
-
-                            time.sleep(POST_LOAD_SLEEP)
-
-                            save_to_mysql(
-                                db,
-                                symbol,
-                                "week-month",
-                                chart.screenshot_as_png,
-                                mv2_n_al_json
-                            )
+                    if RENDER_MODE == "local":
+                        local_jobs[symbol.upper()] = mv2_n_al_json
+                        continue
+
+                    mv2_jsons[symbol] = mv2_n_al_json
+
+                    if day_url and "tradingview.com" in day_url:
+                        capture_jobs[(symbol, "daily-month")] = day_url
+
+                    if week_url and "tradingview.com" in week_url:
+                        capture_jobs[(symbol, "week-month")] = week_url
 
             except Exception as e:
 
@@ -511,6 +518,28 @@ def main():
                     f"{symbol}: {e}"
                 )
 
+        # =========================
+        # CAPTURE
+        # =========================
+        if capture_jobs:
+            log(f"STEP 7: Capturing {len(capture_jobs)} charts...")
+
+            for (symbol, timeframe), img in backend.capture_many(capture_jobs.items()):
+                if img:
+                    save_to_mysql(db, symbol, timeframe, img, mv2_jsons[symbol], stage)
+
+        if local_jobs:
+            render_local_charts(db, local_jobs, stage)
+
+        finish_run(db.ensure())
+
+        if stage:
+            # nothing triggered is a valid (empty) snapshot; triggers with every capture failing are not
+            stage.publish(allow_empty=not (capture_jobs or local_jobs))
+
+        if IMAGE_DERIVATIVES:
+            prune_derivatives(db.ensure())
+
         log("🏁 MONTHLY RUN COMPLETED!")
 
     except Exception as e:
@@ -523,9 +552,12 @@ def main():
 
     finally:
 
+        if stage:
+            stage.discard()
+
         try:
-            if driver:
-                driver.quit()
+            if backend:
+                backend.close()
                 log("🛑 Browser closed.")
         except:
             pass
@@ -0,0 +1,151 @@
+import os
+import re
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+# "truncate" (default) keeps the old empty-then-refill behaviour. "swap" builds into
+# <table>_staging and publishes with RENAME TABLE; the bot's DB user then also needs
+# CREATE, DROP, ALTER and INSERT on the database (CREATE TABLE ... LIKE, index
+# drop/rebuild, RENAME TABLE, DROP TABLE <table>_old)
+PUBLISH_MODE = os.getenv("PUBLISH_MODE", "truncate").lower()
+STAGING_BATCH = int(os.getenv("STAGING_BATCH", "20"))   # rows per multi-row INSERT (BLOBs!)
+
+
+def log(msg):
+    print(msg, flush=True)
+
+
+class StagingTable:
+    """Builds a full snapshot of `table` next to it and swaps it in atomically.
+
+    Readers keep seeing the previous complete snapshot until publish(). Non-unique
+    secondary indexes are dropped on the staging copy while it fills and rebuilt
+    once right before the swap; unique keys stay so upserts keep working. The
+    AUTO_INCREMENT counter is carried over (CREATE TABLE ... LIKE resets it), so
+    ids keep growing across swaps.
+    """
+
+    def __init__(self, conn, table, columns, upsert_columns=None, batch=STAGING_BATCH):
+        # a DB wrapper with ensure() or a plain connection
+        self._conn = conn
+        self.table = table
+        self.staging = f"{table}_staging"
+        self.old = f"{table}_old"
+        self.columns = list(columns)
+        self.batch = batch
+        self.rows = []
+        self.count = 0
+        self.dropped_indexes = []
+        self.published = False
+
+        cols = ", ".join(f"`{c}`" for c in self.columns)
+        marks = ", ".join(["%s"] * len(self.columns))
+        self.insert_sql = f"INSERT INTO `{self.staging}` ({cols}) VALUES ({marks})"
+        if upsert_columns:
+            updates = ", ".join(f"`{c}` = VALUES(`{c}`)" for c in upsert_columns)
+            self.insert_sql += f" ON DUPLICATE KEY UPDATE {updates}"
+
+    @property
+    def conn(self):
+        return self._conn.ensure() if hasattr(self._conn, "ensure") else self._conn
+
+    def _execute(self, sql, params=None):
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql, params)
+        finally:
+            cur.close()
+
+    def secondary_indexes(self):
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+            SELECT INDEX_NAME, COLUMN_NAME, SUB_PART
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND NON_UNIQUE = 1
+            ORDER BY INDEX_NAME, SEQ_IN_INDEX
+            """,
+            (self.staging,)
+        )
+        indexes = {}
+        for row in cur.fetchall():
+            name, col, sub = (row["INDEX_NAME"], row["COLUMN_NAME"], row["SUB_PART"]) if isinstance(row, dict) else row
+            indexes.setdefault(name, []).append(f"`{col}`({sub})" if sub else f"`{col}`")
+        cur.close()
+        return list(indexes.items())
+
+    def auto_increment(self, table):
+        """Next AUTO_INCREMENT value from SHOW CREATE TABLE (information_schema may be cached)."""
+        cur = self.conn.cursor()
+        try:
+            cur.execute(f"SHOW CREATE TABLE `{table}`")
+            row = cur.fetchone()
+        finally:
+            cur.close()
+        ddl = list(row.values())[1] if isinstance(row, dict) else row[1]
+        match = re.search(r"AUTO_INCREMENT=(\d+)", ddl)
+        return int(match.group(1)) if match else None
+
+    def create(self):
+        self._execute(f"DROP TABLE IF EXISTS `{self.staging}`")
+        self._execute(f"CREATE TABLE `{self.staging}` LIKE `{self.table}`")
+        next_id = self.auto_increment(self.table)
+        if next_id:
+            self._execute(f"ALTER TABLE `{self.staging}` AUTO_INCREMENT = {next_id}")
+        self.dropped_indexes = self.secondary_indexes()
+        if self.dropped_indexes:
+            drops = ", ".join(f"DROP INDEX `{name}`" for name, _ in self.dropped_indexes)
+            self._execute(f"ALTER TABLE `{self.staging}` {drops}")
+        log(f"🏗️ Building `{self.staging}` (publishes to `{self.table}` at the end)")
+        return self
+
+    def add(self, row):
+        self.rows.append(tuple(row))
+        if len(self.rows) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        cur = self.conn.cursor()
+        try:
+            cur.executemany(self.insert_sql, self.rows)
+        finally:
+            cur.close()
+        self.conn.commit()
+        self.count += len(self.rows)
+        self.rows = []
+
+    def publish(self, allow_empty=False):
+        """Swaps the staged snapshot in. An empty snapshot is only published with
+        allow_empty=True (the run legitimately had nothing to show); otherwise the
+        previous snapshot is kept and False is returned."""
+        self.flush()
+        if not self.count and not allow_empty:
+            log(f"⚠️ Nothing staged for `{self.table}`, keeping the previous snapshot")
+            self.discard()
+            return False
+        if self.dropped_indexes:
+            adds = ", ".join(f"ADD INDEX `{name}` ({', '.join(cols)})" for name, cols in self.dropped_indexes)
+            self._execute(f"ALTER TABLE `{self.staging}` {adds}")
+
+        self._execute(f"DROP TABLE IF EXISTS `{self.old}`")
+        # Both renames happen in one atomic statement: readers see the old or the new table, never none
+        self._execute(
+            f"RENAME TABLE `{self.table}` TO `{self.old}`, `{self.staging}` TO `{self.table}`"
+        )
+        self._execute(f"DROP TABLE `{self.old}`")
+        self.published = True
+        log(f"🚀 Published {self.count} rows to `{self.table}`")
+        return True
+
+    def discard(self):
+        if self.published:
+            return
+        self.rows = []
+        try:
+            self._execute(f"DROP TABLE IF EXISTS `{self.staging}`")
+        except Exception as e:
+            log(f"⚠️ Could not drop `{self.staging}`: {e}")
@@ -0,0 +1,73 @@
+import json
+
+from alert_engine import (AlertEngine, LevelBook, alert_direction, alert_level, dirty_rows,
+                          merge_fired)
+
+
+def parse(raw_json, symbol, filter_id):
+    data = json.loads(raw_json)
+    return [data] if isinstance(data, dict) else data
+
+
+def test_level_and_direction():
+    assert alert_level({"price": "12.5"}) == 12.5
+    assert alert_level({"price": "", "level": 3}) == 3.0
+    assert alert_level({"note": "x"}) is None
+    assert alert_direction({"condition": "Crossing Above"}) == "above"
+    assert alert_direction({"operator": "<="}) == "below"
+    assert alert_direction({}) == "cross"
+
+
+def test_level_book():
+    book = LevelBook()
+    for direction, level in [("above", 105), ("above", 110), ("below", 95), ("below", 90), ("cross", 100)]:
+        book.add(direction, level, (direction, level))
+
+    assert book.evaluate(99, 101, 100.5) == [("cross", 100)]
+    assert book.evaluate(94, 106, 105) == [("above", 105), ("below", 95)]
+    # the gap from the previous close counts for cross levels only
+    book.add("cross", 107, ("cross", 107))
+    assert book.evaluate(108, 109, 108.5) == [("cross", 107)]
+    assert len(book) == 2
+
+
+def test_engine_fires_and_rebuilds_json():
+    rows = [
+        {"id": 1, "symbol": "aaa", "alerts_json": json.dumps(
+            {"id": "a1", "active": 1, "triggered": 0, "price": 10, "condition": "above"})},
+        {"id": 2, "symbol": "AAA", "alerts_json": json.dumps([
+            {"id": "b1", "active": 1, "triggered": 0, "price": 8, "condition": "below"},
+            {"id": "b2", "active": 0, "triggered": 0, "price": 9, "condition": "below"},
+            {"id": "b3", "active": 1, "triggered": 2, "price": 9, "condition": "below"},
+        ])},
+    ]
+    engine = AlertEngine()
+    engine.load(rows, parse)
+    assert engine.loaded == 2
+
+    assert engine.on_candle("AAA", 9, 10.5, 10.2, ts=0) != []
+    assert engine.on_candle("BBB", 1, 100, 50) == []
+    rebuilt = dirty_rows(rows)
+    assert [r["id"] for r in rebuilt] == [1]
+    obj = json.loads(rows[0]["alerts_json"])
+    assert obj["triggered"] == 1 and obj["triggered_price"] == 10.2
+    assert obj["triggered_at"] == "1970-01-01 00:00:00"
+
+
+def test_merge_fired():
+    fired = [{"id": "a1", "triggered": 1, "triggered_at": "2026-05-19 04:00:00", "triggered_price": 10.2}]
+
+    edited = json.dumps([{"id": "a1", "active": 1, "triggered": 0, "note": "new"}, {"id": "x"}])
+    merged = json.loads(merge_fired(edited, fired))
+    assert merged[0] == {"id": "a1", "active": 1, "triggered": 1, "note": "new",
+                         "triggered_at": "2026-05-19 04:00:00", "triggered_price": 10.2}
+    assert merged[1] == {"id": "x"}
+
+    single = json.loads(merge_fired(json.dumps({"id": "a1", "active": 1}), fired))
+    assert isinstance(single, dict) and single["triggered"] == 1
+
+    # deactivated, already triggered, removed or unreadable: nothing to write
+    assert merge_fired(json.dumps({"id": "a1", "active": 0}), fired) is None
+    assert merge_fired(json.dumps({"id": "a1", "active": 1, "triggered": 3}), fired) is None
+    assert merge_fired(json.dumps([{"id": "zz", "active": 1}]), fired) is None
+    assert merge_fired("{broken", fired) is None
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+import backtest
+import mv2_engine
+from backtest import cached_indicators, forward_returns, panel_key, rule_d_trigger_s, run_backtest
+from mv2_engine import DailyPanel
+
+nan = np.nan
+
+
+def small_panel():
+    dates = pd.bdate_range("2026-03-02", periods=8)
+    closes = [10, 9, 8, 12, 11, 13, 12, 14]
+    df = pd.DataFrame({"Symbol": "AAA", "Date": dates, "Open": closes, "Close": closes,
+                       "High": np.add(closes, 0.5), "Low": np.subtract(closes, 0.5), "Volume": 1000})
+    return DailyPanel.from_frame(df)
+
+
+def short_windows(monkeypatch, tmp_path):
+    for name, value in (("MXMN_WINDOW", 3), ("CL_AB_WINDOW", 3), ("TRIGGER_WINDOW", 2), ("TRIGGER_S_WINDOW", 2)):
+        monkeypatch.setattr(mv2_engine, name, value)
+    monkeypatch.setattr(backtest, "CACHE_DIR", str(tmp_path))
+
+
+def test_forward_returns():
+    close = np.array([[10.0, 11, nan, 12]])
+    np.testing.assert_allclose(forward_returns(close, 1), [[0.1, nan, nan, nan]])
+    np.testing.assert_allclose(forward_returns(close, 2), [[nan, 12 / 11 - 1, nan, nan]])
+
+
+def test_d_trigger_s_excludes_d_trigger_days():
+    ind = {"D_Trigger": np.array([[0, 3, -1]]), "D_Trigger_S": np.array([[0, 0, 2]])}
+    np.testing.assert_array_equal(rule_d_trigger_s(ind), [[False, True, False]])
+
+
+def test_run_backtest(monkeypatch, tmp_path):
+    short_windows(monkeypatch, tmp_path)
+    stats = run_backtest(small_panel(), ["D_Trigger"], horizons=[1, 2]).set_index("horizon")
+
+    # close breaks the prior 2-day high on days 3, 5 and 7; day 7 has no forward bar
+    assert stats.loc[1, "signals"] == 3 and stats.loc[1, "evaluated"] == 2
+    assert stats.loc[1, "hit_rate"] == 0.0
+    assert np.isclose(stats.loc[1, "mean_ret"], (11 / 12 - 1 + 12 / 13 - 1) / 2)
+    assert stats.loc[2, "evaluated"] == 2 and stats.loc[2, "hit_rate"] == 1.0
+
+    late = run_backtest(small_panel(), ["D_Trigger"], horizons=[1], start="2026-03-09")
+    assert late.loc[0, "signals"] == 2
+
+
+def test_indicator_cache(monkeypatch, tmp_path):
+    short_windows(monkeypatch, tmp_path)
+    panel = small_panel()
+    first = cached_indicators(panel)
+    assert len(list(tmp_path.iterdir())) == 1
+    again = cached_indicators(panel)
+    for name, arr in first.items():
+        np.testing.assert_array_equal(again[name], arr)
+
+    key = panel_key(panel)
+    monkeypatch.setattr(mv2_engine, "TRIGGER_WINDOW", 3)
+    assert panel_key(panel) != key
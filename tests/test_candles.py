@@ -0,0 +1,75 @@
+import numpy as np
+
+from candles import CandleStore, build_store, to_epoch
+
+HEADER = "Datetime,Close,High,Low,Open,Volume\n,{sym}.NS,{sym}.NS,{sym}.NS,{sym}.NS,{sym}.NS\n"
+
+
+def write_csv(data_dir, symbol, date, rows):
+    lines = [f"{date} {t}:00+00:00,{c},{h},{l},{o},{v}" for t, o, h, l, c, v in rows]
+    (data_dir / f"{symbol}_{date}.csv").write_text(HEADER.format(sym=symbol) + "\n".join(lines) + "\n")
+
+
+def make_store(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    write_csv(data_dir, "AAA", "2026-05-18", [("03:45", 10, 11, 9, 10.5, 100), ("03:46", 10.5, 12, 10, 11, 200)])
+    write_csv(data_dir, "AAA", "2026-05-19", [("03:45", 11, 11, 10, 10.2, 50), ("03:47", 10.2, 10.4, 10, 10.3, 70)])
+    write_csv(data_dir, "BBB", "2026-05-19", [("03:46", 20, 21, 19, 20.5, 300)])
+    return data_dir, tmp_path / "store"
+
+
+def test_to_epoch():
+    assert to_epoch(1_700_000_000) == 1_700_000_000
+    assert to_epoch("1970-01-02") == 86400
+    assert to_epoch("1970-01-01 00:01") == 60
+
+
+def test_build_and_query(tmp_path):
+    data_dir, store_dir = make_store(tmp_path)
+    store = build_store(str(data_dir), str(store_dir))
+
+    assert store.symbols() == ["AAA", "BBB"]
+    assert store.dates("aaa") == ["2026-05-18", "2026-05-19"]
+    seg = store.get("AAA", "2026-05-19")
+    np.testing.assert_array_equal(seg["close"], [10.2, 10.3])
+    np.testing.assert_array_equal(seg["volume"], [50, 70])
+    assert store.get("BBB", "2026-05-18") is None
+
+    seg = store.slice("AAA", "2026-05-18 03:46", "2026-05-19 03:46", ["close"])
+    np.testing.assert_array_equal(seg["close"], [11.0, 10.2])
+
+
+def test_align_ffill(tmp_path):
+    data_dir, store_dir = make_store(tmp_path)
+    store = build_store(str(data_dir), str(store_dir))
+
+    grid, matrix = store.align(["AAA", "BBB", "ZZZ"], "2026-05-19 03:45", "2026-05-19 03:48")
+    assert len(grid) == 3
+    np.testing.assert_array_equal(matrix[0], [10.2, np.nan, 10.3])
+    np.testing.assert_array_equal(matrix[1], [np.nan, 20.5, np.nan])
+    assert np.isnan(matrix[2]).all()
+
+    _, filled = store.align(["AAA", "BBB"], "2026-05-19 03:45", "2026-05-19 03:48", ffill=True)
+    np.testing.assert_array_equal(filled[0], [10.2, 10.2, 10.3])
+    np.testing.assert_array_equal(filled[1], [np.nan, 20.5, 20.5])
+
+
+def test_rebuild_reuses_and_dedupes(tmp_path):
+    data_dir, store_dir = make_store(tmp_path)
+    write_csv(data_dir, "bbb", "2026-05-19", [("03:47", 20.5, 22, 20, 21.5, 400), ("03:48", 21.5, 22, 21, 21.8, 90)])
+    store = build_store(str(data_dir), str(store_dir))
+    np.testing.assert_array_equal(store.get("BBB", "2026-05-19")["close"], [20.5, 21.5, 21.8])
+    store.close()
+
+    # changed file is reconverted, untouched symbol-days come from the old store
+    write_csv(data_dir, "AAA", "2026-05-19", [("03:45", 11, 11, 10, 10.1, 50)])
+    # BBB and bbb share a symbol-day: both are re-read, the fresh 03:46 row wins over the
+    # cached one and the minute dropped from bbb is gone
+    write_csv(data_dir, "bbb", "2026-05-19", [("03:46", 20, 21, 19, 20.9, 300), ("03:47", 20.5, 22, 20, 21.5, 400)])
+    store = build_store(str(data_dir), str(store_dir))
+    np.testing.assert_array_equal(store.get("AAA", "2026-05-18")["close"], [10.5, 11.0])
+    np.testing.assert_array_equal(store.get("AAA", "2026-05-19")["close"], [10.1])
+    np.testing.assert_array_equal(store.get("BBB", "2026-05-19")["close"], [20.9, 21.5])
+
+    assert isinstance(build_store(str(data_dir), str(store_dir)), CandleStore)
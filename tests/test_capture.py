@@ -0,0 +1,199 @@
+import base64
+from types import SimpleNamespace
+
+import capture
+from capture import (SeleniumCapture, TabPipelineCapture, _norm_interval, chart_url_parts, ticker_matches, timeframe_urls,
+                     with_interval)
+
+LAYOUT = "https://www.tradingview.com/chart/AbC/?symbol={}&interval=D"
+OTHER = "https://www.tradingview.com/chart/XyZ/?symbol={}&interval=D"
+URL = "https://www.tradingview.com/chart/AbC/?symbol=NSE%3AINFY&interval=D&theme=dark"
+
+
+class FakeDriver:
+    """Just enough WebDriver for the capture engines: page loads and CDP screenshots
+    whose bytes name the URL on screen."""
+
+    def __init__(self):
+        self.loaded = []
+        self.url = None
+
+    def get(self, url):
+        self.loaded.append(url)
+        self.url = url
+
+    def execute_script(self, script, *args):
+        if "getBoundingClientRect" in script:
+            return {"x": 0, "y": 0, "width": 100, "height": 50}
+        return None
+
+    def execute_cdp_cmd(self, cmd, params):
+        if cmd == "Page.captureScreenshot":
+            return {"data": base64.b64encode(f"png:{self.url}".encode()).decode()}
+        return {}
+
+    def find_element(self, by, xpath):
+        return "chart"
+
+
+class WindowDriver(FakeDriver):
+    """FakeDriver with several windows; a chart becomes ready after `ready_after`
+    readiness polls, URLs containing NEVER never do."""
+
+    def __init__(self, ready_after=2):
+        super().__init__()
+        self.ready_after = ready_after
+        self.handles = ["w0"]
+        self.current_window_handle = "w0"
+        self.urls = {}
+        self.polls = {}
+        self.switch_to = SimpleNamespace(window=self._window, new_window=self._new_window)
+
+    def _window(self, handle):
+        self.current_window_handle = handle
+        self.url = self.urls.get(handle)
+
+    def _new_window(self, kind):
+        self._window(f"w{len(self.handles)}")
+        self.handles.append(self.current_window_handle)
+
+    def get_window_size(self):
+        return {"width": 1920, "height": 1080}
+
+    def set_window_size(self, width, height):
+        pass
+
+    def execute_script(self, script, *args):
+        handle = self.current_window_handle
+        if "window.location.href" in script:
+            self.loaded.append(args[0])
+            self.urls[handle] = self.url = args[0]
+            self.polls[handle] = 0
+            return None
+        if "__captureStale" in script:
+            self.polls[handle] += 1
+            return "NEVER" not in self.url and self.polls[handle] > self.ready_after
+        return super().execute_script(script, *args)
+
+
+def selenium_capture(monkeypatch, driver, **kwargs):
+    monkeypatch.setattr(capture, "By", SimpleNamespace(XPATH="xpath"))
+    monkeypatch.setattr(capture, "CAPTURE_BACKEND", "cdp")
+    monkeypatch.setattr(capture, "SWITCH_SETTLE_SEC", 0)
+    cap = SeleniumCapture(driver, settle_sec=0, **kwargs)
+    cap._load = lambda url: (driver.get(url), "chart")[1]
+    return cap
+
+
+def test_ticker_matches_whole_token():
+    assert ticker_matches("INFY", "NSE:INFY")
+    assert ticker_matches("NSE:M&M", "M&M")
+    assert ticker_matches("BAJAJ-AUTO · 1D", "NSE:BAJAJ-AUTO")
+    # header still showing the previous, longer ticker
+    assert not ticker_matches("M&MFIN", "NSE:M&M")
+    assert not ticker_matches("SBINEQWT", "NSE:SBIN")
+    assert not ticker_matches("", "NSE:INFY")
+
+
+def test_symbol_switch_reuses_loaded_chart(monkeypatch):
+    switched = []
+    monkeypatch.setattr(capture, "switch_symbol", lambda d, symbol: switched.append(symbol) or True)
+    driver = FakeDriver()
+    cap = selenium_capture(monkeypatch, driver, switch=True, interval_switch=False)
+
+    jobs = [("tcs", LAYOUT.format("NSE:TCS")), ("infy2", OTHER.format("NSE:INFY")), ("infy", LAYOUT.format("NSE:INFY"))]
+    out = dict(cap.capture_many(jobs))
+
+    # grouped by layout: one load per layout, the second symbol of AbC is switched in place
+    assert driver.loaded == [LAYOUT.format("NSE:INFY"), OTHER.format("NSE:INFY")]
+    assert switched == ["NSE:TCS"]
+    assert set(out) == {"tcs", "infy", "infy2"} and all(out.values())
+    assert cap.loaded == chart_url_parts(OTHER.format("NSE:INFY"))
+
+
+def test_unconfirmed_symbol_switch_reloads(monkeypatch):
+    monkeypatch.setattr(capture, "switch_symbol", lambda d, symbol: False)
+    driver = FakeDriver()
+    cap = selenium_capture(monkeypatch, driver, switch=True, interval_switch=False)
+
+    list(cap.capture_many([("a", LAYOUT.format("NSE:INFY")), ("b", LAYOUT.format("NSE:TCS"))]))
+    assert driver.loaded == [LAYOUT.format("NSE:INFY"), LAYOUT.format("NSE:TCS")]
+
+
+def test_chart_url_parts():
+    base, symbol, interval = chart_url_parts(URL)
+    assert base == "https://www.tradingview.com/chart/AbC/?theme=dark"
+    assert (symbol, interval) == ("NSE:INFY", "D")
+
+
+def test_with_interval_replaces():
+    url = with_interval(URL, "1W")
+    assert chart_url_parts(url)[1:] == ("NSE:INFY", "1W")
+    assert url.count("interval=") == 1
+
+
+def test_timeframe_urls(monkeypatch):
+    urls = {"day": URL, "week": "https://www.tradingview.com/chart/XyZ/?symbol=NSE%3AINFY&interval=W"}
+    monkeypatch.setattr(capture, "INTERVAL_SWITCH", False)
+    assert timeframe_urls(urls) is urls
+
+    monkeypatch.setattr(capture, "INTERVAL_SWITCH", True)
+    out = timeframe_urls(urls)
+    assert chart_url_parts(out["day"]) == (chart_url_parts(URL)[0], "NSE:INFY", "1D")
+    assert chart_url_parts(out["week"]) == (chart_url_parts(URL)[0], "NSE:INFY", "1W")
+    assert timeframe_urls({"week": urls["week"]}) == {"week": urls["week"]}
+
+
+def test_norm_interval():
+    assert _norm_interval("1D") == _norm_interval(" d ") == "D"
+    assert _norm_interval("1W") == "W"
+    assert _norm_interval("15") == "15"
+
+
+def test_interval_switch_after_day_capture(monkeypatch):
+    switched = []
+    monkeypatch.setattr(capture, "switch_interval", lambda d, interval: switched.append(interval) or True)
+    monkeypatch.setattr(capture, "INTERVAL_SWITCH", True)
+    driver = FakeDriver()
+    cap = selenium_capture(monkeypatch, driver, switch=False, interval_switch=True)
+
+    urls = timeframe_urls({"day": LAYOUT.format("NSE:INFY"), "week": OTHER.format("NSE:INFY")})
+    out = dict(cap.capture_many([(("INFY", "week"), urls["week"]), (("INFY", "day"), urls["day"])]))
+
+    assert driver.loaded == [urls["day"]]
+    assert switched == ["1W"]
+    assert all(out.values())
+    # a different symbol is not switched when only interval switching is on
+    list(cap.capture_many([("tcs", with_interval(LAYOUT.format("NSE:TCS"), "1W"))]))
+    assert driver.loaded[-1] == with_interval(LAYOUT.format("NSE:TCS"), "1W")
+
+
+def tab_capture(monkeypatch, driver, **kwargs):
+    monkeypatch.setattr(capture, "By", SimpleNamespace(XPATH="xpath"))
+    monkeypatch.setattr(capture, "CAPTURE_BACKEND", "cdp")
+    monkeypatch.setattr(capture, "TAB_POLL_SEC", 0)
+    return TabPipelineCapture(driver, settle_sec=0, **kwargs)
+
+
+def test_tab_pipeline_captures_every_job(monkeypatch):
+    driver = WindowDriver()
+    cap = tab_capture(monkeypatch, driver, depth=3)
+    jobs = [(i, LAYOUT.format(f"NSE:S{i}")) for i in range(7)]
+
+    out = dict(cap.capture_many(jobs))
+    assert driver.handles == ["w0", "w1", "w2"]
+    assert sorted(driver.loaded) == sorted(url for _, url in jobs)
+    # each window's screenshot is of the chart that window loaded for that job
+    assert {key: img.decode() for key, img in out.items()} == {key: f"png:{url}" for key, url in jobs}
+
+
+def test_tab_pipeline_times_out_a_stuck_chart(monkeypatch):
+    driver = WindowDriver()
+    cap = tab_capture(monkeypatch, driver, depth=2, wait_sec=0.05)
+    jobs = [("ok", LAYOUT.format("NSE:INFY")), ("stuck", LAYOUT.format("NEVER")), ("next", LAYOUT.format("NSE:TCS"))]
+
+    out = dict(cap.capture_many(jobs))
+    assert out["stuck"] is None
+    assert out["ok"] and out["next"]
+    assert len(driver.handles) == 2
+    assert list(cap.capture_many([])) == []
@@ -0,0 +1,31 @@
+import numpy as np
+
+from chart_render import ema, sma, weekly_bars
+
+
+def test_weekly_bars():
+    # Thu, Fri | Mon, Tue, Wed | Mon (week with a holiday gap)
+    dates = np.array(["2026-01-01", "2026-01-02", "2026-01-05", "2026-01-06", "2026-01-07", "2026-01-12"],
+                     dtype="datetime64[D]")
+    o = np.array([1.0, 2, 3, 4, 5, 6])
+    h = np.array([10.0, 12, 9, 15, 11, 7])
+    l = np.array([0.5, 1, 2, 1.5, 3, 5])
+    c = np.array([1.5, 2.5, 3.5, 4.5, 5.5, 6.5])
+    v = np.array([1.0, 2, 3, 4, 5, 6])
+
+    weeks, wo, wh, wl, wc, wv = weekly_bars(dates, o, h, l, c, v)
+    np.testing.assert_array_equal(weeks, np.array(["2025-12-29", "2026-01-05", "2026-01-12"], dtype="datetime64[D]"))
+    np.testing.assert_array_equal(wo, [1, 3, 6])
+    np.testing.assert_array_equal(wh, [12, 15, 7])
+    np.testing.assert_array_equal(wl, [0.5, 1.5, 5])
+    np.testing.assert_array_equal(wc, [2.5, 5.5, 6.5])
+    np.testing.assert_array_equal(wv, [3, 12, 6])
+
+
+def test_moving_averages():
+    close = np.array([1.0, 2, 3, 4])
+    np.testing.assert_array_equal(sma(close, 2), [np.nan, 1.5, 2.5, 3.5])
+    np.testing.assert_array_equal(sma(close, 5), [np.nan] * 4)
+    out = ema(close, 3)
+    assert np.isnan(out[:2]).all()
+    assert np.isclose(out[-1], 0.5 * 4 + 0.5 * (0.5 * 3 + 0.5 * (0.5 * 2 + 0.5 * 1)))
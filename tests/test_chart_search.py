@@ -0,0 +1,96 @@
+import numpy as np
+
+from candles import to_epoch
+from chart_search import MIN_CANDLES, VECTOR_LEN, ChartIndex, build_index, extract_features, shape_vector
+
+SESSION = to_epoch("2026-05-18 03:45")
+
+
+def session_path(prices, step=60):
+    prices = np.asarray(prices, dtype=float)
+    return SESSION + np.arange(len(prices)) * step, prices
+
+
+def test_shape_vector_ignores_price_level_and_scale():
+    ts, close = session_path(100 + np.sin(np.linspace(0, 3, 200)))
+    a = shape_vector(ts, close, SESSION)
+    b = shape_vector(ts, close * 7, SESSION)
+
+    assert a.shape == (VECTOR_LEN,) and a.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(a), 1, rtol=1e-5)
+    np.testing.assert_allclose(a.sum(), 0, atol=1e-5)
+    np.testing.assert_allclose(a, b, atol=1e-6)
+
+
+def test_shape_vector_rejects_sparse_and_flat_days():
+    ts, close = session_path(np.arange(MIN_CANDLES - 1) + 100.0)
+    assert shape_vector(ts, close, SESSION) is None
+    # Candles before the open do not count towards MIN_CANDLES
+    ts, close = session_path(np.arange(MIN_CANDLES + 5) + 100.0)
+    assert shape_vector(ts - 10 * 60, close, SESSION) is None
+    ts, close = session_path(np.full(100, 50.0))
+    assert shape_vector(ts, close, SESSION) is None
+
+
+def test_shape_vector_forward_fills_gaps():
+    ts, close = session_path(np.linspace(100, 110, 60), step=120)
+    dense_ts, dense_close = session_path(np.repeat(np.linspace(100, 110, 60), 2))
+    np.testing.assert_allclose(shape_vector(ts, close, SESSION), shape_vector(dense_ts, dense_close, SESSION),
+                               atol=1e-6)
+
+
+class FakeStore:
+    def __init__(self, days):
+        self.days = days
+
+    def symbols(self):
+        return sorted({s for s, _ in self.days})
+
+    def dates(self, symbol):
+        return sorted(d for s, d in self.days if s == symbol)
+
+    def get(self, symbol, day, columns):
+        ts, close = self.days[(symbol, day)]
+        return {"ts": ts, "close": close}
+
+
+def test_extract_features_skips_sparse_days():
+    up = session_path(np.linspace(100, 120, 100))
+    store = FakeStore({("AAA", "2026-05-18"): up,
+                       ("BBB", "2026-05-18"): session_path([100.0] * 5)})
+    keys, vectors = extract_features(store)
+    assert keys == ["AAA|2026-05-18"]
+    assert vectors.shape == (1, VECTOR_LEN)
+
+
+def random_unit_vectors(n, seed=1):
+    vectors = np.cumsum(np.random.default_rng(seed).normal(size=(n, VECTOR_LEN)), axis=1).astype(np.float32)
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_index_matches_brute_force_when_probing_all_lists(tmp_path):
+    vectors = random_unit_vectors(400)
+    keys = [f"SYM{i}|2026-05-{i % 28 + 1:02d}" for i in range(len(vectors))]
+    index = build_index(keys, vectors, str(tmp_path), n_lists=8)
+
+    q = vectors[17]
+    hits = index.query(q, k=5, n_probe=len(index.centroids))
+    exact = np.argsort(vectors @ q)[::-1][:5]
+    assert [f"{s}|{d}" for s, d, _ in hits] == [keys[i] for i in exact]
+    assert hits[0][0] == "SYM17"
+    np.testing.assert_allclose(hits[0][2], 1, rtol=1e-5)
+
+    # The files on disk reload to the same index
+    assert ChartIndex(str(tmp_path)).query(q, k=5, n_probe=8) == hits
+
+
+def test_similar_to_excludes_the_query_day(tmp_path):
+    vectors = random_unit_vectors(100)
+    keys = [f"SYM{i}|2026-05-18" for i in range(len(vectors))]
+    index = build_index(keys, vectors, str(tmp_path), n_lists=4)
+
+    hits = index.similar_to("sym3", "2026-05-18", k=3, n_probe=4)
+    assert len(hits) == 3
+    assert ("SYM3", "2026-05-18") not in [(s, d) for s, d, _ in hits]
+    assert index.similar_to("NOPE", "2026-05-18") == []
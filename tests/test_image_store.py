@@ -0,0 +1,301 @@
+import hashlib
+import io
+from datetime import datetime
+
+import pytest
+
+import image_store
+from image_store import (IMAGE_COLUMNS, DedupStats, DerivativeQueue, LocalImageStore, check_image_columns, image_ext,
+                         load_image, make_derivatives, prepare_image, prune_derivatives, register_image,
+                         save_derivatives, screenshot_sql, screenshot_values)
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+JPG = b"\xff\xd8\xff\xe0" + b"\x00" * 32
+
+
+class FakeCursor:
+    """information_schema answers for the schema checks; every statement is recorded."""
+
+    def __init__(self, columns=(), tables=()):
+        self.columns = columns
+        self.tables = tables
+        self.sql = []
+        self.result = []
+
+    def execute(self, sql, params=None):
+        self.sql.append(sql)
+        if "information_schema.COLUMNS" in sql:
+            self.result = [(name, nullable) for name, nullable in self.columns]
+        elif "information_schema.TABLES" in sql:
+            self.result = [(1,)] if params[0] in self.tables else []
+        else:
+            self.result = []
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+
+@pytest.fixture
+def local_store(monkeypatch, tmp_path):
+    store = LocalImageStore(str(tmp_path))
+    monkeypatch.setattr(image_store, "IMAGE_STORE", "local")
+    monkeypatch.setattr(image_store, "_store", store)
+    return store
+
+
+def image_refs(monkeypatch, on):
+    monkeypatch.setattr(image_store, "IMAGE_REFS", on)
+    monkeypatch.setattr(image_store, "SCREENSHOT_COLUMNS", ["screenshot"] + (list(IMAGE_COLUMNS) if on else []))
+
+
+def test_image_ext():
+    assert image_ext(PNG) == "png"
+    assert image_ext(JPG) == "jpg"
+    assert image_ext(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "webp"
+    assert image_ext(b"<html>") == "bin"
+
+
+def test_local_store_roundtrip(tmp_path):
+    store = LocalImageStore(str(tmp_path))
+    store.put("t/2026/05/19/a.png", PNG)
+    assert store.exists("t/2026/05/19/a.png")
+    assert store.get("t/2026/05/19/a.png") == PNG
+    store.delete("t/2026/05/19/a.png")
+    store.delete("t/2026/05/19/a.png")
+    assert not store.exists("t/2026/05/19/a.png")
+
+
+def test_prepare_image_inline():
+    sha = hashlib.sha256(PNG).hexdigest()
+    assert prepare_image("stock_screenshots", PNG) == (PNG, None, len(PNG), sha)
+    assert prepare_image("stock_screenshots", b"") == (None, None, None, None)
+
+
+def test_prepare_image_offloads_to_store(local_store):
+    blob, key, size, sha = prepare_image("stock_screenshots", PNG)
+    assert blob is None and size == len(PNG)
+    assert key == f"stock_screenshots/{datetime.utcnow():%Y/%m/%d}/{sha}.png"
+    assert load_image(blob, key) == PNG
+    assert load_image(JPG, None) == JPG
+
+
+def test_inline_mode_writes_only_screenshot(monkeypatch):
+    image_refs(monkeypatch, False)
+    prepared = prepare_image("stock_screenshots", PNG)
+    assert screenshot_values(prepared) == (PNG,)
+    assert screenshot_sql() == ("screenshot", "%s", "screenshot = VALUES(screenshot)")
+
+    # nothing to check on the existing schema, not even a query
+    cur = FakeCursor(columns=[("screenshot", "NO")])
+    check_image_columns(cur, "stock_screenshots")
+    assert cur.sql == []
+
+
+def test_reference_columns_when_offloading(monkeypatch, local_store):
+    image_refs(monkeypatch, True)
+    prepared = prepare_image("stock_screenshots", PNG)
+    assert screenshot_values(prepared) == prepared
+    cols, marks, updates = screenshot_sql()
+    assert cols == "screenshot, screenshot_key, screenshot_size, screenshot_sha256"
+    assert marks == "%s, %s, %s, %s"
+    assert updates.endswith("screenshot_sha256 = VALUES(screenshot_sha256)")
+
+    with pytest.raises(RuntimeError, match="screenshot_key.*NOT NULL.*image_store.py schema stock_screenshots"):
+        check_image_columns(FakeCursor(columns=[("screenshot", "NO")]), "stock_screenshots")
+    ready = [("screenshot", "YES")] + [(col, "YES") for col in IMAGE_COLUMNS]
+    check_image_columns(FakeCursor(columns=ready), "stock_screenshots")
+
+
+class ImagesDB:
+    """screenshot_images as a dict, for the statements register_image / load_image run."""
+
+    def __init__(self):
+        self.rows = {}
+        self.selects = 0
+
+    def cursor(self):
+        return ImagesCursor(self)
+
+
+class ImagesCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+        self.rowcount = 0
+
+    def execute(self, sql, params):
+        sha = params[0]
+        if sql.lstrip().startswith("SELECT"):
+            self.db.selects += 1
+            row = self.db.rows.get(sha)
+            col = "storage_key" if "storage_key" in sql else "data"
+            self.result = [(row[col],)] if row else []
+        elif "INSERT IGNORE" in sql:
+            self.rowcount = 0 if sha in self.db.rows else 1
+            self.db.rows.setdefault(sha, {"size": params[1], "ext": params[2], "storage_key": params[3],
+                                          "data": params[4]})
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def dedup(monkeypatch):
+    monkeypatch.setattr(image_store, "IMAGE_DEDUP", True)
+    monkeypatch.setattr(image_store, "_known_keys", {})
+    monkeypatch.setattr(image_store, "dedup_stats", DedupStats())
+    return ImagesDB()
+
+
+def test_dedup_inline_bytes_stored_once(dedup):
+    sha = hashlib.sha256(PNG).hexdigest()
+    assert prepare_image("filter", PNG, dedup) == (None, None, len(PNG), sha)
+    assert prepare_image("stock_screenshots", PNG, dedup) == (None, None, len(PNG), sha)
+    assert dedup.rows[sha]["data"] == PNG and len(dedup.rows) == 1
+    # the second capture was answered from the in-process cache
+    assert dedup.selects == 1
+
+    stats = image_store.dedup_stats
+    assert (stats.captures, stats.new_images, stats.bytes_in, stats.bytes_stored) == (2, 1, 2 * len(PNG), len(PNG))
+    assert load_image(None, None, sha, dedup) == PNG
+
+
+def test_dedup_with_store_uses_content_key(dedup, local_store, monkeypatch):
+    sha = hashlib.sha256(JPG).hexdigest()
+    key = register_image(dedup, JPG, sha)
+    assert key == f"images/{sha[:2]}/{sha}.jpg"
+    assert local_store.get(key) == JPG and dedup.rows[sha]["data"] is None
+
+    # another bot registered the bytes first: the key comes from the table, nothing is re-uploaded
+    monkeypatch.setattr(image_store, "_known_keys", {})
+    local_store.delete(key)
+    assert register_image(dedup, JPG, sha) == key
+    assert not local_store.exists(key)
+    assert image_store.dedup_stats.new_images == 1
+
+
+def png(width, height):
+    Image = pytest.importorskip("PIL.Image")
+    buf = io.BytesIO()
+    Image.new("RGBA", (width, height), (10, 20, 30, 255)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+class DerivativesDB:
+    """screenshot_derivatives rows {sha: {variant: storage_key}} and the sha256 values the
+    screenshot tables still reference, for save_derivatives / prune_derivatives."""
+
+    def __init__(self, rows=None, referenced=()):
+        self.rows = rows or {}
+        self.referenced = set(referenced)
+        self.inserted = []
+        self.sql = []
+
+    def cursor(self):
+        return DerivativesCursor(self)
+
+    def commit(self):
+        pass
+
+
+class DerivativesCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+
+    def execute(self, sql, params=None):
+        self.db.sql.append(sql)
+        if "information_schema.TABLES" in sql:
+            self.result = [(1,)]
+        elif "information_schema.COLUMNS" in sql:
+            self.result = [("stock_screenshots",), ("live_screen",), ("not_a_screenshot_table",)]
+        elif "SELECT DISTINCT d.sha256" in sql:
+            unreferenced = [sha for sha in sorted(self.db.rows) if sha not in self.db.referenced]
+            self.result = [(sha,) for sha in unreferenced[:params[1]]]
+        elif "SELECT storage_key" in sql:
+            self.result = [(key,) for sha in params for key in self.db.rows[sha].values() if key]
+        elif sql.startswith("DELETE"):
+            for sha in params:
+                del self.db.rows[sha]
+
+    def executemany(self, sql, rows):
+        self.db.inserted += rows
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def close(self):
+        pass
+
+
+def test_make_derivatives():
+    out = make_derivatives(png(1000, 500), widths={"thumb": 100, "preview": 2000}, fmt="WEBP")
+    assert out["full"] == (None, 1000, 500)
+    data, width, height = out["thumb"]
+    assert (width, height) == (100, 50) and image_ext(data) == "webp"
+    # never upscaled
+    assert out["preview"][1:] == (1000, 500)
+
+
+def test_save_derivatives_inline_and_offloaded(local_store, monkeypatch):
+    variants = {"full": (None, 1000, 500), "thumb": (b"RIFF0000WEBPthumb", 100, 50)}
+
+    db = DerivativesDB()
+    save_derivatives(db, "ab" * 32, variants)
+    assert db.inserted[1] == ("ab" * 32, "thumb", 100, 50, 17, f"derivatives/thumb/ab/{'ab' * 32}.webp", None)
+    assert local_store.get(db.inserted[1][5]) == b"RIFF0000WEBPthumb"
+    assert db.inserted[0] == ("ab" * 32, "full", 1000, 500, None, None, None)
+
+    monkeypatch.setattr(image_store, "_store", None)
+    monkeypatch.setattr(image_store, "IMAGE_STORE", "")
+    db = DerivativesDB()
+    save_derivatives(db, "cd" * 32, variants)
+    assert db.inserted[1][5:] == (None, b"RIFF0000WEBPthumb")
+
+
+def test_derivative_queue_drains_into_db(monkeypatch):
+    pytest.importorskip("PIL")
+    monkeypatch.setattr(image_store, "DERIVATIVE_WIDTHS", {"thumb": 40})
+    queue = DerivativeQueue(workers=1)
+    queue.enabled = True
+    data = png(200, 100)
+    sha = hashlib.sha256(data).hexdigest()
+
+    db = DerivativesDB()
+    queue.submit(data, sha)
+    queue.submit(data, sha)
+    assert len(queue.pending) == 1
+    try:
+        assert queue.drain(db, wait=True) == 1
+    finally:
+        queue.close()
+    assert {row[1]: row[2:4] for row in db.inserted} == {"full": (200, 100), "thumb": (40, 20)}
+    queue.submit(data, sha)
+    assert not queue.pending
+
+
+def test_prune_derivatives(local_store):
+    shas = [c * 64 for c in "abcde"]
+    for sha in shas:
+        local_store.put(f"derivatives/thumb/{sha[:2]}/{sha}.webp", b"x")
+    db = DerivativesDB(
+        rows={sha: {"full": None, "thumb": f"derivatives/thumb/{sha[:2]}/{sha}.webp"} for sha in shas},
+        referenced=[shas[1]],
+    )
+
+    assert prune_derivatives(db, batch=2, min_age_hours=24) == 4
+    assert list(db.rows) == [shas[1]]
+    assert [sha for sha in shas if local_store.exists(f"derivatives/thumb/{sha[:2]}/{sha}.webp")] == [shas[1]]
+
+    select = next(sql for sql in db.sql if "SELECT DISTINCT" in sql)
+    assert "`stock_screenshots` x" in select and "`live_screen` x" in select
+    assert "not_a_screenshot_table" not in select
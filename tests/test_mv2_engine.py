@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+import mv2_engine
+from mv2_engine import (MV2_COLUMNS, DailyPanel, build_mv2_frame, compute_indicators, days_since,
+                        month_start_close, rolling, shift)
+
+nan = np.nan
+
+
+def test_rolling_and_shift():
+    m = np.array([[1.0, 3.0, 2.0, 5.0]])
+    np.testing.assert_array_equal(rolling(m, 2, np.fmax.reduce), [[nan, 3, 3, 5]])
+    np.testing.assert_array_equal(rolling(m, 5, np.mean), [[nan] * 4])
+    np.testing.assert_array_equal(shift(m), [[nan, 1, 3, 2]])
+    np.testing.assert_array_equal(shift(m, 3), [[nan, nan, nan, 1]])
+
+
+def test_days_since():
+    event = np.array([[False, True, False, False, True], [False] * 5])
+    np.testing.assert_array_equal(days_since(event), [[-1, 0, 1, 2, 0], [-1] * 5])
+
+
+def frame(symbol, dates, closes):
+    closes = np.asarray(closes, dtype=np.float64)
+    return pd.DataFrame({"Symbol": symbol, "Date": dates, "Open": closes, "High": closes + 1,
+                         "Low": closes - 1, "Close": closes, "Volume": 1000})
+
+
+def test_from_frame_and_month_anchor():
+    dates = ["2026-01-29", "2026-01-30", "2026-02-02", "2026-02-03"]
+    df = pd.concat([frame("aaa", dates, [10, 11, 12, 13]), frame("BBB", dates[1:3], [50, 55])])
+    panel = DailyPanel.from_frame(df)
+
+    assert panel.symbols == ["AAA", "BBB"]
+    np.testing.assert_array_equal(panel.close[1], [nan, 50, 55, nan])
+    # every February day is measured against the last January close
+    np.testing.assert_array_equal(month_start_close(panel)[0], [nan, nan, 11, 11])
+
+
+def test_indicators_and_frame(monkeypatch):
+    monkeypatch.setattr(mv2_engine, "MXMN_WINDOW", 3)
+    monkeypatch.setattr(mv2_engine, "CL_AB_WINDOW", 3)
+    monkeypatch.setattr(mv2_engine, "TRIGGER_WINDOW", 2)
+    monkeypatch.setattr(mv2_engine, "TRIGGER_S_WINDOW", 2)
+
+    dates = pd.bdate_range("2026-03-02", periods=7)
+    closes = [10, 9, 8, 12, 11, 10, 9]
+    panel = DailyPanel.from_frame(pd.concat([frame("AAA", dates, closes), frame("BBB", dates[:-1], closes[:-1])]))
+    ind = compute_indicators(panel)
+
+    a = {k: v[0] for k, v in ind.items()}
+    assert a["D_CHANGE"][3] == 12 / 8 - 1
+    assert a["W_CHANGE"][5] == 10 / 10 - 1
+    assert a["MXMN_MAX"][3] == 13 and a["MXMN_MIN"][3] == 7
+    assert a["MXMN"][3] == (13 - 7) / 7 * 100
+    # no full window on the first two days
+    np.testing.assert_array_equal(a["MXMN_low"], [0, 0, 1, 0, 0, 1, 1])
+    assert a["SMA_20"][2] == 9 and a["D_CL_AB"][2] == 8 / 9
+    # close 12 on day 3 breaks the prior two-day high (10); nothing breaks out after
+    np.testing.assert_array_equal(a["D_Trigger"], [-1, -1, -1, 0, 1, 2, 3])
+
+    df = build_mv2_frame(panel, ind, sectors={"AAA": "IT"})
+    assert list(df.columns) == MV2_COLUMNS
+    # BBB has no candle on the last day and is left out
+    assert df["Symbol"].tolist() == ["AAA"]
+    row = df.iloc[0]
+    assert (row["Sector"], row["Date"], row["D_CLOSE"]) == ("IT", "2026-03-10", 9.0)
+    assert row["D_Trigger"] == 3
+    assert df["D_CLOSE"].dtype == np.float64 and df["D_Trigger"].dtype.kind == "i"
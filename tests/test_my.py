@@ -0,0 +1,290 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+# my.py is the transcript bot: it needs its whole runtime stack to import
+for _dep in ("requests", "pymysql", "selenium", "webdriver_manager", "youtube_transcript_api"):
+    pytest.importorskip(_dep)
+
+import my  # noqa: E402
+from my import (_DownloadHandler, _finished_download, extract_video_id, fetch_channel_feed, get_new_videos, get_transcript_api, get_video_data,  # noqa: E402
+                load_feed_state, mark_seen, process_video, resolve_channel_id, run_once, save_feed_state,
+                wait_for_download)
+
+
+class FakeTranscriptApi:
+    """youtube-transcript-api stand-in: `tracks` maps a language to its segments."""
+
+    def __init__(self, tracks):
+        self.tracks = tracks
+        self.calls = []
+
+    def get_transcript(self, video_id, languages):
+        self.calls.append(("get", video_id, tuple(languages)))
+        for lang in languages:
+            if lang in self.tracks:
+                return self.tracks[lang]
+        raise LookupError("no transcript in the requested languages")
+
+    def list_transcripts(self, video_id):
+        self.calls.append(("list", video_id))
+        if not self.tracks:
+            raise LookupError("transcripts disabled")
+        return [FakeTrack(segments) for segments in self.tracks.values()]
+
+
+class FakeTrack:
+    def __init__(self, segments):
+        self.segments = segments
+
+    def fetch(self):
+        return self.segments
+
+
+def test_extract_video_id():
+    assert extract_video_id("https://youtu.be/abc123XYZ_-") == "abc123XYZ_-"
+    assert extract_video_id("https://www.youtube.com/watch?v=abc123&t=42s") == "abc123"
+    assert extract_video_id("https://m.youtube.com/watch?feature=share&v=xyz") == "xyz"
+    assert extract_video_id("https://www.youtube.com/@somechannel") is None
+    assert extract_video_id("https://example.com/watch?v=abc") is None
+
+
+def test_transcript_api_prefers_configured_languages(monkeypatch):
+    api = FakeTranscriptApi({"hi": [{"text": "namaste", "start": 0}], "en": [{"text": "hello", "start": 0}]})
+    monkeypatch.setattr(my, "YouTubeTranscriptApi", api)
+    monkeypatch.setattr(my, "TRANSCRIPT_LANGUAGES", ["en", "hi"])
+    assert get_transcript_api("vid") == [{"text": "hello", "start": 0}]
+    assert api.calls == [("get", "vid", ("en", "hi"))]
+
+
+def test_transcript_api_falls_back_to_any_track(monkeypatch):
+    api = FakeTranscriptApi({"ta": [{"text": " ", "start": 0}, {"text": "vanakkam", "start": 2}]})
+    monkeypatch.setattr(my, "YouTubeTranscriptApi", api)
+    assert get_transcript_api("vid") == [{"text": "vanakkam", "start": 2}]
+    assert [c[0] for c in api.calls] == ["get", "list"]
+
+
+def test_transcript_api_returns_none_without_text(monkeypatch):
+    monkeypatch.setattr(my, "YouTubeTranscriptApi", FakeTranscriptApi({}))
+    assert get_transcript_api("vid") is None
+    monkeypatch.setattr(my, "YouTubeTranscriptApi", FakeTranscriptApi({"en": [{"text": "  ", "start": 0}]}))
+    assert get_transcript_api("vid") is None
+
+
+def test_video_data_uses_api_segments(monkeypatch):
+    segments = [{"text": " first line ", "start": 0}, {"text": "second", "start": 3}]
+    monkeypatch.setattr(my, "get_transcript_api", lambda video_id: segments if video_id == "abc" else None)
+    monkeypatch.setattr(my, "get_video_title", lambda url: "A title")
+    monkeypatch.setattr(my, "get_video_data_downsub", lambda url: pytest.fail("downsub must not be used"))
+    assert get_video_data("https://youtu.be/abc") == ("A title", "first line\nsecond", segments)
+
+
+def test_video_data_falls_back_to_downsub(monkeypatch):
+    monkeypatch.setattr(my, "get_transcript_api", lambda video_id: None)
+    monkeypatch.setattr(my, "get_video_data_downsub", lambda url: ("Downsub title", "plain text"))
+    assert get_video_data("https://youtu.be/abc") == ("Downsub title", "plain text", None)
+
+
+CHANNEL_ID = "UC" + "a" * 22
+FEED_XML = f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:yt="{my.YT_NS}">
+  <entry><yt:videoId>new2</yt:videoId></entry>
+  <entry><yt:videoId>new1</yt:videoId></entry>
+  <entry><yt:videoId>old</yt:videoId></entry>
+</feed>""".encode()
+
+
+class FakeRequests:
+    """Replays canned responses and records the request headers."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.calls.append((url, params, dict(headers or {})))
+        return self.responses.pop(0)
+
+
+def response(status=200, content=b"", headers=None):
+    def raise_for_status():
+        if status >= 400:
+            raise RuntimeError(status)
+    return SimpleNamespace(status_code=status, content=content, text=content.decode(), headers=headers or {},
+                           raise_for_status=raise_for_status)
+
+
+@pytest.fixture
+def state_file(monkeypatch, tmp_path):
+    path = tmp_path / "feed_state.json"
+    monkeypatch.setattr(my, "FEED_STATE_FILE", str(path))
+    return path
+
+
+def test_feed_state_roundtrip_keeps_newest_seen(monkeypatch, state_file):
+    assert load_feed_state() == {"channels": {}, "seen": []}
+    state_file.write_text("{not json")
+    assert load_feed_state() == {"channels": {}, "seen": []}
+
+    monkeypatch.setattr(my, "SEEN_LIMIT", 3)
+    save_feed_state({"channels": {"c": {"etag": "x"}}, "seen": ["a", "b", "c", "d"]})
+    assert json.loads(state_file.read_text()) == {"channels": {"c": {"etag": "x"}}, "seen": ["b", "c", "d"]}
+    assert load_feed_state()["seen"] == ["b", "c", "d"]
+
+
+def test_resolve_channel_id(monkeypatch):
+    monkeypatch.setattr(my, "requests", FakeRequests())
+    channel_state = {}
+    assert resolve_channel_id(f"https://www.youtube.com/channel/{CHANNEL_ID}", channel_state) == CHANNEL_ID
+
+    page = response(content=f'<html>..."externalId":"{CHANNEL_ID}"...</html>'.encode())
+    fake = FakeRequests(page)
+    monkeypatch.setattr(my, "requests", fake)
+    channel_state = {}
+    assert resolve_channel_id("https://www.youtube.com/@handle/?si=x", channel_state) == CHANNEL_ID
+    assert fake.calls[0][0] == "https://www.youtube.com/@handle"
+    # Cached in the channel state, the page is not fetched again
+    assert resolve_channel_id("https://www.youtube.com/@handle", channel_state) == CHANNEL_ID
+    assert len(fake.calls) == 1
+
+    monkeypatch.setattr(my, "requests", FakeRequests(response(content=b"<html></html>")))
+    with pytest.raises(ValueError):
+        resolve_channel_id("https://www.youtube.com/@missing", {})
+
+
+def test_fetch_channel_feed_uses_conditional_requests(monkeypatch):
+    fake = FakeRequests(response(content=FEED_XML, headers={"ETag": "e1", "Last-Modified": "Mon"}),
+                        response(status=304))
+    monkeypatch.setattr(my, "requests", fake)
+    channel_state = {"channel_id": CHANNEL_ID}
+
+    assert fetch_channel_feed("https://www.youtube.com/@handle", channel_state) == ["new2", "new1", "old"]
+    assert channel_state == {"channel_id": CHANNEL_ID, "etag": "e1", "last_modified": "Mon"}
+    assert fake.calls[0][1] == {"channel_id": CHANNEL_ID}
+
+    assert fetch_channel_feed("https://www.youtube.com/@handle", channel_state) == []
+    headers = fake.calls[1][2]
+    assert headers["If-None-Match"] == "e1" and headers["If-Modified-Since"] == "Mon"
+
+
+def test_get_new_videos_skips_seen_and_failed_feeds(monkeypatch):
+    feeds = {"https://www.youtube.com/@a": ["v1", "v2", "v2", "seen", "v3"],
+             "https://www.youtube.com/@b": ["v1", "v4"]}
+
+    def fake_feed(url, channel_state):
+        if url not in feeds:
+            raise RuntimeError("feed down")
+        return feeds[url]
+
+    monkeypatch.setattr(my, "fetch_channel_feed", fake_feed)
+    state = {"channels": {}, "seen": ["seen"]}
+    links = get_new_videos(list(feeds) + ["https://www.youtube.com/@down"], count=3, state=state)
+
+    ids = [extract_video_id(u) for u in links]
+    assert sorted(ids) == ["v1", "v2", "v3", "v4"]
+    assert len(ids) == len(set(ids))
+    assert set(state["channels"]) == set(feeds) | {"https://www.youtube.com/@down"}
+    # Seen ids are only recorded once the transcript is stored
+    assert state["seen"] == ["seen"]
+
+
+def test_mark_seen_appends_new_ids(state_file):
+    state = {"channels": {}, "seen": ["a"]}
+    mark_seen(state, ["a", "b", None, "c"])
+    assert state["seen"] == ["a", "b", "c"]
+    assert json.loads(state_file.read_text())["seen"] == ["a", "b", "c"]
+
+
+def test_process_video_reports_and_indexes_only_saved_transcripts(monkeypatch):
+    indexed = []
+    monkeypatch.setattr(my, "get_video_data", lambda url: ("Title", "text", None))
+    monkeypatch.setattr(my, "index_video", lambda *args: indexed.append(args))
+
+    monkeypatch.setattr(my, "save_to_db", lambda *args: False)
+    assert process_video("https://youtu.be/abc") is False
+    assert indexed == []
+
+    monkeypatch.setattr(my, "save_to_db", lambda *args: True)
+    assert process_video("https://youtu.be/abc") is True
+    assert indexed == [("abc", "text", None)]
+
+    monkeypatch.setattr(my, "get_video_data", lambda url: ("Title", None, None))
+    assert process_video("https://youtu.be/abc") is False
+
+
+def test_run_once_retries_unsaved_videos(monkeypatch, state_file):
+    monkeypatch.setattr(my, "get_new_videos", lambda channels, count, state: [
+        "https://www.youtube.com/watch?v=ok", "https://www.youtube.com/watch?v=fail"])
+    monkeypatch.setattr(my, "get_existing_video_ids", lambda ids: {"stored"})
+    monkeypatch.setattr(my, "process_video", lambda url: extract_video_id(url) != "fail")
+
+    state = {"channels": {}, "seen": [], "retry": ["stored"]}
+    run_once(["https://www.youtube.com/@chan"], state)
+    assert state["retry"] == ["fail"]
+    assert sorted(state["seen"]) == ["ok", "stored"]
+    assert json.loads(state_file.read_text())["retry"] == ["fail"]
+
+
+def test_finished_download_ignores_partial_files(tmp_path):
+    (tmp_path / "subs.txt.crdownload").write_text("partial")
+    assert _finished_download(str(tmp_path), ".txt") is None
+    (tmp_path / "subs.txt").write_text("done")
+    assert _finished_download(str(tmp_path), ".txt") == str(tmp_path / "subs.txt")
+
+
+def test_download_handler_reacts_to_rename():
+    handler = _DownloadHandler(".txt")
+    handler.on_created(SimpleNamespace(src_path="/d/subs.txt.crdownload"))
+    assert not handler.done.is_set()
+    handler.on_moved(SimpleNamespace(src_path="/d/subs.txt.crdownload", dest_path="/d/subs.txt"))
+    assert handler.done.is_set() and handler.path == "/d/subs.txt"
+
+
+def test_wait_for_download_polls_without_watchdog(monkeypatch, tmp_path):
+    monkeypatch.setattr(my, "Observer", None)
+    monkeypatch.setattr(my, "DOWNLOAD_POLL_SEC", 0.01)
+    assert wait_for_download(str(tmp_path), timeout=0.05) is None
+
+    timer = threading.Timer(0.05, lambda: (tmp_path / "subs.txt").write_text("done"))
+    timer.start()
+    try:
+        assert wait_for_download(str(tmp_path), timeout=2) == str(tmp_path / "subs.txt")
+    finally:
+        timer.cancel()
+
+
+class FakeObserver:
+    """Delivers a rename event to the scheduled handler as soon as it starts."""
+
+    events = []
+
+    def schedule(self, handler, path, recursive):
+        self.handler = handler
+        self.path = path
+
+    def start(self):
+        for event in self.events:
+            self.handler.on_moved(event)
+
+    def stop(self):
+        pass
+
+    def join(self):
+        pass
+
+
+def test_wait_for_download_uses_filesystem_events(monkeypatch, tmp_path):
+    monkeypatch.setattr(my, "Observer", FakeObserver)
+    monkeypatch.setattr(FakeObserver, "events", [])
+    assert wait_for_download(str(tmp_path), timeout=0.05) is None
+
+    target = str(tmp_path / "subs.txt")
+    monkeypatch.setattr(FakeObserver, "events", [SimpleNamespace(src_path=target + ".crdownload", dest_path=target)])
+    assert wait_for_download(str(tmp_path), timeout=2) == target
+
+    # A download that finished before the observer started is picked up directly
+    monkeypatch.setattr(FakeObserver, "events", [])
+    (tmp_path / "early.txt").write_text("done")
+    assert wait_for_download(str(tmp_path), timeout=0.05) == str(tmp_path / "early.txt")
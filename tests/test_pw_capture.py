@@ -0,0 +1,108 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+import pw_capture
+from pw_capture import PlaywrightCapture, load_tv_cookies
+
+COOKIES = [
+    {"name": "sessionid", "value": "abc", "domain": ".tradingview.com", "expiry": 1900000000.5, "secure": True},
+    {"name": "device_t", "value": 7, "httpOnly": False},
+    {"name": "", "value": "dropped"},
+    {"name": "no_value"},
+]
+
+
+@pytest.fixture
+def cookies(monkeypatch):
+    monkeypatch.setenv("TRADINGVIEW_COOKIES", json.dumps(COOKIES))
+
+
+def test_load_tv_cookies(cookies):
+    assert load_tv_cookies() == [
+        {"name": "sessionid", "value": "abc", "domain": ".tradingview.com", "path": "/",
+         "expires": 1900000000, "secure": True},
+        {"name": "device_t", "value": "7", "domain": ".tradingview.com", "path": "/", "httpOnly": False},
+    ]
+
+
+def test_missing_cookies_fail_fast(monkeypatch):
+    monkeypatch.delenv("TRADINGVIEW_COOKIES", raising=False)
+    with pytest.raises(Exception, match="TRADINGVIEW_COOKIES"):
+        PlaywrightCapture()
+
+
+def test_run_failure_is_raised_after_results(cookies):
+    cap = PlaywrightCapture()
+
+    async def run(jobs, results):
+        results.put(jobs[0])
+        raise RuntimeError("browser launch failed")
+    cap._run = run
+
+    got = []
+    with pytest.raises(RuntimeError, match="browser launch failed"):
+        for item in cap.capture_many([("a", b"img")]):
+            got.append(item)
+    assert got == [("a", b"img")]
+    assert cap._worker is None
+
+
+def test_close_cancels_a_run_in_flight(cookies):
+    cap = PlaywrightCapture()
+
+    async def run(jobs, results):
+        for job in jobs:
+            results.put(job)
+            await asyncio.sleep(60)
+    cap._run = run
+
+    gen = cap.capture_many([("a", b"1"), ("b", b"2")])
+    assert next(gen) == ("a", b"1")
+    worker = cap._worker
+    t = time.monotonic()
+    gen.close()     # the bot stops reading: close() cancels the task and joins the thread
+    assert time.monotonic() - t < 5
+    assert not worker.is_alive()
+
+
+class FakeChart:
+    def __init__(self, page):
+        self.page = page
+        self.first = self
+
+    async def wait_for(self, state, timeout):
+        if self.page.fail:
+            self.page.fail -= 1
+            raise TimeoutError("chart not visible")
+
+    async def screenshot(self, **opts):
+        self.page.opts = opts
+        return b"chart"
+
+
+class FakePage:
+    def __init__(self, fail=0):
+        self.fail = fail
+        self.visits = []
+        self.opts = None
+
+    async def goto(self, url, wait_until, timeout):
+        self.visits.append(url)
+
+    def locator(self, selector):
+        return FakeChart(self)
+
+
+def test_capture_retries_then_gives_up(cookies, monkeypatch):
+    monkeypatch.setattr(pw_capture, "CAPTURE_FORMAT", "jpeg")
+    cap = PlaywrightCapture(settle_sec=0, retries=2)
+
+    page = FakePage(fail=1)
+    assert asyncio.run(cap._capture(page, "k", "https://tv/chart")) == b"chart"
+    assert page.visits == ["https://tv/chart"] * 2
+    assert page.opts == {"type": "jpeg", "quality": pw_capture.CAPTURE_QUALITY}
+
+    assert asyncio.run(cap._capture(FakePage(fail=5), "k", "https://tv/chart")) is None
@@ -0,0 +1,168 @@
+import base64
+import gzip
+import json
+from datetime import date, datetime
+
+import pytest
+
+import image_store
+import retention
+from image_store import LocalImageStore
+from retention import (extend_partitions, month_start, partition_expr, partition_table, to_json_value,
+                       unique_keys_without, write_archive)
+
+
+class FakeCursor:
+    """Answers the information_schema lookups retention.py makes; every statement is recorded."""
+
+    def __init__(self, data_type="datetime", partitions=(), unique=(), has_index=True, first=None):
+        self.data_type = data_type
+        self.partitions = list(partitions)
+        self.unique = list(unique)
+        self.has_index = has_index
+        self.first = first
+        self.sql = []
+        self.result = []
+
+    def execute(self, sql, params=None):
+        self.sql.append(sql)
+        if "DATA_TYPE" in sql:
+            self.result = [(self.data_type,)]
+        elif "information_schema.PARTITIONS" in sql:
+            self.result = [(n,) for n in self.partitions]
+        elif "idx_last_hash" in sql and "STATISTICS" in sql:
+            self.result = [(1,)] if self.has_index else []
+        elif "NON_UNIQUE = 0" in sql:
+            self.result = self.unique
+        elif sql.startswith("SELECT MIN"):
+            self.result = [(self.first,)]
+        else:
+            self.result = []
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self, cur):
+        self.cur = cur
+
+    def cursor(self):
+        return self.cur
+
+
+def ddl(cur, prefix):
+    return [s for s in cur.sql if s.startswith(prefix)]
+
+
+def test_month_start_rolls_over_years():
+    assert month_start(date(2024, 5, 17)) == date(2024, 5, 1)
+    assert month_start(date(2024, 11, 30), 1) == date(2024, 12, 1)
+    assert month_start(date(2024, 12, 3), 1) == date(2025, 1, 1)
+    assert month_start(date(2024, 1, 3), -1) == date(2023, 12, 1)
+    assert month_start(date(2024, 2, 29), 14) == date(2025, 4, 1)
+
+
+def test_partition_expr_follows_column_type():
+    expr, bound = partition_expr(FakeCursor("timestamp"))
+    assert expr == "UNIX_TIMESTAMP(`created_at`)"
+    assert bound(date(2024, 3, 1)) == "UNIX_TIMESTAMP('2024-03-01 00:00:00')"
+
+    expr, bound = partition_expr(FakeCursor("datetime"))
+    assert expr == "TO_DAYS(`created_at`)"
+    assert bound(date(2024, 3, 1)) == "TO_DAYS('2024-03-01')"
+
+
+def test_unique_keys_without_groups_columns_by_index():
+    cur = FakeCursor(unique=[("uq_hash", "filter_id"), ("uq_hash", "hash"),
+                             ("uq_day", "symbol"), ("uq_day", "created_at")])
+    assert unique_keys_without(cur, "created_at") == ["uq_hash"]
+
+
+def test_partition_table_refuses_blocking_unique_keys():
+    cur = FakeCursor(unique=[("uq_hash", "hash")])
+    with pytest.raises(RuntimeError, match="uq_hash"):
+        partition_table(FakeConn(cur))
+    assert not ddl(cur, "ALTER")
+
+
+def test_partition_table_skips_partitioned_table():
+    cur = FakeCursor(partitions=["p202401", "pmax"])
+    partition_table(FakeConn(cur))
+    assert not ddl(cur, "ALTER")
+
+
+def test_partition_table_builds_monthly_ranges():
+    cur = FakeCursor(has_index=False, first=datetime(2024, 1, 15, 9, 30))
+    partition_table(FakeConn(cur))
+
+    assert any("ADD INDEX `idx_last_hash`" in s for s in cur.sql)
+    assert any("ADD PRIMARY KEY (id, `created_at`)" in s for s in cur.sql)
+    alter = ddl(cur, "ALTER TABLE `filter_alert_screenshots` PARTITION BY")[0]
+    # Rows of January 2024 land in p202401, bounded by the first of February
+    assert "PARTITION p202401 VALUES LESS THAN (TO_DAYS('2024-02-01'))" in alter
+    last = month_start(date.today(), retention.FUTURE_MONTHS)
+    assert f"PARTITION p{last:%Y%m} VALUES LESS THAN (TO_DAYS('{month_start(last, 1)}'))" in alter
+    assert alter.rstrip(")").endswith("PARTITION pmax VALUES LESS THAN MAXVALUE")
+
+
+def test_extend_partitions_fills_gap_up_to_future_months():
+    last = month_start(date.today(), -1)
+    cur = FakeCursor(partitions=[f"p{last:%Y%m}", "pmax"])
+    extend_partitions(FakeConn(cur))
+
+    alter = ddl(cur, "ALTER TABLE")[0]
+    assert "REORGANIZE PARTITION pmax" in alter
+    names = [part.split()[1] for part in alter.split("INTO (", 1)[1].split(", ")]
+    expected = [f"p{month_start(last, i):%Y%m}" for i in range(1, retention.FUTURE_MONTHS + 2)]
+    assert names == expected + ["pmax"]
+
+
+def test_extend_partitions_is_noop_when_covered():
+    ahead = month_start(date.today(), retention.FUTURE_MONTHS)
+    cur = FakeCursor(partitions=[f"p{ahead:%Y%m}", "pmax"])
+    extend_partitions(FakeConn(cur))
+    assert not ddl(cur, "ALTER")
+
+
+def test_extend_partitions_needs_partitioned_table():
+    cur = FakeCursor()
+    extend_partitions(FakeConn(cur))
+    assert not ddl(cur, "ALTER")
+
+
+def test_to_json_value():
+    assert to_json_value(b"\x89PNG") == {"b64": base64.b64encode(b"\x89PNG").decode("ascii")}
+    assert to_json_value(datetime(2024, 1, 2, 3, 4, 5)) == "2024-01-02T03:04:05"
+    assert to_json_value(date(2024, 1, 2)) == "2024-01-02"
+    assert to_json_value(None) is None
+    assert to_json_value(1.5) == 1.5
+
+
+def test_write_archive_writes_gzip_and_copies_to_store(monkeypatch, tmp_path):
+    store = LocalImageStore(str(tmp_path / "store"))
+    monkeypatch.setattr(image_store, "IMAGE_STORE", "local")
+    monkeypatch.setattr(image_store, "_store", store)
+    monkeypatch.setattr(retention, "ARCHIVE_DIR", str(tmp_path / "archive"))
+
+    columns = ["id", "symbol", "screenshot", "created_at"]
+    rows = [(7, "NSE:TCS", b"\x89PNG", datetime(2024, 3, 5)),
+            (9, "NSE:INFY", None, datetime(2024, 3, 6))]
+    path = write_archive(rows, columns)
+
+    assert path == str(tmp_path / "archive" / "filter_alert_screenshots" / "2024-03"
+                       / "filter_alert_screenshots-7-9.jsonl.gz")
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [r["id"] for r in records] == [7, 9]
+    assert base64.b64decode(records[0]["screenshot"]["b64"]) == b"\x89PNG"
+    assert records[1]["created_at"] == "2024-03-06T00:00:00"
+
+    with open(path, "rb") as f:
+        assert store.get("archive/filter_alert_screenshots/2024-03/filter_alert_screenshots-7-9.jsonl.gz") == f.read()
@@ -0,0 +1,94 @@
+import queue
+
+import numpy as np
+
+from scanner import SESSION_MINUTES, IntradayScanner, scanner_from_store
+
+DAY = "2026-05-19"
+
+
+def feed(scanner, prices, volume=100.0):
+    """prices: minutes x symbols closes; open/high/low derived from them."""
+    for minute, close in enumerate(np.asarray(prices, dtype=np.float64)):
+        scanner.update_minute(minute, close, close * 1.001, close * 0.999, close, np.full(len(close), volume))
+
+
+def test_change_threshold_and_only_new():
+    sc = IntradayScanner(["aaa", "bbb"], DAY, {"change_pct": 5.0}, only=True)
+    feed(sc, [[100, 100], [103, 101], [106, 102]])
+
+    signals = sc.scan()
+    assert [s["Symbol"] for s in signals] == ["AAA"]
+    assert signals[0]["real_change"] == 6.0
+    assert signals[0]["reasons"] == ["change_pct"]
+    assert sc.scan() == []
+    assert len(sc.scan(only_new=False)) == 1
+
+
+def test_only_disables_other_rules():
+    loose = IntradayScanner(["AAA"], DAY, {"change_pct": 50.0})
+    strict = IntradayScanner(["AAA"], DAY, {"change_pct": 50.0}, only=True)
+    for sc in (loose, strict):
+        sc.set_baseline(prev_close=[80.0])   # +25% gap
+        feed(sc, [[100.0], [101.0]])
+
+    assert [s["reasons"] for s in loose.scan()] == [["gap_pct"]]
+    assert strict.scan() == []
+
+
+def test_single_updates_match_bulk():
+    sc = IntradayScanner(["AAA"], DAY)
+    start = sc.session_start
+    sc.update("AAA", start + 60, 10, 11, 9, 10.5, 5)
+    sc.update("AAA", start, 9, 10, 8, 9.5, 3)            # late candle for an earlier minute
+    sc.update("AAA", start + 60, 10, 12, 9, 11.0, 7)     # same minute corrected
+    sc.update("AAA", start + 60 * SESSION_MINUTES, 1, 1, 1, 1, 1)   # after the session, ignored
+
+    assert sc.day_open[0] == 9
+    assert sc.last[0] == 11.0
+    assert (sc.day_high[0], sc.day_low[0]) == (12, 8)
+    assert sc.cumvol[0] == 10
+    m = sc.metrics()
+    assert round(float(m["change_pct"][0]), 4) == round((11.0 / 9 - 1) * 100, 4)
+
+
+class FakeStore:
+    def __init__(self, segments):
+        self.segments = segments
+
+    def symbols(self):
+        return sorted({sym for sym, _ in self.segments})
+
+    def dates(self, symbol):
+        return sorted(day for sym, day in self.segments if sym == symbol)
+
+    def get(self, symbol, day, fields=None):
+        seg = self.segments.get((symbol, day))
+        return {f: seg[f] for f in fields} if seg and fields else seg
+
+
+def segment(day, closes, volume=100):
+    sc = IntradayScanner([], day)
+    closes = np.asarray(closes, dtype=np.float64)
+    return {
+        "ts": sc.session_start + 60 * np.arange(len(closes), dtype=np.int64),
+        "open": closes, "high": closes + 1, "low": closes - 1, "close": closes,
+        "volume": np.full(len(closes), volume, dtype=np.int64),
+    }
+
+
+def test_scanner_from_store_baseline():
+    store = FakeStore({
+        ("AAA", "2026-05-18"): segment("2026-05-18", [100, 100]),
+        ("AAA", DAY): segment(DAY, [110, 111], volume=1000),
+    })
+    sc = scanner_from_store(DAY, store=store, thresholds={"change_pct": None})
+    assert sc.prev_close[0] == 100
+    signals = sc.scan()
+    assert set(signals[0]["reasons"]) == {"gap_pct", "volume_surge"}
+
+    q = queue.Queue()
+    only = scanner_from_store(DAY, store=store, thresholds={"change_pct": 0.5}, only=True)
+    assert np.isnan(only.prev_close[0])   # no baseline pass for change-only scans
+    assert only.emit(q) == 1
+    assert q.get()["Symbol"] == "AAA"
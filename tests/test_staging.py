@@ -0,0 +1,83 @@
+from staging import StagingTable
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = []
+
+    def execute(self, sql, params=None):
+        self.conn.sql.append(" ".join(sql.split()))
+        if sql.startswith("SHOW CREATE TABLE"):
+            self.result = [("t", "CREATE TABLE `t` (...) ENGINE=InnoDB AUTO_INCREMENT=42 DEFAULT CHARSET=utf8mb4")]
+        elif "information_schema.STATISTICS" in sql:
+            self.result = [("idx_sym", "symbol", None), ("idx_sym", "name", 20)]
+        else:
+            self.result = []
+
+    def executemany(self, sql, rows):
+        self.conn.sql.append(sql)
+        self.conn.inserted += list(rows)
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self):
+        self.sql = []
+        self.inserted = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+
+def test_insert_sql():
+    st = StagingTable(FakeConn(), "shots", ["symbol", "img"])
+    assert st.insert_sql == "INSERT INTO `shots_staging` (`symbol`, `img`) VALUES (%s, %s)"
+    st = StagingTable(FakeConn(), "shots", ["symbol", "img"], upsert_columns=["img"])
+    assert st.insert_sql.endswith(" ON DUPLICATE KEY UPDATE `img` = VALUES(`img`)")
+
+
+def test_create_fill_publish():
+    conn = FakeConn()
+    st = StagingTable(conn, "shots", ["symbol"], batch=2).create()
+    assert conn.sql[:3] == ["DROP TABLE IF EXISTS `shots_staging`", "CREATE TABLE `shots_staging` LIKE `shots`",
+                            "SHOW CREATE TABLE `shots`"]
+    assert "ALTER TABLE `shots_staging` AUTO_INCREMENT = 42" in conn.sql
+    assert conn.sql[-1] == "ALTER TABLE `shots_staging` DROP INDEX `idx_sym`"
+
+    for sym in ("A", "B", "C"):
+        st.add([sym])
+    assert conn.inserted == [("A",), ("B",)]
+
+    del conn.sql[:]
+    assert st.publish() is True
+    assert conn.inserted[-1] == ("C",) and st.count == 3
+    assert conn.sql[1:] == [
+        "ALTER TABLE `shots_staging` ADD INDEX `idx_sym` (`symbol`, `name`(20))",
+        "DROP TABLE IF EXISTS `shots_old`",
+        "RENAME TABLE `shots` TO `shots_old`, `shots_staging` TO `shots`",
+        "DROP TABLE `shots_old`",
+    ]
+
+
+def test_empty_snapshot_is_not_published():
+    conn = FakeConn()
+    st = StagingTable(conn, "shots", ["symbol"]).create()
+    del conn.sql[:]
+    assert st.publish() is False
+    assert conn.sql == ["DROP TABLE IF EXISTS `shots_staging`"]
+
+    st = StagingTable(conn, "shots", ["symbol"]).create()
+    assert st.publish(allow_empty=True) is True
+    assert conn.sql[-2].startswith("RENAME TABLE")
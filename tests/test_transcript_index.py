@@ -0,0 +1,144 @@
+import pytest
+
+import transcript_index
+from transcript_index import (CHUNK_TABLE, SYMBOL_TABLE, chunk_segments, chunk_text, extract_symbols,
+                              index_transcript, load_symbol_universe, search, stored_segments)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.sql.append((sql, params))
+        self.result = self.conn.answer(sql, params)
+
+    def executemany(self, sql, rows):
+        self.conn.sql.append((sql, list(rows)))
+
+    def fetchall(self):
+        return self.result
+
+
+class FakeConn:
+    """Records statements; `answers` maps a SQL fragment to the rows it returns."""
+
+    def __init__(self, answers=None):
+        self.answers = answers or {}
+        self.sql = []
+        self.commits = 0
+
+    def answer(self, sql, params):
+        for fragment, rows in self.answers.items():
+            if fragment in sql:
+                return rows(params) if callable(rows) else rows
+        return []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        pass
+
+    def inserts(self, table):
+        return [rows for sql, rows in self.sql if sql.startswith(f"INSERT INTO `{table}`")]
+
+
+UNIVERSE = {"TCS", "INFY", "M&M", "IT", "SBIN"}
+
+
+def test_chunk_segments_keeps_first_start_per_chunk():
+    segments = [{"text": "one two", "start": 1.7}, {"text": "  ", "start": 3},
+                {"text": "three", "start": 4}, {"text": "four five six", "start": 9.2}]
+    assert chunk_segments(segments, chunk_words=3) == [(1, "one two three"), (9, "four five six")]
+    assert chunk_segments(segments, chunk_words=4) == [(1, "one two three four five six")]
+
+
+def test_chunk_text_has_no_timing():
+    assert chunk_text("a b c d e", chunk_words=2) == [(None, "a b"), (None, "c d"), (None, "e")]
+    assert chunk_text("") == []
+
+
+def test_extract_symbols_counts_and_skips_ambiguous_words():
+    text = "TCS and tcs beat, M&M too. It is up; $IT rallied while INFYX did not"
+    assert extract_symbols(text, UNIVERSE) == {"TCS": 2, "M&M": 1, "IT": 1}
+
+
+def test_index_transcript_replaces_rows_of_the_video():
+    conn = FakeConn()
+    segments = [{"text": "TCS looks strong", "start": 0}, {"text": "SBIN and TCS again", "start": 65}]
+    assert index_transcript(conn, "vid1", "ignored", segments=segments, universe=UNIVERSE) == (1, 2)
+
+    deletes = [sql for sql, _ in conn.sql if sql.startswith("DELETE")]
+    assert [d.split("`")[1] for d in deletes] == [CHUNK_TABLE, SYMBOL_TABLE]
+    assert conn.inserts(CHUNK_TABLE) == [[("vid1", 0, 0, "TCS looks strong SBIN and TCS again")]]
+    assert sorted(conn.inserts(SYMBOL_TABLE)[0]) == [("SBIN", "vid1", 0, 1), ("TCS", "vid1", 0, 2)]
+    assert conn.commits == 0
+
+
+def test_index_transcript_falls_back_to_plain_content():
+    conn = FakeConn()
+    assert index_transcript(conn, "vid2", "nothing to see", universe=UNIVERSE) == (1, 0)
+    assert conn.inserts(CHUNK_TABLE) == [[("vid2", 0, None, "nothing to see")]]
+    assert conn.inserts(SYMBOL_TABLE) == []
+
+
+def test_symbol_universe_is_cached(monkeypatch):
+    monkeypatch.setattr(transcript_index, "_universe", None)
+    conn = FakeConn({"SELECT DISTINCT Symbol": [(" tcs ",), (None,), ("INFY",)]})
+    assert load_symbol_universe(conn) == {"TCS", "INFY"}
+    assert load_symbol_universe(conn) == {"TCS", "INFY"}
+    assert len(conn.sql) == 1
+    load_symbol_universe(conn, max_age=0)
+    assert len(conn.sql) == 2
+
+
+def test_stored_segments_groups_timed_chunks():
+    conn = FakeConn({"start_sec IS NOT NULL": [("a", 0, "x y"), ("a", 40, "z"), ("b", 5, "w")]})
+    assert stored_segments(conn, ["a", "b"]) == {
+        "a": [{"start": 0, "text": "x y"}, {"start": 40, "text": "z"}],
+        "b": [{"start": 5, "text": "w"}],
+    }
+    assert stored_segments(conn, []) == {}
+
+
+def hit_row(video_id, start, score, content="TCS results were strong"):
+    return (video_id, f"https://youtu.be/{video_id}", "Title", 0, start, score, content)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    conn = FakeConn()
+    monkeypatch.setattr(transcript_index, "connect", lambda: conn)
+    return conn
+
+
+def test_search_uses_symbol_index_for_tickers(db):
+    db.answers = {f"FROM `{SYMBOL_TABLE}`": [hit_row("v1", 125, 3)]}
+    hits = search(" $tcs ")
+    assert [sql for sql, _ in db.sql][0].strip().startswith("SELECT s.video_id")
+    assert db.sql[0][1] == ("TCS", 20)
+    assert hits == [{"video_id": "v1", "title": "Title", "chunk_no": 0, "start_sec": 125, "score": 3.0,
+                     "url": "https://www.youtube.com/watch?v=v1&t=125s", "snippet": "TCS results were strong"}]
+
+
+def test_search_falls_back_to_fulltext(db):
+    db.answers = {"MATCH(c.content)": [hit_row("v2", None, 1.5)]}
+    hits = search("TCS")
+    assert len(db.sql) == 2
+    assert hits[0]["url"] == "https://www.youtube.com/watch?v=v2"
+
+    db.sql.clear()
+    search("strong results")
+    assert len(db.sql) == 1 and "MATCH(c.content)" in db.sql[0][0]
+    assert db.sql[0][1] == ("strong results", "strong results", 20)
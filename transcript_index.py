@@ -0,0 +1,315 @@
+import sys
+import os
+import re
+import time
+from datetime import datetime
+from contextlib import closing
+
+# ---------------- CONFIG ---------------- #
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST'),
+    'user': os.getenv('DB_USER'),
+    'password': os.getenv('DB_PASSWORD'),
+    'database': os.getenv('DB_NAME'),
+    'charset': 'utf8mb4'
+}
+
+SOURCE_TABLE = "wp_transcript"
+CHUNK_TABLE = "wp_transcript_chunks"
+SYMBOL_TABLE = "wp_transcript_symbols"
+SYMBOL_SOURCE_TABLE = "wp_mv2"
+
+CHUNK_WORDS = 120
+BUILD_BATCH = 50
+SNIPPET_CHARS = 200
+UNIVERSE_TTL_SEC = 3600
+
+# Tickers that are also everyday words; only matched when written as $TICKER
+AMBIGUOUS_SYMBOLS = {
+    "A", "AN", "AND", "ARE", "AS", "AT", "BE", "BUY", "BY", "CAN", "DO", "FOR", "GO", "HAS",
+    "IF", "IN", "IS", "IT", "ITS", "ME", "MY", "NO", "NOW", "OF", "OK", "ON", "ONE", "OR",
+    "OUR", "OUT", "SO", "THE", "TO", "UP", "US", "WE", "YES", "ALL", "BEST", "BIG", "GOOD",
+    "HIGH", "JUST", "LOW", "MORE", "NEW", "NEXT", "OPEN", "PLUS", "SELL", "STAR", "TOP",
+}
+
+WORD_RE = re.compile(r"\$?[A-Za-z][A-Za-z0-9&-]*")
+
+SCHEMA = [
+    f"""
+    CREATE TABLE IF NOT EXISTS `{CHUNK_TABLE}` (
+        video_id VARCHAR(32) NOT NULL,
+        chunk_no INT NOT NULL,
+        start_sec INT NULL,
+        content TEXT NOT NULL,
+        PRIMARY KEY (video_id, chunk_no),
+        FULLTEXT KEY ft_content (content)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS `{SYMBOL_TABLE}` (
+        symbol VARCHAR(32) NOT NULL,
+        video_id VARCHAR(32) NOT NULL,
+        chunk_no INT NOT NULL,
+        mentions INT NOT NULL DEFAULT 1,
+        PRIMARY KEY (symbol, video_id, chunk_no),
+        KEY idx_video (video_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+]
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+
+def connect():
+    # Imported here so the chunking and search helpers load without the driver
+    import pymysql
+    return pymysql.connect(**DB_CONFIG)
+
+
+# Per process: the DDL runs once and the ticker universe is reused between videos
+_schema_ready = False
+_universe = None
+_universe_loaded_at = 0.0
+
+
+def ensure_schema(conn):
+    global _schema_ready
+    if _schema_ready:
+        return
+    with conn.cursor() as cursor:
+        for ddl in SCHEMA:
+            cursor.execute(ddl)
+    conn.commit()
+    _schema_ready = True
+
+
+def load_symbol_universe(conn, max_age=UNIVERSE_TTL_SEC):
+    global _universe, _universe_loaded_at
+    if _universe is not None and time.monotonic() - _universe_loaded_at < max_age:
+        return _universe
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT Symbol FROM `{SYMBOL_SOURCE_TABLE}`")
+        _universe = {str(row[0]).strip().upper() for row in cursor.fetchall() if row[0]}
+    _universe_loaded_at = time.monotonic()
+    return _universe
+
+
+# ---------------- CHUNKING ---------------- #
+def chunk_segments(segments, chunk_words=CHUNK_WORDS):
+    """Groups youtube-transcript-api segments into ~chunk_words chunks keeping the start time."""
+    chunks = []
+    words, start = [], None
+    for seg in segments:
+        text = seg.get("text", "").strip()
+        if not text:
+            continue
+        if start is None:
+            start = int(seg.get("start", 0))
+        words.extend(text.split())
+        if len(words) >= chunk_words:
+            chunks.append((start, " ".join(words)))
+            words, start = [], None
+    if words:
+        chunks.append((start, " ".join(words)))
+    return chunks
+
+
+def chunk_text(content, chunk_words=CHUNK_WORDS):
+    """Plain-text transcripts (downsub, older rows) have no timing, so start is None."""
+    words = content.split()
+    return [(None, " ".join(words[i:i + chunk_words])) for i in range(0, len(words), chunk_words)]
+
+
+def extract_symbols(text, universe):
+    counts = {}
+    for token in WORD_RE.findall(text):
+        explicit = token.startswith("$")
+        sym = token.lstrip("$").upper()
+        if sym not in universe:
+            continue
+        if sym in AMBIGUOUS_SYMBOLS and not explicit:
+            continue
+        counts[sym] = counts.get(sym, 0) + 1
+    return counts
+
+
+# ---------------- INDEXING ---------------- #
+def index_transcript(conn, video_id, content, segments=None, universe=None):
+    """Replaces the chunk and symbol rows of one video. Caller commits."""
+    chunks = chunk_segments(segments) if segments else chunk_text(content or "")
+    if universe is None:
+        universe = load_symbol_universe(conn)
+
+    chunk_rows = []
+    symbol_rows = []
+    for chunk_no, (start, text) in enumerate(chunks):
+        chunk_rows.append((video_id, chunk_no, start, text))
+        for sym, mentions in extract_symbols(text, universe).items():
+            symbol_rows.append((sym, video_id, chunk_no, mentions))
+
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM `{CHUNK_TABLE}` WHERE video_id = %s", (video_id,))
+        cursor.execute(f"DELETE FROM `{SYMBOL_TABLE}` WHERE video_id = %s", (video_id,))
+        if chunk_rows:
+            cursor.executemany(
+                f"INSERT INTO `{CHUNK_TABLE}` (video_id, chunk_no, start_sec, content) VALUES (%s, %s, %s, %s)",
+                chunk_rows
+            )
+        if symbol_rows:
+            cursor.executemany(
+                f"INSERT INTO `{SYMBOL_TABLE}` (symbol, video_id, chunk_no, mentions) VALUES (%s, %s, %s, %s)",
+                symbol_rows
+            )
+    return len(chunk_rows), len(symbol_rows)
+
+
+def index_video(video_id, content, segments=None):
+    """Standalone entry point used by my.py right after a transcript is saved."""
+    if not DB_CONFIG['host'] or not content: return
+    try:
+        with closing(connect()) as conn:
+            ensure_schema(conn)
+            n_chunks, n_symbols = index_transcript(conn, video_id, content, segments)
+            conn.commit()
+        log(f"🗂️ Indexed {video_id}: {n_chunks} chunks, {n_symbols} symbol hits")
+    except Exception as e:
+        log(f"❌ Index Error for {video_id}: {e}")
+
+
+def stored_segments(conn, video_ids):
+    """Timed chunks already in the index, as segments, so a rebuild keeps their start
+    times (wp_transcript.content itself has no timing)."""
+    if not video_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(video_ids))
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT video_id, start_sec, content FROM `{CHUNK_TABLE}`
+            WHERE video_id IN ({placeholders}) AND start_sec IS NOT NULL
+            ORDER BY video_id, chunk_no
+            """,
+            video_ids
+        )
+        segments = {}
+        for video_id, start_sec, content in cursor.fetchall():
+            segments.setdefault(video_id, []).append({"start": start_sec, "text": content})
+    return segments
+
+
+def build_index(rebuild=False):
+    """Indexes every wp_transcript row that has no chunks yet (or all rows with rebuild=True).
+
+    On rebuild, videos indexed with timestamps are re-chunked from their stored timed
+    chunks; the others from wp_transcript.content (without timestamps).
+    """
+    with closing(connect()) as conn:
+        ensure_schema(conn)
+        universe = load_symbol_universe(conn)
+        log(f"📋 Symbol universe: {len(universe)} tickers")
+
+        with conn.cursor() as cursor:
+            if rebuild:
+                cursor.execute(f"SELECT video_id FROM `{SOURCE_TABLE}`")
+            else:
+                cursor.execute(f"""
+                    SELECT t.video_id
+                    FROM `{SOURCE_TABLE}` t
+                    LEFT JOIN `{CHUNK_TABLE}` c ON c.video_id = t.video_id AND c.chunk_no = 0
+                    WHERE c.video_id IS NULL
+                """)
+            video_ids = [row[0] for row in cursor.fetchall()]
+
+        log(f"🚀 Indexing {len(video_ids)} transcripts...")
+        for i in range(0, len(video_ids), BUILD_BATCH):
+            batch = video_ids[i:i + BUILD_BATCH]
+            placeholders = ", ".join(["%s"] * len(batch))
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT video_id, content FROM `{SOURCE_TABLE}` WHERE video_id IN ({placeholders})",
+                    batch
+                )
+                rows = cursor.fetchall()
+            timed = stored_segments(conn, batch) if rebuild else {}
+            for video_id, content in rows:
+                index_transcript(conn, video_id, content, segments=timed.get(video_id), universe=universe)
+            conn.commit()
+            log(f"    ↳ {min(i + BUILD_BATCH, len(video_ids))}/{len(video_ids)} indexed")
+
+    log("🏁 Index build finished.")
+
+
+# ---------------- SEARCH ---------------- #
+def _hit(row):
+    video_id, _video_url, title, chunk_no, start_sec, score, content = row
+    # Canonical watch URL so the &t= offset works even for youtu.be sources
+    url = f"https://www.youtube.com/watch?v={video_id}"
+    if start_sec is not None:
+        url += f"&t={int(start_sec)}s"
+    return {
+        "video_id": video_id,
+        "title": title,
+        "chunk_no": chunk_no,
+        "start_sec": start_sec,
+        "score": float(score),
+        "url": url,
+        "snippet": content[:SNIPPET_CHARS],
+    }
+
+
+def search_symbol(conn, symbol, limit=20):
+    """Ranked by mentions in the chunk; served from the (symbol, ...) primary key."""
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT s.video_id, t.video_url, t.title, s.chunk_no, c.start_sec, s.mentions, c.content
+            FROM `{SYMBOL_TABLE}` s
+            JOIN `{CHUNK_TABLE}` c ON c.video_id = s.video_id AND c.chunk_no = s.chunk_no
+            JOIN `{SOURCE_TABLE}` t ON t.video_id = s.video_id
+            WHERE s.symbol = %s
+            ORDER BY s.mentions DESC, s.video_id DESC, s.chunk_no
+            LIMIT %s
+        """, (symbol.upper(), limit))
+        return [_hit(row) for row in cursor.fetchall()]
+
+
+def search_text(conn, query, limit=20):
+    """FULLTEXT relevance ranking over transcript chunks."""
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT c.video_id, t.video_url, t.title, c.chunk_no, c.start_sec,
+                   MATCH(c.content) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score, c.content
+            FROM `{CHUNK_TABLE}` c
+            JOIN `{SOURCE_TABLE}` t ON t.video_id = c.video_id
+            WHERE MATCH(c.content) AGAINST (%s IN NATURAL LANGUAGE MODE)
+            ORDER BY score DESC
+            LIMIT %s
+        """, (query, query, limit))
+        return [_hit(row) for row in cursor.fetchall()]
+
+
+def search(query, limit=20):
+    """Returns ranked video/timestamp hits. A bare ticker ($TCS or TCS) uses the symbol index."""
+    query = query.strip()
+    with closing(connect()) as conn:
+        term = query.lstrip("$").upper()
+        if " " not in query and WORD_RE.fullmatch(query):
+            hits = search_symbol(conn, term, limit)
+            if hits:
+                return hits
+        return search_text(conn, query, limit)
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "build"
+
+    if cmd == "build":
+        build_index(rebuild="--rebuild" in sys.argv)
+    elif cmd == "search" and len(sys.argv) > 2:
+        for hit in search(" ".join(sys.argv[2:])):
+            ts = f"{hit['start_sec'] // 60}:{hit['start_sec'] % 60:02d}" if hit["start_sec"] is not None else "--:--"
+            log(f"{hit['score']:>8.2f} | {ts} | {(hit['title'] or '')[:50]} | {hit['url']}")
+    else:
+        print("usage: python transcript_index.py build [--rebuild] | search <query>")
+        sys.exit(1)